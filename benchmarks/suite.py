@@ -0,0 +1,445 @@
+"""
+Benchmark suite for integrator throughput, accuracy, memory and plot redraws.
+
+Runs fixed reference scenarios with every integrator and reports, for each run:
+    steps_per_second                    integration throughput, from the median wall time of the repeats
+    wall_seconds                        median wall time of the run, reported but not compared
+    timing_spread                       spread of the repeats' wall times relative to their median
+    evaluations_per_simulated_second    field evaluations per second of simulated time
+    peak_bytes_per_sample               peak memory allocated during the run per logged sample
+    max_energy_error                    largest relative deviation of the total energy from its initial value
+    energy_drift_per_orbit              see Rocket.energy_drift_per_orbit
+    reference_deviation                 for runs in the compiled kernel, the largest deviation of the logs
+                                        from those of the Python path, relative to their scale
+
+Together, the wall time and the energy error show how much accuracy each integrator buys
+for its cost. The plot benchmarks time drawing a scenario's logs from scratch, redrawing
+them and switching to the energy view, as the GUI does.
+
+Results are written as JSON and compared against a stored baseline. Metrics that got
+worse by more than the tolerance are listed as regressions, and the exit status is 1.
+Timings are allowed to change by their measured spread on top of the tolerance, so a
+noisy machine does not report regressions that are only noise.
+A compiled run whose logs deviate from the Python path's by more than REFERENCE_TOLERANCE
+is a regression as well, whatever the baseline.
+
+Usage:
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --save-baseline
+
+Timings depend on the machine, so the baseline should be saved on the machine it is compared on.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import matplotlib
+import numpy as np
+
+from simulation.batch import DEFAULT_CASE, simulate
+from simulation.gravity import GravityField
+from simulation.integrators import INTEGRATORS
+from simulation.kernels import numba
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Fractional change of a metric beyond which it counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+# Short runs are looped within each timed repeat until the repeat takes at least this many seconds,
+# so the timer's resolution and the per-run overheads do not dominate
+MIN_REPEAT_SECONDS = 0.05
+
+# Energy errors below this are rounding noise, and are not compared
+_ENERGY_FLOOR = 1e-12
+
+# Largest relative deviation of a compiled run's logs from the Python path's, which should reproduce them exactly
+REFERENCE_TOLERANCE = 0.0
+
+# Variant of an Earth-only scenario that uses the analytic two-body orbit instead of an integrator
+ANALYTIC = "analytic"
+
+# Reference scenarios: the case parameters, see simulation.batch.DEFAULT_CASE, and the variants run
+SCENARIOS = {
+    # The GUI's defaults, a circular low Earth orbit, for five days
+    "leo_circular": {
+        "case": {"y": 7e6, "vx": 7543.0, "h": 10.0, "duration": 432000.0},
+        "variants": [*INTEGRATORS, ANALYTIC],
+    },
+    # An orbit with an eccentricity of about 0.6, whose fast periapsis passes stress fixed steps
+    "eccentric": {
+        "case": {"y": 7e6, "vx": 9500.0, "h": 5.0, "duration": 432000.0},
+        "variants": [*INTEGRATORS, ANALYTIC],
+    },
+    # Coast from low Earth orbit to a flyby 2000 km above the moving Moon. The energy is not conserved
+    # in the field of a moving Moon, so its energy error measures the flyby rather than the integrator
+    "translunar": {
+        "case": {"y": -7e6, "vx": 10538.640047, "vy": -902.803735, "h": 30.0, "duration": 518400.0,
+                 "moon": True, "moving_moon": True},
+        "variants": list(INTEGRATORS),
+    },
+    # Suborbital arc that hits the Earth, ending on the crash event
+    "crash": {
+        "case": {"y": 7e6, "vx": 5000.0, "h": 0.1, "duration": 10000.0},
+        "variants": [*INTEGRATORS, ANALYTIC],
+    },
+    # Ten days of low Earth orbit logged every second, for the redraw latency of a long run
+    "leo_long": {
+        "case": {"y": 7e6, "vx": 7543.0, "h": 1.0, "duration": 864000.0},
+        "variants": [ANALYTIC],
+    },
+}
+
+# Whether a larger value of each compared metric is better
+METRICS = {
+    "steps_per_second": True,
+    "evaluations_per_simulated_second": False,
+    "peak_bytes_per_sample": False,
+    "max_energy_error": False,
+    "energy_drift_per_orbit": False,
+    "first_draw_ms": False,
+    "redraw_ms": False,
+    "view_switch_ms": False,
+}
+
+# Timed metrics, and the metric holding the relative spread of their repeats
+_SPREADS = {
+    "steps_per_second": "timing_spread",
+    "redraw_ms": "redraw_spread",
+}
+
+
+class CountingField(GravityField):
+    """
+    A GravityField that counts its evaluations, one per point.
+    """
+
+    def __init__(self, bodies: list, **kwargs):
+        super().__init__(bodies, **kwargs)
+        self.evaluations = 0
+
+    def evaluate(self, x: float, y: float, time: float = 0.0) -> tuple:
+        self.evaluations += 1
+        return super().evaluate(x, y, time)
+
+    def evaluate_arrays(self, x: np.ndarray, y: np.ndarray, time=0.0) -> tuple:
+        self.evaluations += np.size(x)
+        return super().evaluate_arrays(x, y, time)
+
+
+def scenario_case(name: str, variant: str) -> dict:
+    """
+    Build the case parameters of a benchmark.
+
+    Parameters:
+        name (str): The scenario, a key of SCENARIOS.
+        variant (str): An integrator key, or ANALYTIC.
+
+    Returns:
+        dict: The complete case parameters.
+    """
+    case = {**DEFAULT_CASE, **SCENARIOS[name]["case"], "analytic": variant == ANALYTIC}
+    if variant != ANALYTIC:
+        case["integrator"] = variant
+    return case
+
+
+def time_repeats(run, repeat: int) -> tuple:
+    """
+    Time a callable, looping it within each repeat until the repeat takes at least MIN_REPEAT_SECONDS.
+
+    Parameters:
+        run (callable): The code to time, called without arguments.
+        repeat (int): Number of timed repeats.
+
+    Returns:
+        tuple: The median seconds per call over the repeats, their spread (the range of the repeats
+            relative to the median), and the last return value of run.
+    """
+    # The first call sizes the loop, and also warms up caches and compiled code
+    start = time.perf_counter()
+    result = run()
+    loops = max(1, math.ceil(MIN_REPEAT_SECONDS / max(time.perf_counter() - start, 1e-9)))
+
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            result = run()
+        seconds.append((time.perf_counter() - start) / loops)
+    median = float(np.median(seconds))
+    return median, (max(seconds) - min(seconds)) / median if median > 0 else 0.0, result
+
+
+def benchmark_run(case: dict, repeat: int = 5) -> tuple:
+    """
+    Time a run and measure its evaluations, memory and energy error.
+
+    The timed runs use a plain field, and the evaluations and memory are measured in one
+    more run, since counting and tracing slow the run down. That run takes the Python path,
+    whose evaluations can be counted, so a timed run in the compiled kernel is also checked
+    against it.
+
+    Parameters:
+        case (dict): The complete case parameters.
+        repeat (int): Number of timed repeats, whose median is reported, see time_repeats.
+
+    Returns:
+        tuple: The metrics, and the instrumented SimulationRunner for the plot benchmark.
+    """
+    wall, spread, timed = time_repeats(lambda: simulate(case), repeat)
+
+    field = CountingField.earth_moon(case["moon"], case["moving_moon"])
+    tracemalloc.start()
+    try:
+        runner = simulate(case, field=field, compiled=False)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    rocket = runner.rocket
+    total_energy = rocket.trajectory.column("total_energy")
+    simulated = rocket.time - runner.start_time
+    drift = runner.energy_drift_per_orbit()
+    metrics = {
+        "steps": runner.steps,
+        "samples": len(rocket.trajectory),
+        "simulated_seconds": simulated,
+        "crashed": runner.crash_message is not None,
+        "steps_per_second": runner.steps / wall,
+        "wall_seconds": wall,
+        "timing_spread": spread,
+        "evaluations_per_simulated_second": field.evaluations / simulated if simulated > 0 else None,
+        "peak_bytes_per_sample": peak / len(rocket.trajectory),
+        "max_energy_error": float(np.max(np.abs(total_energy - total_energy[0])) / abs(total_energy[0])),
+        "energy_drift_per_orbit": abs(drift) if drift is not None else None,
+        "compiled": timed.compiled,
+        "reference_deviation": reference_deviation(timed, runner) if timed.compiled else None,
+    }
+    return metrics, runner
+
+
+def reference_deviation(runner, reference) -> float:
+    """
+    Measure how far the logs of a run deviate from those of a reference run of the same case.
+
+    Parameters:
+        runner (SimulationRunner): The finished run, e.g. in the compiled kernel.
+        reference (SimulationRunner): The finished reference run, e.g. on the Python path.
+
+    Returns:
+        float: The largest deviation of any logged value relative to the largest magnitude of its column,
+            or infinity if the runs logged different numbers of samples.
+    """
+    logs, reference_logs = runner.rocket.trajectory.data, reference.rocket.trajectory.data
+    if logs.shape != reference_logs.shape:
+        return math.inf
+    deviation = 0.0
+    for name in logs.dtype.names:
+        scale = np.max(np.abs(reference_logs[name]))
+        if scale > 0:
+            deviation = max(deviation, float(np.max(np.abs(logs[name] - reference_logs[name])) / scale))
+    return deviation
+
+
+def benchmark_plot(runner, repeat: int = 5) -> dict:
+    """
+    Time how long the GUI's plot takes to draw the logs of a run, off screen.
+
+    Parameters:
+        runner (SimulationRunner): The finished run.
+        repeat (int): Number of timed redraws, whose median is reported.
+
+    Returns:
+        dict: Milliseconds of the first draw, a redraw of new logs and the first switch to the energy view,
+            and the relative spread of the redraws.
+    """
+    # Imported here so the integrator benchmarks do not need the GUI's dependencies
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from gui.simulation_plot import SimulationPlot
+
+    logs = runner.rocket.trajectory.data
+    canvas = FigureCanvasAgg(Figure(figsize=(8, 6)))
+    plot = SimulationPlot(canvas)
+
+    # The Agg canvas draws immediately, so each call includes the draw
+    start = time.perf_counter()
+    plot.set_data(logs, runner.field, runner.events)
+    first_draw = time.perf_counter() - start
+
+    redraw, spread, _ = time_repeats(lambda: plot.set_data(logs, runner.field, runner.events), repeat)
+
+    start = time.perf_counter()
+    plot.show_view("energy")
+    view_switch = time.perf_counter() - start
+    return {
+        "samples": logs.shape[0], "first_draw_ms": first_draw * 1000, "redraw_ms": redraw * 1000,
+        "view_switch_ms": view_switch * 1000, "redraw_spread": spread,
+    }
+
+
+def run_suite(scenarios: list = None, repeat: int = 5, plots: bool = True, progress=None) -> dict:
+    """
+    Run the benchmarks of some or all scenarios.
+
+    Parameters:
+        scenarios (list): Names of the scenarios to run, defaults to all of SCENARIOS.
+        repeat (int): Number of timed repeats of each benchmark.
+        plots (bool): Whether to time the plot of each scenario's first run.
+        progress (callable): Called with the name of each benchmark before it runs.
+
+    Returns:
+        dict: The environment and the metrics of each benchmark, keyed 'scenario/variant' and 'scenario/plot'.
+    """
+    results = {}
+    for name in scenarios or SCENARIOS:
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name!r}, expected one of {', '.join(SCENARIOS)}.")
+        plotted = False
+        for variant in SCENARIOS[name]["variants"]:
+            key = f"{name}/{variant}"
+            if progress is not None:
+                progress(key)
+            results[key], runner = benchmark_run(scenario_case(name, variant), repeat)
+            if plots and not plotted:
+                if progress is not None:
+                    progress(f"{name}/plot")
+                results[f"{name}/plot"] = benchmark_plot(runner, repeat)
+                plotted = True
+
+    return {
+        "environment": {
+            "python": platform.python_version(), "numpy": np.__version__, "matplotlib": matplotlib.__version__,
+            "numba": numba.__version__ if numba is not None else None,
+            "platform": platform.platform(), "processor": platform.processor(), "cpus": os.cpu_count(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> dict:
+    """
+    Compare the metrics of a report with those of a baseline report.
+
+    Parameters:
+        report (dict): The output of run_suite.
+        baseline (dict): An earlier output of run_suite.
+        tolerance (float): Fractional change beyond which a metric counts as changed. A timed metric may
+            change by the spread of its repeats in the report and the baseline on top of it.
+
+    Returns:
+        dict: Under 'changes', the ratio of every compared metric to its baseline value, keyed like the
+            results, and under 'regressions' and 'improvements', the metrics that changed for the worse
+            or the better.
+    """
+    changes = {}
+    regressions = []
+    improvements = []
+    for key, metrics in report["results"].items():
+        deviation = metrics.get("reference_deviation")
+        if deviation is not None and deviation > REFERENCE_TOLERANCE:
+            regressions.append({"benchmark": key, "metric": "reference_deviation", "baseline": REFERENCE_TOLERANCE,
+                                "current": deviation, "ratio": math.inf})
+
+        reference = baseline.get("results", {}).get(key)
+        if reference is None:
+            continue
+        for metric, larger_is_better in METRICS.items():
+            current, previous = metrics.get(metric), reference.get(metric)
+            if current is None or previous is None:
+                continue
+            if metric == "max_energy_error" and max(current, previous) < _ENERGY_FLOOR:
+                continue
+            ratio = current / previous if previous else (math.inf if current else 1.0)
+            changes.setdefault(key, {})[metric] = ratio
+
+            allowed = tolerance
+            if metric in _SPREADS:
+                allowed += metrics.get(_SPREADS[metric], 0.0) + reference.get(_SPREADS[metric], 0.0)
+            change = {"benchmark": key, "metric": metric, "baseline": previous, "current": current, "ratio": ratio}
+            better = ratio > 1 + allowed if larger_is_better else ratio < 1 / (1 + allowed)
+            worse = ratio < 1 / (1 + allowed) if larger_is_better else ratio > 1 + allowed
+            if worse:
+                regressions.append(change)
+            elif better:
+                improvements.append(change)
+    return {"tolerance": tolerance, "changes": changes, "regressions": regressions, "improvements": improvements}
+
+
+def format_report(report: dict) -> str:
+    """
+    Format the metrics of a report as a table.
+
+    Parameters:
+        report (dict): The output of run_suite, optionally with a 'comparison'.
+
+    Returns:
+        str: One line per benchmark.
+    """
+    lines = [f"{'benchmark':<26}{'steps/s':>12}{'wall s':>10}{'evals/sim s':>13}{'bytes/sample':>14}"
+             f"{'energy error':>14}{'draw ms':>10}{'redraw ms':>11}"]
+    for key, metrics in report["results"].items():
+        if key.endswith("/plot"):
+            lines.append(f"{key:<26}{'':>63}{metrics['first_draw_ms']:>10.1f}{metrics['redraw_ms']:>11.1f}")
+            continue
+        evaluations = metrics["evaluations_per_simulated_second"]
+        lines.append(
+            f"{key:<26}{metrics['steps_per_second']:>12,.0f}{metrics['wall_seconds']:>10.3f}"
+            f"{evaluations if evaluations is not None else math.nan:>13.3f}{metrics['peak_bytes_per_sample']:>14.1f}"
+            f"{metrics['max_energy_error']:>14.3e}"
+        )
+
+    comparison = report.get("comparison")
+    if comparison is not None:
+        for title, changes in (("Regressions", comparison["regressions"]), ("Improvements", comparison["improvements"])):
+            lines.append(f"{title} beyond {comparison['tolerance']:.0%}: {len(changes) or 'none'}")
+            for change in changes:
+                lines.append(f"  {change['benchmark']} {change['metric']}: {change['baseline']:.4g} -> "
+                             f"{change['current']:.4g} (x{change['ratio']:.3f})")
+    return "\n".join(lines)
+
+
+def main(argv: list = None) -> None:
+    """Command line entry point of the benchmark suite."""
+    parser = argparse.ArgumentParser(description="Benchmark integrator throughput, accuracy, memory and plot redraws.")
+    parser.add_argument("--output", default=None, help="Path of the JSON report.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="JSON report to compare against (default: %(default)s).")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline instead of comparing.")
+    parser.add_argument("--scenarios", nargs="+", default=None, help=f"Scenarios to run (default: {' '.join(SCENARIOS)}).")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed repeats of each benchmark (default: %(default)s).")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Fractional change that counts as a regression (default: %(default)g).")
+    parser.add_argument("--no-plot", action="store_true", help="Skip the plot redraw benchmarks.")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.scenarios, args.repeat, not args.no_plot,
+                       progress=lambda key: print(f"Running {key}...", file=sys.stderr))
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Saved the baseline to {args.baseline}.", file=sys.stderr)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            report["comparison"] = compare(report, json.load(file), args.tolerance)
+        report["comparison"]["baseline"] = args.baseline
+
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    print(format_report(report))
+
+    if report.get("comparison", {}).get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,39 @@
 from PyQt6.QtWidgets import (
-    QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QLabel, QLineEdit, QPushButton, QRadioButton, QButtonGroup, QFormLayout
+    QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QLabel, QLineEdit, QPushButton, QRadioButton, QButtonGroup, QFormLayout,
+    QComboBox, QProgressBar, QCheckBox, QFileDialog
 )
-from PyQt6.QtCore import Qt, pyqtSlot
+from PyQt6.QtCore import Qt, QThread, pyqtSlot
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
-from simulation.planet_constants import G_CONSTANT, EARTH_MASS, EARTH_RADIUS, MOON_MASS, MOON_RADIUS, MOON_DISTANCE
-import matplotlib.image as mpimg
 import matplotlib.pyplot as plt
+from simulation.events import EventRecord
+from simulation.gravity import GravityField
 from simulation.rocket import Rocket
+from simulation.integrators import INTEGRATORS
+from simulation.trajectory import Trajectory
+from simulation.runner import SimulationRunner
+from simulation.nbody import NBodySimulation
+from simulation.result_cache import ResultCache, SimulationResult, shared_cache
+from simulation.trajectory_file import TrajectoryFile
+from simulation.profiling import Profiler
+from simulation.targeting import ApoapsisAltitude, ImpactAngle, PeriapsisAltitude, TargetingSolver
+from gui.simulation_plot import SimulationPlot
+from gui.simulation_worker import SimulationWorker, TargetingWorker
+
+
+# Status of runs that followed the analytic orbit, whose energy drift says nothing about the integrator
+ANALYTIC_MESSAGE = "Solved as an analytic two-body orbit, the selected integrator was not used."
 
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    # Most samples read from a trajectory file for a replay
+    REPLAY_SAMPLES = 2_000_000
+
+    def __init__(self, cache: ResultCache = None):
+        """
+        Parameters:
+            cache (ResultCache): Cache of finished runs, defaults to the process's in-memory cache.
+        """
         super().__init__()
 
         # Intialise window
@@ -21,6 +43,25 @@ class MainWindow(QMainWindow):
         # Current view mode which can change between 'trajectory' or 'energy'
         self.current_view = "trajectory"
 
+        # Latest run and its rocket, the number of its samples ready to plot, and the background run
+        self.runner = None
+        self.rocket = None
+        self.field = None
+        self.logged_samples = 0
+        self.simulation_thread = None
+        self.simulation_worker = None
+
+        # Latest multi-body simulation, plotted in place of a rocket's run
+        self.system = None
+
+        # Finished runs are looked up by their inputs before integrating, the current run's inputs and its result
+        self.cache = cache if cache is not None else shared_cache()
+        self.case = None
+        self.result = None
+
+        # Profile of the latest run, collected while the profiling checkbox is ticked
+        self.profiler = None
+
         # User inputs with some starting parameters that give a circular orbit
         self.mass_label = QLabel("Rocket Mass (kg):")
         self.mass_input = QLineEdit("100")
@@ -43,11 +84,49 @@ class MainWindow(QMainWindow):
         self.simulation_time_label = QLabel("Total Simulation Time (s):")
         self.simulation_time_input = QLineEdit("10000")
 
+        self.log_every_label = QLabel("Log Every N Steps:")
+        self.log_every_input = QLineEdit("1")
+
+        # Integrator selection, with error tolerances used by the adaptive integrator
+        self.integrator_label = QLabel("Integrator:")
+        self.integrator_input = QComboBox()
+        for key, name in INTEGRATORS.items():
+            self.integrator_input.addItem(name, key)
+
+        self.rtol_label = QLabel("Relative Tolerance:")
+        self.rtol_input = QLineEdit("1E-9")
+
+        self.atol_label = QLabel("Absolute Tolerance:")
+        self.atol_input = QLineEdit("1E-3")
+
         # Selection for the simulation, to include either only the Earth, or the Earth and Moon
         self.simulation_label = QLabel("Choose Simulation:")
         self.earth_button = QRadioButton("Earth Only")
         self.earth_moon_button = QRadioButton("Earth and Moon")
         self.earth_button.setChecked(True)
+        self.moving_moon_checkbox = QCheckBox("Moving Moon")
+
+        # Around the Earth alone the orbit can be solved analytically instead of integrated
+        self.analytic_checkbox = QCheckBox("Analytic Orbit (Earth Only)")
+        self.analytic_checkbox.setChecked(True)
+
+        # Timing of the phases of runs and redraws, which can be turned on and off during a run
+        self.profile_checkbox = QCheckBox("Profile Runs")
+
+        # Branching off the latest run at a logged time, with an impulsive burn there
+        self.branch_time_label = QLabel("Branch at Time (s):")
+        self.branch_time_input = QLineEdit("0")
+        self.burn_label = QLabel("Burn Δv x, y (m/s):")
+        self.burn_vx_input = QLineEdit("0")
+        self.burn_vy_input = QLineEdit("0")
+
+        # Target the initial velocity is solved for, starting from the velocity inputs
+        self.target_label = QLabel("Target:")
+        self.target_input = QComboBox()
+        self.target_input.addItem("Apoapsis Altitude (km)", "apoapsis")
+        self.target_input.addItem("Moon Periapsis Altitude (km)", "moon_periapsis")
+        self.target_input.addItem("Earth Impact Angle (deg)", "impact")
+        self.target_value_input = QLineEdit("20000")
 
         self.button_group = QButtonGroup()
         self.button_group.addButton(self.earth_button)
@@ -55,11 +134,36 @@ class MainWindow(QMainWindow):
 
         # Buttons for performing the simulation and switching current view between 'trajectory' and 'energy'
         self.run_button = QPushButton("Run Simulation")
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.setEnabled(False)
         self.toggle_view_button = QPushButton("Switch to Energy View")
 
+        # Buttons for continuing the latest run up to a later end time, or branching off it
+        self.continue_button = QPushButton("Continue")
+        self.continue_button.setEnabled(False)
+        self.branch_button = QPushButton("Branch")
+        self.branch_button.setEnabled(False)
+        self.solve_button = QPushButton("Solve for Velocity")
+
+        # Buttons for saving the latest run to a trajectory file and replaying a saved one
+        self.save_button = QPushButton("Save Run...")
+        self.save_button.setEnabled(False)
+        self.open_button = QPushButton("Open Run...")
+        self.scenario_button = QPushButton("Open Scenario...")
+        self.export_profile_button = QPushButton("Export Profile...")
+        self.export_profile_button.setEnabled(False)
+
+        # Progress of the background run
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 1000)
+        self.progress_bar.setTextVisible(False)
+        self.steps_per_second_label = QLabel("")
+        self.steps_per_second_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+
         # Matplotlib plot
         self.canvas = FigureCanvas(plt.figure(figsize=(8, 6)))
         self.toolbar = NavigationToolbar(self.canvas, self)
+        self.plot = SimulationPlot(self.canvas)
 
         # Adjust form layout for inputs and simulation selection
         form_layout = QFormLayout()
@@ -70,6 +174,21 @@ class MainWindow(QMainWindow):
         form_layout.addRow(self.vy_label, self.vy_input)
         form_layout.addRow(self.time_step_label, self.time_step_input)
         form_layout.addRow(self.simulation_time_label, self.simulation_time_input)
+        form_layout.addRow(self.log_every_label, self.log_every_input)
+        form_layout.addRow(self.integrator_label, self.integrator_input)
+        form_layout.addRow(self.rtol_label, self.rtol_input)
+        form_layout.addRow(self.atol_label, self.atol_input)
+        form_layout.addRow(self.analytic_checkbox)
+        form_layout.addRow(self.profile_checkbox)
+        form_layout.addRow(self.branch_time_label, self.branch_time_input)
+        burn_layout = QHBoxLayout()
+        burn_layout.addWidget(self.burn_vx_input)
+        burn_layout.addWidget(self.burn_vy_input)
+        form_layout.addRow(self.burn_label, burn_layout)
+        target_layout = QHBoxLayout()
+        target_layout.addWidget(self.target_input)
+        target_layout.addWidget(self.target_value_input)
+        form_layout.addRow(self.target_label, target_layout)
         
         # Add a spacer (two empty lines) before "Choose Simulation"
         # Add simulation selection directly to form layout
@@ -79,6 +198,7 @@ class MainWindow(QMainWindow):
         simulation_layout.addWidget(self.simulation_label)
         simulation_layout.addWidget(self.earth_button)
         simulation_layout.addWidget(self.earth_moon_button)
+        simulation_layout.addWidget(self.moving_moon_checkbox)
         simulation_layout.setSpacing(5)  
         form_layout.addRow(simulation_layout)
 
@@ -87,7 +207,15 @@ class MainWindow(QMainWindow):
         form_layout.addRow(QLabel())  
         form_layout.addRow(QLabel())  
         form_layout.addRow(self.run_button)
+        form_layout.addRow(self.cancel_button)
+        form_layout.addRow(self.continue_button, self.branch_button)
+        form_layout.addRow(self.solve_button)
         form_layout.addRow(self.toggle_view_button)
+        form_layout.addRow(self.save_button, self.open_button)
+        form_layout.addRow(self.scenario_button)
+        form_layout.addRow(self.export_profile_button)
+        form_layout.addRow(self.progress_bar)
+        form_layout.addRow(self.steps_per_second_label)
 
         # Add crash message below the buttons with two-line spacing
         form_layout.addRow(QLabel())  
@@ -113,61 +241,528 @@ class MainWindow(QMainWindow):
 
         # Connect buttons for running simulation and switching current view
         self.run_button.clicked.connect(self.run_simulation)
+        self.cancel_button.clicked.connect(self.cancel_simulation)
+        self.continue_button.clicked.connect(self.continue_simulation)
+        self.branch_button.clicked.connect(self.branch_simulation)
+        self.solve_button.clicked.connect(self.solve_velocity)
         self.toggle_view_button.clicked.connect(self.toggle_view)
+        self.save_button.clicked.connect(self.save_run)
+        self.open_button.clicked.connect(self.open_run)
+        self.scenario_button.clicked.connect(self.open_scenario)
+        self.export_profile_button.clicked.connect(self.export_profile)
+        self.profile_checkbox.toggled.connect(self.toggle_profiling)
+        self.integrator_input.activated.connect(self.on_integrator_selected)
 
     @pyqtSlot()
     def run_simulation(self):
-        """Reads inputs, runs the simulation, and updates the plot."""
+        """Reads inputs and starts the simulation on a background thread, which streams updates to the plot."""
+        if self.simulation_thread is not None:
+            return
+
         try:
             # Clear the crash message before starting a new simulation
             self.crash_message_label.setText("")
 
-            # Extract user inputs
-            mass = float(self.mass_input.text())
-            x = float(self.x_input.text())
-            y = float(self.y_input.text())
-            vx = float(self.vx_input.text())
-            vy = float(self.vy_input.text())
-            h = float(self.time_step_input.text())
+            # Extract user inputs, with the same parameters as a batch case
+            case = {
+                "mass": float(self.mass_input.text()),
+                "x": float(self.x_input.text()),
+                "y": float(self.y_input.text()),
+                "vx": float(self.vx_input.text()),
+                "vy": float(self.vy_input.text()),
+                "h": float(self.time_step_input.text()),
+                "duration": float(self.simulation_time_input.text()),
+                "moon": self.earth_moon_button.isChecked(),
+                "moving_moon": self.moving_moon_checkbox.isChecked(),
+                "integrator": self.integrator_input.currentData(),
+                "rtol": float(self.rtol_input.text()),
+                "atol": float(self.atol_input.text()),
+                "log_every": int(self.log_every_input.text()),
+                "analytic": self.analytic_checkbox.isChecked(),
+            }
+
+            # A run with the same inputs has been done before, so show its stored result
+            result = self.cache.get(case)
+            if result is not None:
+                self.show_result(result)
+                return
+
+            # Initialize rocket, with celestial parameters based on user selected simulation type
+            h, time_target, log_every = case["h"], case["duration"], case["log_every"]
+            self.rocket = Rocket(
+                case["mass"], case["x"], case["y"], case["vx"], case["vy"], 0, integrator=case["integrator"],
+                rtol=case["rtol"], atol=case["atol"], log_every=log_every,
+                capacity=Trajectory.capacity_for(time_target, h, log_every)
+            )
+            runner = SimulationRunner(
+                self.rocket, h, time_target, include_moon=case["moon"], moving_moon=case["moving_moon"],
+                analytic=case["analytic"]
+            )
+
+        except ValueError as e:
+            # Display invalid input message in the status bar
+            self.statusBar().showMessage("Invalid input. Please enter valid numerical values.")
+            return
+
+        self.case = case
+        self.start_run(runner)
+
+    @pyqtSlot()
+    def continue_simulation(self):
+        """Continues the latest run from where it ended up to the total simulation time, integrating only the new span."""
+        if self.simulation_thread is not None:
+            return
+
+        try:
             time_target = float(self.simulation_time_input.text())
+            if self.runner is not None:
+                # The run is still in memory, so the integrator carries on exactly where it stopped
+                runner = self.runner
+                runner.extend(time_target)
+            elif self.result is not None:
+                runner = SimulationRunner.from_logs(
+                    self.result.data, self.result.header, time_target, event_log=self.result.events
+                )
+            else:
+                return
+        except ValueError as e:
+            self.statusBar().showMessage(f"Cannot continue: {e}")
+            return
+
+        self.crash_message_label.setText("")
+        self.case = None
+        self.start_run(runner)
 
-            # Set celestial parameters based on user selected simulation type
-            if self.earth_button.isChecked():
-                planet_mass = EARTH_MASS
-                moon_mass = 0
-                moon_distance = 0
+    @pyqtSlot()
+    def branch_simulation(self):
+        """
+        Starts a new run from the last sample of the latest run at or before the branch time, with the burn applied
+        and the current mass, time step and integrator settings, up to the total simulation time.
+        """
+        if self.simulation_thread is not None:
+            return
+
+        try:
+            time = float(self.branch_time_input.text())
+            time_target = float(self.simulation_time_input.text())
+            changes = {
+                "mass": float(self.mass_input.text()),
+                "h": float(self.time_step_input.text()),
+                "delta_v": (float(self.burn_vx_input.text()), float(self.burn_vy_input.text())),
+                "integrator": self.integrator_input.currentData(),
+                "rtol": float(self.rtol_input.text()),
+                "atol": float(self.atol_input.text()),
+            }
+            if self.runner is not None:
+                runner = self.runner.branch(time, time_target, **changes)
+            elif self.result is not None:
+                runner = SimulationRunner.from_logs(
+                    self.result.data, self.result.header, time_target, time=time, event_log=self.result.events,
+                    **changes
+                )
             else:
-                planet_mass = EARTH_MASS
-                moon_mass = MOON_MASS
-                moon_distance = MOON_DISTANCE
-
-            # Initialize rocket
-            self.rocket = Rocket(mass, x, y, vx, vy, 0)
-            self.rocket.initialize_energies(G_CONSTANT, planet_mass, moon_mass, moon_distance)
-
-            # Run the simulation up until the user defined end time, unless rocket's update position and velocity method detects crash
-            while self.rocket.time_log[-1] < time_target:
-                try:
-                    self.rocket.update_position_and_velocity(
-                        G = G_CONSTANT,
-                        h = h,
-                        Mass_Earth = planet_mass,
-                        Mass_Moon = moon_mass,
-                        Moon_Distance = moon_distance,
-                        Earth_Radius = EARTH_RADIUS,
-                        Moon_Radius = MOON_RADIUS
-                    )
-                except ValueError as e:
-                    # Display the crash message and stop the simulation
-                    self.crash_message_label.setText(str(e))
-                    break
-
-            # Plot results
-            self.plot_simulation()
+                return
+        except ValueError as e:
+            self.statusBar().showMessage(f"Cannot branch: {e}")
+            return
 
+        self.crash_message_label.setText("")
+        self.case = None
+        self.start_run(runner)
+
+    @pyqtSlot()
+    def solve_velocity(self):
+        """
+        Solves for the initial velocity that meets the target on a background thread, starting from the velocity inputs.
+
+        Only the speed is varied, keeping the direction of the velocity inputs. Trial trajectories are propagated
+        with Runge-Kutta 4 at the current time step until they reach the targeted event.
+        """
+        if self.simulation_thread is not None:
+            return
+
+        try:
+            kind = self.target_input.currentData()
+            value = float(self.target_value_input.text())
+            if kind == "apoapsis":
+                target = ApoapsisAltitude(value * 1e3)
+            elif kind == "moon_periapsis":
+                target = PeriapsisAltitude(value * 1e3)
+            else:
+                target = ImpactAngle(value)
+            solver = TargetingSolver(
+                [target], float(self.mass_input.text()), float(self.x_input.text()), float(self.y_input.text()),
+                float(self.time_step_input.text()), include_moon=self.earth_moon_button.isChecked(), moving_moon=self.moving_moon_checkbox.isChecked()
+            )
+            velocity_x = float(self.vx_input.text())
+            velocity_y = float(self.vy_input.text())
         except ValueError as e:
-            # Display invalid input message in the status bar
-            self.statusBar().showMessage("Invalid input. Please enter valid numerical values.")
+            self.statusBar().showMessage(f"Cannot solve: {e}")
+            return
+
+        self.crash_message_label.setText("")
+        self.progress_bar.setValue(0)
+        self.statusBar().showMessage("Solving for velocity...")
+        self.set_running(True)
+
+        self.simulation_thread = QThread()
+        self.simulation_worker = TargetingWorker(solver, velocity_x, velocity_y)
+        self.simulation_worker.moveToThread(self.simulation_thread)
+        self.simulation_thread.started.connect(self.simulation_worker.run)
+        self.simulation_worker.iteration.connect(self.on_solver_iteration)
+        self.simulation_worker.finished.connect(self.on_solve_finished)
+        self.simulation_worker.failed.connect(self.on_solve_failed)
+        self.simulation_thread.start()
+
+    @pyqtSlot(dict)
+    def on_solver_iteration(self, record: dict):
+        """Shows the progress of the solver and the wall time of its latest iteration."""
+        solver = self.simulation_worker.solver
+        self.progress_bar.setValue(int(record["iteration"] / solver.max_iterations * self.progress_bar.maximum()))
+        self.steps_per_second_label.setText(
+            f"Iteration {record['iteration']}: error {record['error']:.3g} tolerances, "
+            f"{record['members']} trajectories in {record['seconds'] * 1000:,.0f} ms"
+        )
+
+    @pyqtSlot(object)
+    def on_solve_finished(self, result):
+        """Fills in the velocity found and reports the timing of the solver's iterations."""
+        self.stop_worker()
+        self.set_running(False)
+        self.vx_input.setText(f"{result.velocity_x:.6f}")
+        self.vy_input.setText(f"{result.velocity_y:.6f}")
+
+        iterations = len(result.iterations) - 1
+        timing = f"{iterations} iterations in {result.seconds:.2f} s"
+        if iterations > 0:
+            mean = sum(record["seconds"] for record in result.iterations[1:]) / iterations
+            timing += f", {mean * 1000:,.0f} ms per iteration"
+        if result.converged:
+            self.statusBar().showMessage(f"Solved for velocity in {timing}. Run the simulation to plot it.")
+        else:
+            self.statusBar().showMessage(f"Target not met after {timing}: {result.message}")
+
+    @pyqtSlot(str)
+    def on_solve_failed(self, message: str):
+        """Reports why the solver could not start."""
+        self.stop_worker()
+        self.set_running(False)
+        self.statusBar().showMessage(f"Cannot solve: {message}")
+
+    def start_run(self, runner: SimulationRunner):
+        """
+        Run a simulation up until its end time on a worker thread, unless a crash is detected.
+
+        Parameters:
+            runner (SimulationRunner): The run, whose rocket may already hold logs from an earlier run.
+        """
+        self.runner = runner
+        self.rocket = runner.rocket
+        self.field = runner.field
+        self.system = None
+        self.result = None
+        self.logged_samples = 0
+        self.progress_bar.setValue(0)
+        self.statusBar().showMessage("Running simulation...")
+
+        # Each run gets a fresh profile
+        self.profiler = Profiler() if self.profile_checkbox.isChecked() else None
+        runner.set_profiler(self.profiler)
+        self.plot.set_profiler(self.profiler)
+        self.set_running(True)
+
+        self.simulation_thread = QThread()
+        self.simulation_worker = SimulationWorker(runner)
+        self.simulation_worker.moveToThread(self.simulation_thread)
+        self.simulation_thread.started.connect(self.simulation_worker.run)
+        self.simulation_worker.chunk_ready.connect(self.on_chunk_ready)
+        self.simulation_worker.progress.connect(self.on_progress)
+        self.simulation_worker.finished.connect(self.on_simulation_finished)
+        self.simulation_worker.failed.connect(self.on_simulation_failed)
+        self.simulation_thread.start()
+
+    @pyqtSlot()
+    def cancel_simulation(self):
+        """Asks the running simulation to stop, keeping what has been computed so far."""
+        if self.simulation_worker is not None:
+            self.simulation_worker.cancel()
+
+    @pyqtSlot(int)
+    def on_chunk_ready(self, logged_samples: int):
+        """Plots the samples the worker has logged so far."""
+        self.logged_samples = logged_samples
+        self.plot_simulation()
+
+    @pyqtSlot(float, float)
+    def on_progress(self, fraction: float, steps_per_second: float):
+        """Updates the progress bar and the steps per second readout."""
+        self.progress_bar.setValue(int(fraction * self.progress_bar.maximum()))
+        self.steps_per_second_label.setText(f"{steps_per_second:,.0f} steps/s")
+
+    @pyqtSlot(str)
+    def on_simulation_finished(self, crash_message: str):
+        """Reports the outcome of the run and releases the worker thread."""
+        runner = self.simulation_worker.runner
+        self.crash_message_label.setText(crash_message)
+
+        # Only complete runs started from the inputs are cached, a cancelled or continued one can still be saved
+        self.result = SimulationResult.from_runner(self.case, runner)
+        if runner.finished and self.case is not None:
+            self.cache.put(self.case, self.result)
+
+        # Report the energy drift per orbit so integrators can be compared
+        drift = runner.energy_drift_per_orbit()
+        if not runner.finished:
+            messages = [f"Simulation cancelled at t = {self.rocket.time:.0f} s."]
+        elif runner.analytic:
+            messages = [ANALYTIC_MESSAGE]
+        elif drift is None:
+            messages = []
+        else:
+            messages = [f"Relative energy drift per orbit: {drift:.3e}"]
+
+        # Followed by where the time went, if the run was profiled
+        if runner.profiler is not None:
+            messages.append(runner.profiler.summary())
+        self.statusBar().showMessage("  ".join(messages))
+
+        self.stop_worker()
+        self.set_running(False)
+
+    @pyqtSlot(str)
+    def on_simulation_failed(self, message: str):
+        """Reports the error that stopped the run, which is kept on screen but cannot be continued or saved."""
+        self.runner = None
+        self.result = None
+        self.stop_worker()
+        self.set_running(False)
+        self.statusBar().showMessage(f"Simulation failed: {message}")
+
+    def stop_worker(self):
+        """Releases the worker thread once its job has finished."""
+        self.simulation_thread.quit()
+        self.simulation_thread.wait()
+        self.simulation_thread = None
+        self.simulation_worker = None
+
+    def set_running(self, running: bool):
+        """
+        Enable the buttons that apply while a run is in progress, or once it has ended.
+
+        Parameters:
+            running (bool): Whether a run is in progress.
+        """
+        has_run = self.runner is not None or self.result is not None
+        self.run_button.setEnabled(not running)
+        self.cancel_button.setEnabled(running)
+        self.continue_button.setEnabled(not running and has_run)
+        self.branch_button.setEnabled(not running and has_run)
+        self.solve_button.setEnabled(not running)
+        self.save_button.setEnabled(not running and has_run)
+        self.open_button.setEnabled(not running)
+        self.scenario_button.setEnabled(not running)
+        self.export_profile_button.setEnabled(not running and self.profiler is not None)
+
+    def show_result(self, result: SimulationResult):
+        """
+        Plot a stored result in place of running the simulation.
+
+        Parameters:
+            result (SimulationResult): The result of a run with the current inputs.
+        """
+        self.runner = None
+        self.rocket = None
+        self.system = None
+        self.logged_samples = 0
+        self.result = result
+        self.field = GravityField.earth_moon(result.case["moon"], result.case["moving_moon"])
+        self.plot.set_data(result.data, self.field, result.events)
+        self.crash_message_label.setText(result.crash_message or "")
+        self.progress_bar.setValue(self.progress_bar.maximum())
+        self.steps_per_second_label.setText("")
+        self.set_running(False)
+
+        message = f"Loaded a stored run of {len(result.data)} samples."
+        if result.header["integrator"].get("analytic", False):
+            message += f" {ANALYTIC_MESSAGE}"
+        elif result.energy_drift_per_orbit is not None:
+            message += f" Relative energy drift per orbit: {result.energy_drift_per_orbit:.3e}"
+        self.statusBar().showMessage(message)
+
+    @pyqtSlot()
+    def save_run(self):
+        """Writes the latest run to a trajectory file chosen by the user."""
+        path, _ = QFileDialog.getSaveFileName(self, "Save Run", "", "Trajectory files (*.traj)")
+        if not path:
+            return
+        self.result.save(path)
+        self.statusBar().showMessage(f"Saved {len(self.result.data)} samples to {path}.")
+
+    @pyqtSlot(int)
+    def on_integrator_selected(self, index: int):
+        """Integrates the following runs instead of solving them analytically, so the selected integrator is used."""
+        self.analytic_checkbox.setChecked(False)
+
+    @pyqtSlot(bool)
+    def toggle_profiling(self, checked: bool):
+        """Starts or stops profiling the run in progress, the next run follows the checkbox either way."""
+        if not isinstance(self.simulation_worker, SimulationWorker) or self.system is not None:
+            return
+        if checked and self.profiler is None:
+            self.profiler = Profiler()
+        profiler = self.profiler if checked else None
+        self.simulation_worker.runner.set_profiler(profiler)
+        self.plot.set_profiler(profiler)
+
+    @pyqtSlot()
+    def export_profile(self):
+        """Writes the profile of the latest run as a JSON report or a Chrome trace, chosen by the file type."""
+        report_filter, trace_filter = "Profile report (*.json)", "Chrome trace (*.json)"
+        path, selected_filter = QFileDialog.getSaveFileName(
+            self, "Export Profile", "", f"{report_filter};;{trace_filter}"
+        )
+        if not path:
+            return
+        try:
+            if selected_filter == trace_filter:
+                self.profiler.export_chrome_trace(path)
+            else:
+                self.profiler.export_json(path)
+        except OSError as e:
+            self.statusBar().showMessage(f"Could not export the profile: {e}")
+            return
+        self.statusBar().showMessage(f"Exported the profile to {path}.")
+
+    @pyqtSlot()
+    def open_run(self):
+        """Plots a run from a trajectory file chosen by the user."""
+        path, _ = QFileDialog.getOpenFileName(self, "Open Run", "", "Trajectory files (*.traj)")
+        if not path:
+            return
+        self.replay(path)
+
+    def replay(self, path: str, start_time: float = None, end_time: float = None):
+        """
+        Plot a run, or a time window of it, from a trajectory file.
+
+        Only the window is read from the memory-mapped file, with a stride if it holds more samples than are worth plotting.
+
+        Parameters:
+            path (str): Path of the trajectory file.
+            start_time (float): Start of the window (s), defaults to the start of the run.
+            end_time (float): End of the window (s), defaults to the end of the run.
+        """
+        try:
+            trajectory_file = TrajectoryFile(path)
+        except (OSError, ValueError) as e:
+            self.statusBar().showMessage(f"Could not open {path}: {e}")
+            return
+
+        header = trajectory_file.header
+        if start_time is None:
+            start_time = header["initial_conditions"]["time"]
+        if end_time is None:
+            end_time = float("inf")
+        logs = trajectory_file.window(start_time, end_time, max_samples=self.REPLAY_SAMPLES)
+        events = [EventRecord.from_dict(values) for values in trajectory_file.events()
+                  if start_time <= values["time"] <= end_time]
+        trajectory_file.close()
+        if logs.shape[0] == 0:
+            self.statusBar().showMessage(f"No samples in {path} within the time window.")
+            return
+
+        # The plotted run no longer matches a rocket, so there is nothing to save or continue until the next run
+        self.runner = None
+        self.rocket = None
+        self.system = None
+        self.result = None
+        self.logged_samples = 0
+        self.set_running(False)
+        self.crash_message_label.setText("")
+        self.field = GravityField.earth_moon(header["include_moon"], header["moving_moon"])
+        self.plot.set_data(logs, self.field, events)
+        self.statusBar().showMessage(f"Replaying {path}: {len(trajectory_file)} samples.")
+
+    @pyqtSlot()
+    def open_scenario(self):
+        """Runs a multi-body scenario from a JSON file chosen by the user, see simulation.nbody."""
+        path, _ = QFileDialog.getOpenFileName(self, "Open Scenario", "scenarios", "Scenario files (*.json)")
+        if not path:
+            return
+        try:
+            simulation = NBodySimulation.from_config(path)
+        except (OSError, ValueError) as e:
+            self.statusBar().showMessage(f"Could not open {path}: {e}")
+            return
+        self.start_scenario(simulation)
+
+    def start_scenario(self, simulation: NBodySimulation):
+        """
+        Run a multi-body simulation up until its end time on a worker thread, plotting every body and vehicle.
+
+        Parameters:
+            simulation (NBodySimulation): The simulation.
+        """
+        # There is no rocket's run to save, continue or profile until the next run
+        self.runner = None
+        self.rocket = None
+        self.field = None
+        self.result = None
+        self.system = simulation
+        self.logged_samples = 0
+        self.profiler = None
+        self.plot.set_profiler(None)
+        self.crash_message_label.setText("")
+        self.progress_bar.setValue(0)
+        self.statusBar().showMessage(
+            f"Running {simulation.name}: {simulation.body_count} bodies and {simulation.vehicle_count} vehicles..."
+        )
+        self.set_running(True)
+
+        self.simulation_thread = QThread()
+        self.simulation_worker = SimulationWorker(simulation)
+        self.simulation_worker.moveToThread(self.simulation_thread)
+        self.simulation_thread.started.connect(self.simulation_worker.run)
+        self.simulation_worker.chunk_ready.connect(self.on_scenario_chunk_ready)
+        self.simulation_worker.progress.connect(self.on_progress)
+        self.simulation_worker.finished.connect(self.on_scenario_finished)
+        self.simulation_worker.failed.connect(self.on_simulation_failed)
+        self.simulation_thread.start()
+
+    @pyqtSlot(int)
+    def on_scenario_chunk_ready(self, logged_samples: int):
+        """Plots the samples of the multi-body simulation logged so far."""
+        self.logged_samples = logged_samples
+        if self.system is None or logged_samples == 0:
+            return
+        self.plot.set_system(self.system.logs(logged_samples), self.system.body_names, self.system.vehicle_names)
+
+    @pyqtSlot(str)
+    def on_scenario_finished(self, crash_message: str):
+        """Reports the crashes and energy conservation of the multi-body simulation and releases the worker thread."""
+        simulation = self.system
+        crashes = simulation.crashes()
+        if crash_message:
+            self.crash_message_label.setText(crash_message)
+        elif crashes:
+            self.crash_message_label.setText(f"{len(crashes)} of {simulation.vehicle_count} vehicles crashed.")
+
+        if not simulation.finished:
+            message = f"Simulation cancelled at t = {simulation.time:.0f} s."
+        else:
+            message = f"Relative energy error of the bodies: {simulation.energy_error():.3e}"
+        self.statusBar().showMessage(message)
+
+        self.stop_worker()
+        self.set_running(False)
+
+    def closeEvent(self, event):
+        """Stops a running simulation before the window closes."""
+        if self.simulation_thread is not None:
+            self.simulation_worker.cancel()
+            self.simulation_thread.quit()
+            self.simulation_thread.wait()
+        super().closeEvent(event)
 
     def toggle_view(self):
         """Toggles between trajectory view and energy view."""
@@ -177,63 +772,12 @@ class MainWindow(QMainWindow):
         else:
             self.current_view = "trajectory"
             self.toggle_view_button.setText("Switch to Energy View")
-        self.plot_simulation()
+        self.plot.show_view(self.current_view)
 
     def plot_simulation(self):
         """Plots the simulation based on the current view."""
-        self.canvas.figure.clear()
-        ax = self.canvas.figure.add_subplot(111)
-
-        if self.current_view == "trajectory":
-            # Plot the Earth
-            earth_texture_path = "Resources/earth_texture.png"
-            earth_img = mpimg.imread(earth_texture_path)
-            ax.imshow(
-                earth_img,
-                extent=[-EARTH_RADIUS, EARTH_RADIUS, -EARTH_RADIUS, EARTH_RADIUS],
-                zorder=1,
-            )
-
-            # Plot the Moon if applicable
-            if self.earth_moon_button.isChecked():
-                moon_texture_path = "Resources/moon_texture.png"
-                moon_img = mpimg.imread(moon_texture_path)
-                ax.imshow(
-                    moon_img,
-                    extent=[
-                        MOON_DISTANCE - MOON_RADIUS,
-                        MOON_DISTANCE + MOON_RADIUS,
-                        -MOON_RADIUS,
-                        MOON_RADIUS,
-                    ],
-                    zorder=1,
-                )
+        if self.rocket is None or self.logged_samples == 0:
+            return
 
-            # Plot the rocket's trajectory
-            ax.plot(self.rocket.x_log, self.rocket.y_log, color="red", label="Rocket Trajectory", zorder=2)
-            ax.set_title("Rocket Trajectory")
-            ax.set_xlabel("x-coordinate (m)")
-            ax.set_ylabel("y-coordinate (m)")
-            ax.legend()
-
-            x_min, x_max = min(self.rocket.x_log), max(self.rocket.x_log)
-            y_min, y_max = min(self.rocket.y_log), max(self.rocket.y_log)
-
-            x_padding = 0.1 * (x_max - x_min)
-            y_padding = 0.1 * (y_max - y_min)
-
-            ax.set_xlim(x_min - x_padding, x_max + x_padding)
-            ax.set_ylim(y_min - y_padding, y_max + y_padding)
-            ax.set_aspect("equal", adjustable="datalim")
-
-        elif self.current_view == "energy":
-            # Plot the rocket's energies
-            ax.plot(self.rocket.time_log, self.rocket.ke_log, color="blue", label="Kinetic Energy")
-            ax.plot(self.rocket.time_log, self.rocket.gpe_log, color="green", label="Potential Energy")
-            ax.plot(self.rocket.time_log, self.rocket.total_energy_log, color="purple", label="Total Energy")
-            ax.set_title("Energy vs Time")
-            ax.set_xlabel("Time (s)")
-            ax.set_ylabel("Energy (J)")
-            ax.legend()
-
-        self.canvas.draw()
+        # Only the samples the worker has reported are plotted, later ones may still be written
+        self.plot.set_data(self.rocket.trajectory.data[:self.logged_samples], self.field, self.rocket.event_log)
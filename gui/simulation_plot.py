@@ -0,0 +1,476 @@
+import functools
+
+import matplotlib.image as mpimg
+import matplotlib.pyplot as plt
+import numpy as np
+from PyQt6.QtCore import QTimer
+
+from simulation.planet_constants import EARTH_RADIUS, MOON_RADIUS
+
+EARTH_TEXTURE_PATH = "Resources/earth_texture.png"
+MOON_TEXTURE_PATH = "Resources/moon_texture.png"
+
+# Energies of a multi-body simulation, laid out like the rocket's logs for the energy view
+_SYSTEM_ENERGY_DTYPE = np.dtype([("time", "f8"), ("ke", "f8"), ("gpe", "f8"), ("total_energy", "f8")])
+
+
+@functools.lru_cache(maxsize=None)
+def load_texture(path: str) -> np.ndarray:
+    """
+    Decode an image texture, once per process.
+
+    Parameters:
+        path (str): Path of the image file.
+
+    Returns:
+        np.ndarray: The decoded image.
+    """
+    return mpimg.imread(path)
+
+
+def minmax_indices(values: np.ndarray, start: int, stop: int, columns: int) -> np.ndarray:
+    """
+    Select the samples of a time series that keep its shape at a given horizontal resolution.
+
+    The samples between start and stop are split into one bucket per pixel column, and the
+    minimum and maximum of every bucket are kept, so peaks survive the decimation.
+
+    Parameters:
+        values (np.ndarray): The series.
+        start (int): Index of the first visible sample.
+        stop (int): Index past the last visible sample.
+        columns (int): Number of pixel columns the samples are drawn across.
+
+    Returns:
+        np.ndarray: Indices of the kept samples, in order.
+    """
+    count = stop - start
+    if count <= 2 * columns:
+        return np.arange(start, stop)
+
+    size = -(-count // columns)
+    padded = np.empty(columns * size)
+    padded[:count] = values[start:stop]
+    padded[count:] = values[stop - 1]
+    buckets = padded.reshape(columns, size)
+    offsets = start + size * np.arange(columns)
+    kept = np.concatenate([offsets + buckets.argmin(axis=1), offsets + buckets.argmax(axis=1), [start, stop - 1]])
+    return np.unique(np.minimum(kept, stop - 1))
+
+
+def decimate_curve(x: np.ndarray, y: np.ndarray, xlim: tuple, ylim: tuple, width: int, height: int) -> tuple:
+    """
+    Reduce a curve to the points that keep its shape at the resolution of the current view.
+
+    Every point is binned into the pixel it falls in, with points outside the view binned
+    into the band beyond the nearest edge. Only the first and last point of each run of
+    consecutive points in the same bin are kept, so the line drawn between them stays within
+    the bin. Repeated segments between the same pair of bins, as drawn on every revolution
+    of a long orbit, are only kept once, and the curve is broken with NaN where they were
+    dropped.
+
+    Parameters:
+        x (np.ndarray): x-coordinates of the curve.
+        y (np.ndarray): y-coordinates of the curve.
+        xlim (tuple): Visible x range.
+        ylim (tuple): Visible y range.
+        width (int): Width of the view in pixels.
+        height (int): Height of the view in pixels.
+
+    Returns:
+        tuple: The x and y coordinates to draw.
+    """
+    if x.shape[0] <= 2:
+        return x, y
+
+    column = np.clip(np.floor((x - xlim[0]) * (width / (xlim[1] - xlim[0]))), -1, width).astype(np.int64)
+    row = np.clip(np.floor((y - ylim[0]) * (height / (ylim[1] - ylim[0]))), -1, height).astype(np.int64)
+    cell = (row + 1) * (width + 2) + (column + 1)
+
+    # First and last point of every run in the same bin
+    changed = np.diff(cell) != 0
+    keep = np.ones(x.shape[0], dtype=bool)
+    keep[1:-1] = changed[:-1] | changed[1:]
+    points = np.flatnonzero(keep)
+    cell = cell[points]
+
+    # First segment between every pair of bins, in either direction
+    cells = (width + 2) * (height + 2)
+    segment = np.minimum(cell[:-1], cell[1:]) * cells + np.maximum(cell[:-1], cell[1:])
+    drawn = np.zeros(segment.shape[0], dtype=bool)
+    drawn[np.unique(segment, return_index=True)[1]] = True
+
+    used = np.zeros(points.shape[0], dtype=bool)
+    used[:-1] |= drawn
+    used[1:] |= drawn
+    # A used point not joined to the previous point starts a new piece of the curve
+    starts = np.flatnonzero(used[1:] & ~drawn) + 1
+    breaks = np.searchsorted(np.flatnonzero(used), starts)
+    kept = points[used]
+    return np.insert(x[kept], breaks, np.nan), np.insert(y[kept], breaks, np.nan)
+
+
+class SimulationPlot:
+    """
+    Draws the trajectory and energy views of a run on a matplotlib canvas.
+
+    Both views keep their axes and artists for the lifetime of the window, so streaming a
+    run, re-running and toggling views only replace line data. Besides a rocket's run, the
+    trajectory view can show the paths of every body and vehicle of a multi-body
+    simulation, see set_system. Long logs are decimated to
+    what the view can resolve, and the decimation is recomputed when the view is zoomed or
+    panned from the navigation toolbar.
+    """
+
+    def __init__(self, canvas):
+        """
+        Initialize the axes and artists of both views.
+
+        Parameters:
+            canvas (FigureCanvas): The canvas to draw on.
+        """
+        self.canvas = canvas
+        figure = canvas.figure
+
+        # Latest logs, field and events to plot
+        self.logs = None
+        self.field = None
+        self.events = []
+        # Latest logs of a multi-body simulation and the names of its bodies and vehicles, see set_system
+        self.system = None
+        self._system_names = None
+        self.current_view = "trajectory"
+        self._stale_views = set()
+        self._decimated_limits = {}
+        self._refresh_pending = False
+        self._updating = False
+
+        # Optional Profiler timing plot updates and draws, see set_profiler
+        self.profiler = None
+
+        # Trajectory view
+        self.trajectory_axes = figure.add_subplot(111)
+        self.trajectory_axes.set_title("Rocket Trajectory")
+        self.trajectory_axes.set_xlabel("x-coordinate (m)")
+        self.trajectory_axes.set_ylabel("y-coordinate (m)")
+        self.earth_image = self.trajectory_axes.imshow(
+            load_texture(EARTH_TEXTURE_PATH),
+            extent=[-EARTH_RADIUS, EARTH_RADIUS, -EARTH_RADIUS, EARTH_RADIUS],
+            zorder=1,
+        )
+        self.moon_image = self.trajectory_axes.imshow(
+            load_texture(MOON_TEXTURE_PATH), extent=[-MOON_RADIUS, MOON_RADIUS, -MOON_RADIUS, MOON_RADIUS], zorder=1
+        )
+        self.moon_image.set_visible(False)
+        self.moon_path_line, = self.trajectory_axes.plot([], [], color="grey", linestyle="--", label="Moon Path", zorder=1)
+        self.trajectory_line, = self.trajectory_axes.plot([], [], color="red", label="Rocket Trajectory", zorder=2)
+        self.event_markers, = self.trajectory_axes.plot(
+            [], [], color="black", marker="x", linestyle="none", label="Events", zorder=3
+        )
+        self._rocket_artists = (self.earth_image, self.moon_image, self.moon_path_line, self.trajectory_line, self.event_markers)
+
+        # Paths and current positions of a multi-body simulation, created for each new set of bodies and vehicles
+        self.body_lines = []
+        self.body_markers = []
+        self.vehicle_lines = []
+        self.vehicle_markers = None
+
+        # Energy view
+        self.energy_axes = figure.add_subplot(111, label="energy")
+        self.energy_axes.set_title("Energy vs Time")
+        self.energy_axes.set_xlabel("Time (s)")
+        self.energy_axes.set_ylabel("Energy (J)")
+        self.energy_lines = {
+            "ke": self.energy_axes.plot([], [], color="blue", label="Kinetic Energy")[0],
+            "gpe": self.energy_axes.plot([], [], color="green", label="Potential Energy")[0],
+            "total_energy": self.energy_axes.plot([], [], color="purple", label="Total Energy")[0],
+        }
+        self.energy_axes.legend(loc="upper right")
+
+        # Nothing is shown until there is data to plot
+        self.trajectory_axes.set_visible(False)
+        self.energy_axes.set_visible(False)
+
+        # Recompute the decimation when the user zooms or pans
+        for axes in (self.trajectory_axes, self.energy_axes):
+            axes.callbacks.connect("xlim_changed", self._on_limits_changed)
+            axes.callbacks.connect("ylim_changed", self._on_limits_changed)
+
+    def set_data(self, logs: np.ndarray, field=None, events: list = None) -> None:
+        """
+        Plot new logs, e.g. streamed from a running simulation, fitting the view to them.
+
+        Parameters:
+            logs (np.ndarray): Structured trajectory samples, see simulation.trajectory.TRAJECTORY_DTYPE.
+            field (GravityField): The field of the run, whose Moon is drawn if it has one.
+            events (list): The EventRecords to mark on the trajectory.
+        """
+        self.logs = logs
+        self.field = field
+        self.events = events or []
+        self.system = None
+        self._stale_views = {"trajectory", "energy"}
+        self._decimated_limits = {}
+        self.show_view(self.current_view)
+
+    def set_system(self, logs: dict, body_names: list, vehicle_names: list) -> None:
+        """
+        Plot the logs of a multi-body simulation, fitting the view to the paths of all bodies and vehicles.
+
+        Parameters:
+            logs (dict): The logged samples, see simulation.nbody.NBodySimulation.logs.
+            body_names (list[str]): Names of the bodies, in the order of the logs' columns.
+            vehicle_names (list[str]): Names of the vehicles, in the order of the logs' columns.
+        """
+        energies = np.empty(logs["time"].shape[0], dtype=_SYSTEM_ENERGY_DTYPE)
+        for name in _SYSTEM_ENERGY_DTYPE.names:
+            energies[name] = logs[name]
+
+        names = (tuple(body_names), tuple(vehicle_names))
+        if names != self._system_names:
+            self._create_system_artists(*names)
+        self.system = logs
+        self.logs = energies
+        self.field = None
+        self.events = []
+        self._stale_views = {"trajectory", "energy"}
+        self._decimated_limits = {}
+        self.show_view(self.current_view)
+
+    def _create_system_artists(self, body_names: tuple, vehicle_names: tuple) -> None:
+        """
+        (Private) Replace the artists of the previous multi-body simulation with ones for these bodies and vehicles.
+        """
+        for artist in self.body_lines + self.body_markers + self.vehicle_lines + [self.vehicle_markers]:
+            if artist is not None:
+                artist.remove()
+
+        axes = self.trajectory_axes
+        colors = plt.rcParams["axes.prop_cycle"].by_key()["color"]
+        self.body_lines, self.body_markers = [], []
+        for index, name in enumerate(body_names):
+            color = colors[index % len(colors)]
+            self.body_lines.append(axes.plot([], [], color=color, label=name, zorder=2)[0])
+            self.body_markers.append(axes.plot([], [], color=color, marker="o", markersize=8, linestyle="none", zorder=4)[0])
+        # Vehicles share a colour, and a single legend entry
+        self.vehicle_lines = [
+            axes.plot([], [], color="red", linewidth=0.8, alpha=0.6, label="Vehicles" if index == 0 else None, zorder=1)[0]
+            for index in range(len(vehicle_names))
+        ]
+        self.vehicle_markers, = axes.plot([], [], color="red", marker=".", linestyle="none", zorder=3)
+        self._system_names = (body_names, vehicle_names)
+
+    def set_profiler(self, profiler) -> None:
+        """
+        Time plot updates and canvas draws with a profiler, see simulation.profiling.
+
+        Parameters:
+            profiler (Profiler): The profiler, or None to stop profiling.
+        """
+        self.profiler = profiler
+        vars(self.canvas).pop("draw", None)
+        if profiler is not None:
+            draw = type(self.canvas).draw.__get__(self.canvas)
+
+            def timed_draw(*args, **kwargs):
+                with profiler.span("render"):
+                    return draw(*args, **kwargs)
+
+            self.canvas.draw = timed_draw
+
+    def show_view(self, view: str) -> None:
+        """
+        Switch between the 'trajectory' and 'energy' views.
+
+        Parameters:
+            view (str): The view to show.
+        """
+        self.current_view = view
+        if self.logs is None:
+            return
+        self.trajectory_axes.set_visible(view == "trajectory")
+        self.energy_axes.set_visible(view == "energy")
+        if view in self._stale_views:
+            self._update_view()
+        else:
+            self.canvas.draw_idle()
+
+    def _update_view(self) -> None:
+        """
+        (Private) Replace the data of the current view's artists and fit the view to it.
+        """
+        if self.logs is None or self.logs.shape[0] == 0:
+            return
+        self._stale_views.discard(self.current_view)
+        profiler = self.profiler
+        start = profiler.start() if profiler is not None else 0.0
+
+        self._updating = True
+        try:
+            if self.current_view == "trajectory":
+                self._update_trajectory()
+            else:
+                self._update_energy()
+        finally:
+            self._updating = False
+        self._decimate()
+        if profiler is not None:
+            profiler.add_span("plot", start, samples=self.logs.shape[0])
+        self.canvas.draw_idle()
+
+    def _update_trajectory(self) -> None:
+        """
+        (Private) Update the bodies and events of the trajectory view and fit it to the trajectory.
+        """
+        logs = self.logs
+        axes = self.trajectory_axes
+        system_artists = self.body_lines + self.body_markers + self.vehicle_lines + [self.vehicle_markers]
+        for artist in system_artists:
+            if artist is not None:
+                artist.set_visible(self.system is not None)
+        if self.system is not None:
+            self._update_system()
+            return
+        axes.set_title("Rocket Trajectory")
+        self.earth_image.set_visible(True)
+        self.trajectory_line.set_visible(True)
+        end_time = logs["time"][-1]
+
+        # Plot the Moon if applicable, at its position at the last plotted time
+        moon = next((body for body in self.field.bodies if body.name == "Moon"), None) if self.field is not None else None
+        self.moon_image.set_visible(moon is not None)
+        self.moon_path_line.set_visible(moon is not None and moon.ephemeris is not None)
+        if moon is not None:
+            moon_x, moon_y = moon.position(end_time)
+            self.moon_image.set_extent([moon_x - MOON_RADIUS, moon_x + MOON_RADIUS, moon_y - MOON_RADIUS, moon_y + MOON_RADIUS])
+
+            # Plot the path of a moving Moon over the run
+            if moon.ephemeris is not None:
+                self.moon_path_line.set_data(*moon.ephemeris.positions(np.linspace(logs["time"][0], end_time, 500)))
+
+        # Mark the apsis passages and sphere of influence crossings found up to the last plotted time
+        events = [record for record in list(self.events) if not record.terminal and record.time <= end_time]
+        self.event_markers.set_data([record.state[0] for record in events], [record.state[1] for record in events])
+        self.event_markers.set_visible(bool(events))
+
+        axes.legend(loc="upper right", handles=[artist for artist in (self.moon_path_line, self.trajectory_line, self.event_markers)
+                             if artist.get_visible()])
+
+        x_min, x_max = logs["x"].min(), logs["x"].max()
+        y_min, y_max = logs["y"].min(), logs["y"].max()
+
+        x_padding = 0.1 * (x_max - x_min)
+        y_padding = 0.1 * (y_max - y_min)
+
+        axes.set_xlim(x_min - x_padding, x_max + x_padding)
+        axes.set_ylim(y_min - y_padding, y_max + y_padding)
+        axes.set_aspect("equal", adjustable="datalim")
+
+    def _update_system(self) -> None:
+        """
+        (Private) Mark the current positions of a multi-body simulation and fit the view to all paths.
+        """
+        system = self.system
+        axes = self.trajectory_axes
+        axes.set_title("Multi-Body Trajectories")
+        for artist in self._rocket_artists:
+            artist.set_visible(False)
+
+        for index, marker in enumerate(self.body_markers):
+            marker.set_data([system["body_x"][-1, index]], [system["body_y"][-1, index]])
+        # Crashed vehicles have NaN positions and so no marker
+        self.vehicle_markers.set_data(system["x"][-1], system["y"][-1])
+        axes.legend(loc="upper right", handles=self.body_lines + self.vehicle_lines[:1])
+
+        x = np.concatenate([system["body_x"].ravel(), system["x"].ravel()])
+        y = np.concatenate([system["body_y"].ravel(), system["y"].ravel()])
+        x_min, x_max = np.nanmin(x), np.nanmax(x)
+        y_min, y_max = np.nanmin(y), np.nanmax(y)
+
+        # Bodies at rest without vehicles still get a view around them
+        x_padding = 0.1 * (x_max - x_min) or 1.0
+        y_padding = 0.1 * (y_max - y_min) or 1.0
+
+        axes.set_xlim(x_min - x_padding, x_max + x_padding)
+        axes.set_ylim(y_min - y_padding, y_max + y_padding)
+        axes.set_aspect("equal", adjustable="datalim")
+
+    def _update_energy(self) -> None:
+        """
+        (Private) Fit the energy view to the logged energies.
+        """
+        logs = self.logs
+        axes = self.energy_axes
+        time = logs["time"]
+        low = min(logs[name].min() for name in self.energy_lines)
+        high = max(logs[name].max() for name in self.energy_lines)
+        padding = 0.05 * (high - low) or 0.05 * abs(high) or 1.0
+
+        if time[-1] > time[0]:
+            axes.set_xlim(time[0], time[-1])
+        axes.set_ylim(low - padding, high + padding)
+
+    def _on_limits_changed(self, axes) -> None:
+        """
+        (Private) Schedule a new decimation once the view has settled after a zoom or pan.
+        """
+        if self._updating or self._refresh_pending:
+            return
+        self._refresh_pending = True
+        QTimer.singleShot(0, self._refresh_level_of_detail)
+
+    def _refresh_level_of_detail(self) -> None:
+        """
+        (Private) Decimate the current view again if its limits changed since the last decimation.
+        """
+        self._refresh_pending = False
+        profiler = self.profiler
+        start = profiler.start() if profiler is not None else 0.0
+        changed = self._decimate()
+        if profiler is not None:
+            profiler.add_span("plot", start, samples=0 if self.logs is None else self.logs.shape[0])
+        if changed:
+            self.canvas.draw_idle()
+
+    def _decimate(self) -> bool:
+        """
+        (Private) Set the line data of the current view to the samples it can resolve.
+
+        Returns:
+            bool: Whether the line data changed.
+        """
+        if self.logs is None or self.logs.shape[0] == 0:
+            return False
+
+        axes = self.trajectory_axes if self.current_view == "trajectory" else self.energy_axes
+        xlim, ylim = axes.get_xlim(), axes.get_ylim()
+        width = max(1, int(axes.bbox.width))
+        height = max(1, int(axes.bbox.height))
+        key = (self.logs.shape[0], xlim, ylim, width, height)
+        if self._decimated_limits.get(self.current_view) == key:
+            return False
+        self._decimated_limits[self.current_view] = key
+
+        logs = self.logs
+        if self.current_view == "trajectory" and self.system is not None:
+            system = self.system
+            for index, line in enumerate(self.body_lines):
+                line.set_data(*decimate_curve(system["body_x"][:, index], system["body_y"][:, index], xlim, ylim, width, height))
+            for index, line in enumerate(self.vehicle_lines):
+                x, y = system["x"][:, index], system["y"][:, index]
+                # A crashed vehicle's path ends at its crash, with NaN after it
+                if x.shape[0] and np.isnan(x[-1]):
+                    end = int(np.argmax(np.isnan(x)))
+                    x, y = x[:end], y[:end]
+                line.set_data(*decimate_curve(x, y, xlim, ylim, width, height))
+        elif self.current_view == "trajectory":
+            self.trajectory_line.set_data(*decimate_curve(logs["x"], logs["y"], xlim, ylim, width, height))
+        else:
+            # Only the visible time range, and one sample beyond each end, is drawn
+            time = logs["time"]
+            start = max(0, int(np.searchsorted(time, xlim[0])) - 1)
+            stop = min(time.shape[0], int(np.searchsorted(time, xlim[1], side="right")) + 1)
+            for name, line in self.energy_lines.items():
+                index = minmax_indices(logs[name], start, stop, width)
+                line.set_data(time[index], logs[name][index])
+        return True
@@ -0,0 +1,120 @@
+import time
+
+from PyQt6.QtCore import QObject, pyqtSignal, pyqtSlot
+
+
+class SimulationWorker(QObject):
+    """
+    Runs a SimulationRunner or NBodySimulation on a background thread and streams its progress back to the GUI.
+
+    The worker steps the run in small chunks so it can check for cancellation and emit
+    signals between them. Samples that have been logged are never modified again, so the
+    GUI can safely plot the first `logged` samples of the run's logs while the run continues.
+    """
+
+    # Number of logged samples available for plotting
+    chunk_ready = pyqtSignal(int)
+    # Fraction of the run completed and the current steps per second
+    progress = pyqtSignal(float, float)
+    # Crash message, empty if the run reached its end or was cancelled
+    finished = pyqtSignal(str)
+    # Message of the error that stopped the run
+    failed = pyqtSignal(str)
+
+    def __init__(self, runner, chunk_steps: int = 500, emit_interval: float = 0.25):
+        """
+        Initialize the worker.
+
+        Parameters:
+            runner (SimulationRunner | NBodySimulation): The run to perform.
+            chunk_steps (int): Number of steps between cancellation checks.
+            emit_interval (float): Minimum wall time between streamed updates (s).
+        """
+        super().__init__()
+        self.runner = runner
+        self.chunk_steps = chunk_steps
+        self.emit_interval = emit_interval
+        self.cancelled = False
+
+    def cancel(self):
+        """Requests the run to stop after the current chunk. Safe to call from the GUI thread."""
+        self.cancelled = True
+
+    @pyqtSlot()
+    def run(self):
+        """Steps the run to completion, emitting progress and streamed chunks along the way."""
+        start = time.perf_counter()
+        last_emit = start
+        # A continued run has taken steps before, only the new ones count towards the rate
+        start_steps = self.runner.steps
+        try:
+            while not self.cancelled and not self.runner.run_chunk(self.chunk_steps):
+                now = time.perf_counter()
+                if now - last_emit >= self.emit_interval:
+                    last_emit = now
+                    self.progress.emit(self.runner.progress, (self.runner.steps - start_steps) / (now - start))
+                    self.chunk_ready.emit(self.runner.logged_samples)
+        except Exception as e:
+            # Anything escaping the thread would leave the GUI waiting for the run forever
+            self.chunk_ready.emit(self.runner.logged_samples)
+            self.failed.emit(f"{type(e).__name__}: {e}")
+            return
+        finally:
+            self.runner.close()
+
+        elapsed = time.perf_counter() - start
+        steps = self.runner.steps - start_steps
+        self.progress.emit(self.runner.progress, steps / elapsed if elapsed > 0 else 0.0)
+        self.chunk_ready.emit(self.runner.logged_samples)
+        self.finished.emit(self.runner.crash_message or "")
+
+
+class TargetingWorker(QObject):
+    """
+    Runs a TargetingSolver on a background thread, reporting each iteration as it completes.
+    """
+
+    # Record of the latest iteration, see TargetingSolver.solve
+    iteration = pyqtSignal(dict)
+    # The TargetingResult
+    finished = pyqtSignal(object)
+    # Message of the error that prevented solving
+    failed = pyqtSignal(str)
+
+    def __init__(self, solver, velocity_x: float, velocity_y: float):
+        """
+        Initialize the worker.
+
+        Parameters:
+            solver (TargetingSolver): The solver to run.
+            velocity_x (float): Initial guess of the x-velocity (m/s).
+            velocity_y (float): Initial guess of the y-velocity (m/s).
+        """
+        super().__init__()
+        self.solver = solver
+        self.velocity_x = velocity_x
+        self.velocity_y = velocity_y
+        self.cancelled = False
+
+    def cancel(self):
+        """Requests the solver to stop after the current iteration. Safe to call from the GUI thread."""
+        self.cancelled = True
+
+    def on_iteration(self, record: dict) -> bool:
+        """Forwards an iteration to the GUI, and stops the solver once cancelled."""
+        self.iteration.emit(record)
+        return self.cancelled
+
+    @pyqtSlot()
+    def run(self):
+        """Solves from the initial guess, emitting every iteration and then the result."""
+        try:
+            result = self.solver.solve(self.velocity_x, self.velocity_y, callback=self.on_iteration)
+        except ValueError as e:
+            self.failed.emit(str(e))
+            return
+        except Exception as e:
+            # Anything else would end the thread silently and leave the GUI waiting for the solve
+            self.failed.emit(f"{type(e).__name__}: {e}")
+            return
+        self.finished.emit(result)
@@ -0,0 +1,283 @@
+"""
+Headless batch runner for parameter sweeps.
+
+Runs many simulations without a display by fanning cases out over a process pool. Every
+case writes its trajectory to disk and contributes one row of summary metrics.
+
+Usage:
+    python -m simulation.batch cases.json --output results --workers 64
+
+The JSON file holds a list of cases, or an object with a "cases" list and/or a "grid"
+mapping each parameter to a list of values, whose cartesian product is swept. Parameters
+not given take the GUI's default values. Earth-only cases follow the analytic orbit unless
+they set "analytic" to false, or name an integrator to compare without setting "analytic".
+
+With --cache, finished runs are stored in a result cache directory shared by the workers
+and by later sweeps, so repeated cases are read back instead of integrated again.
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from simulation.gravity import GravityField
+from simulation.planet_constants import EARTH_RADIUS
+from simulation.result_cache import DEFAULT_DISK_BYTES, ResultCache, SimulationResult, shared_cache
+from simulation.rocket import Rocket
+from simulation.runner import SimulationRunner
+from simulation.trajectory import Trajectory
+
+# Default case, matching the GUI's starting parameters that give a circular orbit
+DEFAULT_CASE = {
+    "mass": 100.0,
+    "x": 0.0,
+    "y": 7e6,
+    "vx": 7543.0,
+    "vy": 0.0,
+    "h": 10.0,
+    "duration": 10000.0,
+    "moon": False,
+    "moving_moon": False,
+    "integrator": "rk4",
+    "rtol": 1e-9,
+    "atol": 1e-3,
+    "log_every": 1,
+    "analytic": True,
+}
+
+# Memory tier of the result cache in each batch worker process
+WORKER_MEMORY_BYTES = 64 * 1024 * 1024
+
+
+def expand_grid(grid: dict) -> list:
+    """
+    Expand a parameter grid into the list of cases it spans.
+
+    Parameters:
+        grid (dict): Maps each parameter to a list of values, or to a single value.
+
+    Returns:
+        list: One case dict per combination of values.
+    """
+    keys = list(grid)
+    values = [value if isinstance(value, (list, tuple)) else [value] for value in grid.values()]
+    return [dict(zip(keys, combination)) for combination in itertools.product(*values)]
+
+
+def load_cases(path: str) -> list:
+    """
+    Load the cases of a sweep from a JSON file, see the module docstring for the format.
+
+    Parameters:
+        path (str): Path of the JSON file.
+
+    Returns:
+        list: The case dicts.
+    """
+    with open(path) as file:
+        spec = json.load(file)
+
+    if isinstance(spec, list):
+        return spec
+
+    cases = list(spec.get("cases", []))
+    if "grid" in spec:
+        cases += expand_grid(spec["grid"])
+    return cases
+
+
+def complete_case(case: dict) -> dict:
+    """
+    Fill in the parameters a case leaves out.
+
+    Parameters:
+        case (dict): The case parameters, missing ones are taken from DEFAULT_CASE. A case that names
+            an integrator without setting 'analytic' is integrated, so the integrators can be compared.
+
+    Returns:
+        dict: The complete case parameters.
+    """
+    unknown = set(case) - set(DEFAULT_CASE)
+    if unknown:
+        raise ValueError(f"Unknown case parameters: {', '.join(sorted(unknown))}.")
+    defaults = {**DEFAULT_CASE, "analytic": DEFAULT_CASE["analytic"] and "integrator" not in case}
+    return {**defaults, **case}
+
+
+def simulate(case: dict, output: str = None, field: GravityField = None, compiled: bool = True):
+    """
+    Run a single case to completion.
+
+    Parameters:
+        case (dict): The case parameters, missing ones are filled in by complete_case.
+        output (str): Optional path of a trajectory file to stream the logs to.
+        field (GravityField): Optional field to use instead of the one the case's Moon options describe,
+            e.g. an instrumented one.
+        compiled (bool): Whether the compiled kernel may be used, see SimulationRunner. It gives the same
+            results, so it is not a case parameter.
+
+    Returns:
+        SimulationRunner: The finished run, holding the rocket and its logs.
+    """
+    case = complete_case(case)
+
+    rocket = Rocket(
+        case["mass"], case["x"], case["y"], case["vx"], case["vy"], 0,
+        integrator=case["integrator"], rtol=case["rtol"], atol=case["atol"], log_every=case["log_every"],
+        capacity=Trajectory.capacity_for(case["duration"], case["h"], case["log_every"])
+    )
+    runner = SimulationRunner(
+        rocket, case["h"], case["duration"], include_moon=case["moon"], moving_moon=case["moving_moon"], field=field,
+        output=output, analytic=case["analytic"], compiled=compiled
+    )
+    runner.run()
+    return runner
+
+
+def get_result(case: dict, cache: ResultCache = None, output: str = None) -> SimulationResult:
+    """
+    Return the result of a case, read from a result cache if the same case has been run before.
+
+    Parameters:
+        case (dict): The case parameters, missing ones are filled in by complete_case.
+        cache (ResultCache): The cache, defaults to this process's in-memory cache.
+        output (str): Optional path of a trajectory file to write the logs to.
+
+    Returns:
+        SimulationResult: The result of the run.
+    """
+    full_case = complete_case(case)
+    cache = cache if cache is not None else shared_cache()
+    result = cache.get(full_case)
+    if result is not None:
+        if output is not None:
+            result.save(output)
+        return result
+
+    runner = simulate(case, output)
+    result = SimulationResult.from_runner(full_case, runner)
+    cache.put(full_case, result)
+    return result
+
+
+def summarize(result: SimulationResult) -> dict:
+    """
+    Compute the summary metrics of a finished run.
+
+    Parameters:
+        result (SimulationResult): The result of the run.
+
+    Returns:
+        dict: Crash flag and time, minimum and maximum altitude above the Earth's surface,
+            relative energy drift over the run and per orbit, the number of steps, the propagator
+            (the integrator, or 'analytic' for the analytic orbit) and the events.
+    """
+    logs = result.data
+    altitude = np.hypot(logs["x"], logs["y"]) - EARTH_RADIUS
+    total_energy = logs["total_energy"]
+    drift = (total_energy[-1] - total_energy[0]) / abs(total_energy[0]) if total_energy[0] else math.nan
+
+    return {
+        "crashed": result.crash_message is not None,
+        "crash_message": result.crash_message,
+        "crash_time": result.crash_time,
+        "min_altitude": float(altitude.min()),
+        "max_altitude": float(altitude.max()),
+        "energy_drift": float(drift),
+        "energy_drift_per_orbit": result.energy_drift_per_orbit,
+        "steps": result.steps,
+        "propagator": "analytic" if result.header["integrator"].get("analytic", False) else result.header["integrator"]["name"],
+        "end_time": result.end_time,
+        "events": [record.as_dict() for record in result.events],
+    }
+
+
+def run_case(index: int, case: dict, output_dir: str = None, cache_dir: str = None,
+             cache_bytes: int = DEFAULT_DISK_BYTES) -> dict:
+    """
+    Run a single case, write its trajectory and return its summary row.
+
+    Parameters:
+        index (int): Index of the case in the sweep, used to name its output file.
+        case (dict): The case parameters.
+        output_dir (str): Directory for the trajectory file, None to skip writing it. See simulation.trajectory_file.
+        cache_dir (str): Directory of the result cache shared between processes, None to only cache in memory.
+        cache_bytes (int): Most bytes of trajectory files kept in the cache directory.
+
+    Returns:
+        dict: The case index and parameters merged with its summary metrics.
+    """
+    row = {"index": index, **case}
+    path = os.path.join(output_dir, f"case_{index:06d}.traj") if output_dir is not None else None
+    try:
+        # Workers keep only a small memory tier each, the disk tier is what sweeps share
+        result = get_result(case, shared_cache(cache_dir, cache_bytes, WORKER_MEMORY_BYTES), path)
+        summary = summarize(result)
+    except Exception as e:
+        # Invalid parameters, or any other failure of the run, fail this case only, not the sweep
+        return {**row, "error": f"{type(e).__name__}: {e}"}
+
+    row.update(summary)
+    if path is not None:
+        row["trajectory"] = path
+    return row
+
+
+def run_batch(cases: list, output_dir: str = None, workers: int = None, cache_dir: str = None,
+              cache_bytes: int = DEFAULT_DISK_BYTES) -> list:
+    """
+    Run many cases in parallel over a process pool.
+
+    Parameters:
+        cases (list): The case dicts.
+        output_dir (str): Directory for the trajectory files and summary, None to keep results in memory only.
+        workers (int): Number of worker processes, defaults to the number of CPUs.
+        cache_dir (str): Directory of a result cache shared by the workers, None to only cache within each worker.
+        cache_bytes (int): Most bytes of trajectory files kept in the cache directory.
+
+    Returns:
+        list: The summary rows, in the order of the cases.
+    """
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+
+    # Small cases are handed out in batches to keep the pool overhead low
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(cases) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        rows = list(pool.map(
+            run_case, range(len(cases)), cases, itertools.repeat(output_dir), itertools.repeat(cache_dir),
+            itertools.repeat(cache_bytes), chunksize=chunksize
+        ))
+
+    if output_dir is not None:
+        with open(os.path.join(output_dir, "summary.json"), "w") as file:
+            json.dump(rows, file, indent=2)
+    return rows
+
+
+def main(argv: list = None) -> None:
+    """Command line entry point of the batch runner."""
+    parser = argparse.ArgumentParser(description="Run rocket simulations without the GUI.")
+    parser.add_argument("cases", help="JSON file with the cases or parameter grid to run.")
+    parser.add_argument("--output", default="results", help="Directory for trajectories and summary.json.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes (default: all CPUs).")
+    parser.add_argument("--cache", default=None, help="Directory of a result cache reused across sweeps.")
+    parser.add_argument("--cache-size", type=float, default=DEFAULT_DISK_BYTES / 2**30,
+                        help="Most GiB of trajectories kept in the cache directory (default: %(default)g).")
+    args = parser.parse_args(argv)
+
+    cases = load_cases(args.cases)
+    rows = run_batch(cases, args.output, args.workers, args.cache, int(args.cache_size * 2**30))
+
+    crashed = sum(1 for row in rows if row.get("crashed"))
+    failed = sum(1 for row in rows if "error" in row)
+    print(f"Ran {len(rows)} cases: {crashed} crashed, {failed} failed. Results written to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+import math
+
+import numpy as np
+
+from simulation.events import EventDetector, contact_event
+from simulation.integrators import hermite_interpolant
+from simulation.trajectory import DEFAULT_CHUNK
+
+
+class Ensemble:
+    """
+    Represents a batch of rockets in a 2D space that are propagated together.
+
+    Every member is advanced with the same Runge-Kutta scheme as Rocket, but the
+    state of the whole batch is held in NumPy arrays so each step is a handful of
+    array operations rather than one Python loop per rocket. Members that crash
+    are masked out individually instead of stopping the batch, and their crash is
+    located within the step on its interpolant, as Rocket's contact event does.
+    """
+
+    def __init__(self, mass, x, y, velocity_x, velocity_y, time: float = 0.0):
+        """
+        Initialize the ensemble with the initial state of every member.
+
+        Parameters:
+            mass (array_like): Mass of each rocket in kilograms.
+            x (array_like): Initial x-coordinates in meters.
+            y (array_like): Initial y-coordinates in meters.
+            velocity_x (array_like): Initial velocities in the x-direction in m/s.
+            velocity_y (array_like): Initial velocities in the y-direction in m/s.
+            time (float): Common start time in seconds.
+
+        Scalars are broadcast against the arrays, so a single mass can be shared by all members.
+        """
+        mass, x, y, velocity_x, velocity_y = np.broadcast_arrays(
+            *(np.atleast_1d(np.asarray(value, dtype=float)) for value in (mass, x, y, velocity_x, velocity_y))
+        )
+        if x.ndim != 1:
+            raise ValueError("Ensemble initial states must be one-dimensional arrays.")
+
+        # Parameters
+        self.mass = mass.copy()
+        self.x = x.copy()
+        self.y = y.copy()
+        self.velocity_x = velocity_x.copy()
+        self.velocity_y = velocity_y.copy()
+        self.time = float(time)
+
+        # Crash bookkeeping per member
+        self.alive = np.ones(self.size, dtype=bool)
+        self.crash_time = np.full(self.size, np.nan)
+        self.crash_body = np.full(self.size, -1, dtype=np.int64)
+        self.crash_step = np.full(self.size, -1, dtype=np.int64)
+        self.crash_x = np.full(self.size, np.nan)
+        self.crash_y = np.full(self.size, np.nan)
+        self.crash_velocity_x = np.full(self.size, np.nan)
+        self.crash_velocity_y = np.full(self.size, np.nan)
+
+        # Logs, filled in by propagate() with one row per step and one column per member. The rows are
+        # preallocated and grown in chunks, so propagating in many short segments stays linear in time
+        self._rows = 0
+        self._time_log = np.empty(0)
+        self._logs = {name: np.empty((0, self.size)) for name in ("x", "y", "velocity_x", "velocity_y")}
+        self._reserve(1)
+        self._time_log[0] = self.time
+        for name, log in self._logs.items():
+            log[0] = getattr(self, name)
+        self._rows = 1
+
+    @property
+    def size(self) -> int:
+        """
+        Returns:
+            int: The number of members in the ensemble.
+        """
+        return self.x.shape[0]
+
+    @property
+    def time_log(self) -> np.ndarray:
+        """Logged times (s), one per row."""
+        return self._time_log[:self._rows]
+
+    @property
+    def x_log(self) -> np.ndarray:
+        """Logged x-coordinates (m), one row per step and one column per member."""
+        return self._logs["x"][:self._rows]
+
+    @property
+    def y_log(self) -> np.ndarray:
+        """Logged y-coordinates (m), one row per step and one column per member."""
+        return self._logs["y"][:self._rows]
+
+    @property
+    def velocity_x_log(self) -> np.ndarray:
+        """Logged x-velocities (m/s), one row per step and one column per member."""
+        return self._logs["velocity_x"][:self._rows]
+
+    @property
+    def velocity_y_log(self) -> np.ndarray:
+        """Logged y-velocities (m/s), one row per step and one column per member."""
+        return self._logs["velocity_y"][:self._rows]
+
+    def _reserve(self, n_steps: int) -> None:
+        """
+        (Private) Make room for n_steps more rows of logs, growing the store like Trajectory._grow if it is full.
+        """
+        capacity = self._time_log.shape[0]
+        if self._rows + n_steps <= capacity:
+            return
+        capacity = max(self._rows + n_steps, capacity + max(capacity, DEFAULT_CHUNK))
+        time_log = np.full(capacity, np.nan)
+        time_log[:self._rows] = self._time_log[:self._rows]
+        self._time_log = time_log
+        for name, log in self._logs.items():
+            grown = np.full((capacity, self.size), np.nan)
+            grown[:self._rows] = log[:self._rows]
+            self._logs[name] = grown
+
+    @staticmethod
+    def _runge_kutta_step(field, time: float, h: float, x: np.ndarray, y: np.ndarray, velocity_x: np.ndarray, velocity_y: np.ndarray,
+                          acceleration_x: np.ndarray, acceleration_y: np.ndarray):
+        """
+        (Private) Advance the given states by one RK4 step. This mirrors Rocket.update_position_and_velocity.
+
+        The accelerations at the given states come from the previous step, whose final field
+        evaluation also provides the crash check.
+
+        Returns:
+            tuple[np.ndarray, ...]: The new x, y, x-velocity and y-velocity, the accelerations there, and
+                the index of the body each new position is in contact with, -1 for none.
+        """
+        # First Runge Kutta evaluations
+        kutta_1x = velocity_x
+        kutta_1y = velocity_y
+        kutta_1vx, kutta_1vy = acceleration_x, acceleration_y
+
+        # Second Runge Kutta evaluations
+        kutta_2x = velocity_x + (h * kutta_1vx) / 2
+        kutta_2y = velocity_y + (h * kutta_1vy) / 2
+        kutta_2vx, kutta_2vy, _, _ = field.evaluate_arrays(x + (h * kutta_1x) / 2, y + (h * kutta_1y) / 2, time + h / 2)
+
+        # Third Runge Kutta evaluations
+        kutta_3x = velocity_x + (h * kutta_2vx) / 2
+        kutta_3y = velocity_y + (h * kutta_2vy) / 2
+        kutta_3vx, kutta_3vy, _, _ = field.evaluate_arrays(x + (h * kutta_2x) / 2, y + (h * kutta_2y) / 2, time + h / 2)
+
+        # Fourth Runge Kutta evaluations
+        kutta_4x = velocity_x + (h * kutta_3vx)
+        kutta_4y = velocity_y + (h * kutta_3vy)
+        kutta_4vx, kutta_4vy, _, _ = field.evaluate_arrays(x + (h * kutta_3x), y + (h * kutta_3y), time + h)
+
+        # Position and velocity updates
+        x_plus1 = x + ((h / 6) * (kutta_1x + (2 * kutta_2x) + (2 * kutta_3x) + kutta_4x))
+        y_plus1 = y + ((h / 6) * (kutta_1y + (2 * kutta_2y) + (2 * kutta_3y) + kutta_4y))
+        velocity_x_plus1 = velocity_x + ((h / 6) * (kutta_1vx + (2 * kutta_2vx) + (2 * kutta_3vx) + kutta_4vx))
+        velocity_y_plus1 = velocity_y + ((h / 6) * (kutta_1vy + (2 * kutta_2vy) + (2 * kutta_3vy) + kutta_4vy))
+
+        # Field at the new positions, shared by the crash check and the next step
+        acceleration_x_plus1, acceleration_y_plus1, _, contact = field.evaluate_arrays(x_plus1, y_plus1, time + h)
+        return x_plus1, y_plus1, velocity_x_plus1, velocity_y_plus1, acceleration_x_plus1, acceleration_y_plus1, contact
+
+    def propagate(self, field, h: float, time_target: float) -> None:
+        """
+        Propagate every member from the current time up to the target time and log the trajectories.
+
+        The number of steps matches the Rocket loop in the GUI, i.e. stepping continues until the
+        time reaches or passes the target. A crashed member stops at its located crash, whose time
+        and state are stored under crash_time, crash_x and so on. Its log row of the step that
+        crossed the surface holds the state at the end of that step, inside the body, and its
+        later rows are NaN.
+
+        Parameters:
+            field (GravityField): The gravitational field.
+            h (float): Time step (s).
+            time_target (float): Time to propagate up to (s).
+        """
+        if h <= 0:
+            raise ValueError("Time step must be positive.")
+
+        n_steps = max(0, math.ceil((time_target - self.time) / h))
+        first_row = self._rows
+
+        # Accelerations at the current states, carried from step to step
+        acceleration_x, acceleration_y, _, _ = field.evaluate_arrays(self.x, self.y, self.time)
+
+        # Make room for the new segment in the logs
+        self._reserve(n_steps)
+        self._time_log[first_row:first_row + n_steps] = self.time + h * np.arange(1, n_steps + 1)
+        self._rows += n_steps
+        x_log, y_log = self._logs["x"], self._logs["y"]
+        velocity_x_log, velocity_y_log = self._logs["velocity_x"], self._logs["velocity_y"]
+        detectors = {}
+
+        for step in range(n_steps):
+            row = first_row + step
+            if not self.alive.any():
+                break
+
+            # Only the surviving members are stepped
+            if self.alive.all():
+                index = slice(None)
+            else:
+                index = np.flatnonzero(self.alive)
+
+            x, y, velocity_x, velocity_y, new_acceleration_x, new_acceleration_y, contact = self._runge_kutta_step(
+                field, self._time_log[row - 1], h, self.x[index], self.y[index], self.velocity_x[index],
+                self.velocity_y[index], acceleration_x[index], acceleration_y[index]
+            )
+
+            # Crash detection if position is within a body's radius, located before the states move on
+            crashed = contact >= 0
+            if crashed.any():
+                members = np.arange(self.size)[index][crashed]
+                end = (x[crashed], y[crashed], velocity_x[crashed], velocity_y[crashed],
+                       new_acceleration_x[crashed], new_acceleration_y[crashed])
+                for k, member in enumerate(members):
+                    body = int(contact[crashed][k])
+                    if body not in detectors:
+                        detectors[body] = EventDetector([contact_event(field.bodies[body])])
+                    self._locate_crash(detectors[body], member, row, h, acceleration_x[member],
+                                       acceleration_y[member], *(values[k] for values in end))
+                self.alive[members] = False
+                self.crash_step[members] = row
+                self.crash_body[members] = contact[crashed]
+
+            self.x[index] = x
+            self.y[index] = y
+            self.velocity_x[index] = velocity_x
+            self.velocity_y[index] = velocity_y
+            acceleration_x[index] = new_acceleration_x
+            acceleration_y[index] = new_acceleration_y
+
+            # Log changes
+            x_log[row, index] = x
+            y_log[row, index] = y
+            velocity_x_log[row, index] = velocity_x
+            velocity_y_log[row, index] = velocity_y
+
+        self.time = float(self.time_log[-1])
+
+    def _locate_crash(self, detector: EventDetector, member: int, row: int, h: float,
+                      acceleration_x: float, acceleration_y: float, x: float, y: float, velocity_x: float,
+                      velocity_y: float, new_acceleration_x: float, new_acceleration_y: float) -> None:
+        """
+        (Private) Locate a member's crash within the step ending at a row, on the cubic Hermite interpolant
+        of the step, as Rocket does for its fixed-step integrators.
+
+        The accelerations are those at the start and the end of the step, and the state that at its end.
+        """
+        state = tuple(float(self._logs[name][row - 1, member]) for name in ("x", "y", "velocity_x", "velocity_y"))
+        new_state = (float(x), float(y), float(velocity_x), float(velocity_y))
+        interpolate = hermite_interpolant(
+            state, (state[2], state[3], float(acceleration_x), float(acceleration_y)),
+            new_state, (new_state[2], new_state[3], float(new_acceleration_x), float(new_acceleration_y)), h
+        )
+        start_time = float(self._time_log[row - 1])
+        records = detector.check(start_time, state, start_time + h, new_state, interpolate)
+        if records:
+            crash_time, crash_state = records[-1].time, records[-1].state
+        else:
+            # Only the sample at the end of the step was inside the body
+            crash_time, crash_state = start_time + h, new_state
+        self.crash_time[member] = crash_time
+        self.crash_x[member], self.crash_y[member], self.crash_velocity_x[member], self.crash_velocity_y[member] = crash_state
+
+    def trajectory(self, member: int) -> dict:
+        """
+        Return the logged trajectory of a single member, ending at its located crash if it crashed.
+
+        Parameters:
+            member (int): Index of the member.
+
+        Returns:
+            dict: Arrays under the keys 'time', 'x', 'y', 'velocity_x' and 'velocity_y'.
+        """
+        if self.crash_step[member] < 0:
+            return {
+                "time": self.time_log,
+                "x": self.x_log[:, member],
+                "y": self.y_log[:, member],
+                "velocity_x": self.velocity_x_log[:, member],
+                "velocity_y": self.velocity_y_log[:, member],
+            }
+
+        end = self.crash_step[member]
+        return {
+            "time": np.append(self.time_log[:end], self.crash_time[member]),
+            "x": np.append(self.x_log[:end, member], self.crash_x[member]),
+            "y": np.append(self.y_log[:end, member], self.crash_y[member]),
+            "velocity_x": np.append(self.velocity_x_log[:end, member], self.crash_velocity_x[member]),
+            "velocity_y": np.append(self.velocity_y_log[:end, member], self.crash_velocity_y[member]),
+        }
+
+    def __repr__(self) -> str:
+        """
+        Return a string representation of the ensemble's current state.
+
+        Returns:
+            str: A string summarizing the ensemble's size, time and number of crashed members.
+        """
+        return f"Ensemble(size={self.size}, time={self.time:.2f}, crashed={int((~self.alive).sum())})"
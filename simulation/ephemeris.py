@@ -0,0 +1,139 @@
+import functools
+import math
+
+import numpy as np
+
+
+class Ephemeris:
+    """
+    Represents the tabulated, periodic orbit of a body.
+
+    Positions and velocities are sampled once at evenly spaced times over one period and
+    interpolated with cubic Hermite segments, so looking up the body's position during a
+    run costs a few multiplications instead of solving the orbit again.
+    """
+
+    def __init__(self, period: float, x: np.ndarray, y: np.ndarray, velocity_x: np.ndarray, velocity_y: np.ndarray):
+        """
+        Initialize the ephemeris from samples taken at times k * period / n for k = 0..n.
+
+        Parameters:
+            period (float): Orbital period (s), the table repeats after it.
+            x (np.ndarray): Sampled x-coordinates (m), the last sample closing the period.
+            y (np.ndarray): Sampled y-coordinates (m).
+            velocity_x (np.ndarray): Sampled velocities in the x-direction (m/s).
+            velocity_y (np.ndarray): Sampled velocities in the y-direction (m/s).
+        """
+        self.period = period
+        self.segments = len(x) - 1
+        self.spacing = period / self.segments
+        self.max_speed = float(np.max(np.hypot(velocity_x, velocity_y)))
+
+        # Cubic coefficients of each segment in the local coordinate s = (t - t_k) / spacing
+        self._x_coefficients = self._hermite_coefficients(np.asarray(x), np.asarray(velocity_x) * self.spacing)
+        self._y_coefficients = self._hermite_coefficients(np.asarray(y), np.asarray(velocity_y) * self.spacing)
+
+        # Plain Python copies of the coefficients for fast scalar lookups
+        self._x_rows = self._x_coefficients.tolist()
+        self._y_rows = self._y_coefficients.tolist()
+
+    @staticmethod
+    def _hermite_coefficients(position: np.ndarray, scaled_velocity: np.ndarray) -> np.ndarray:
+        """
+        (Private) Compute the cubic Hermite coefficients c0..c3 of every segment.
+        """
+        p0, p1 = position[:-1], position[1:]
+        m0, m1 = scaled_velocity[:-1], scaled_velocity[1:]
+        return np.stack([p0, m0, -3 * p0 - 2 * m0 + 3 * p1 - m1, 2 * p0 + m0 - 2 * p1 + m1], axis=1)
+
+    def position(self, time: float) -> tuple:
+        """
+        Interpolate the body's position at a time.
+
+        Parameters:
+            time (float): Time (s).
+
+        Returns:
+            tuple: The x and y coordinates (m).
+        """
+        local = (time % self.period) / self.spacing
+        index = min(int(local), self.segments - 1)
+        s = local - index
+        c0, c1, c2, c3 = self._x_rows[index]
+        d0, d1, d2, d3 = self._y_rows[index]
+        return c0 + s * (c1 + s * (c2 + s * c3)), d0 + s * (d1 + s * (d2 + s * d3))
+
+    def positions(self, times: np.ndarray) -> tuple:
+        """
+        Interpolate the body's position at many times at once.
+
+        Parameters:
+            times (np.ndarray): Times (s).
+
+        Returns:
+            tuple: Arrays of the x and y coordinates (m).
+        """
+        local = np.mod(times, self.period) / self.spacing
+        index = np.minimum(local.astype(np.int64), self.segments - 1)
+        s = local - index
+        c = self._x_coefficients[index]
+        d = self._y_coefficients[index]
+        x = c[..., 0] + s * (c[..., 1] + s * (c[..., 2] + s * c[..., 3]))
+        y = d[..., 0] + s * (d[..., 1] + s * (d[..., 2] + s * d[..., 3]))
+        return x, y
+
+    def __repr__(self) -> str:
+        """
+        Return a string representation of the ephemeris.
+
+        Returns:
+            str: A string summarizing the period and number of segments.
+        """
+        return f"Ephemeris(period={self.period:.1f}, segments={self.segments})"
+
+
+@functools.lru_cache(maxsize=16)
+def kepler_ephemeris(mu: float, semi_major_axis: float, eccentricity: float = 0.0, epoch: float = 0.0,
+                     segments: int = 2048) -> Ephemeris:
+    """
+    Tabulate a Keplerian orbit about the origin, with its periapsis on the positive x-axis.
+
+    Tables are cached, so every run in a process that uses the same orbit and epoch shares one.
+    Since the orbit is periodic, a single period serves runs of any span.
+
+    Parameters:
+        mu (float): Gravitational parameter of the orbit (m^3 s^-2).
+        semi_major_axis (float): Semi-major axis (m).
+        eccentricity (float): Eccentricity, 0 for a circular orbit.
+        epoch (float): Time since periapsis at t = 0 (s).
+        segments (int): Number of Hermite segments per period.
+
+    Returns:
+        Ephemeris: The tabulated orbit.
+    """
+    if not 0 <= eccentricity < 1:
+        raise ValueError("An ephemeris needs a closed orbit with 0 <= eccentricity < 1.")
+
+    mean_motion = math.sqrt(mu / semi_major_axis**3)
+    period = 2 * math.pi / mean_motion
+    times = np.linspace(0.0, period, segments + 1)
+
+    # Solve Kepler's equation for the eccentric anomaly at every sample with Newton's method
+    mean_anomaly = mean_motion * (times + epoch)
+    eccentric_anomaly = mean_anomaly.copy()
+    for _ in range(50):
+        correction = (eccentric_anomaly - eccentricity * np.sin(eccentric_anomaly) - mean_anomaly) / (1 - eccentricity * np.cos(eccentric_anomaly))
+        eccentric_anomaly -= correction
+        if np.max(np.abs(correction)) < 1e-15:
+            break
+
+    cos_e, sin_e = np.cos(eccentric_anomaly), np.sin(eccentric_anomaly)
+    semi_minor_axis = semi_major_axis * math.sqrt(1 - eccentricity**2)
+    anomaly_rate = mean_motion / (1 - eccentricity * cos_e)
+    return Ephemeris(
+        period,
+        semi_major_axis * (cos_e - eccentricity),
+        semi_minor_axis * sin_e,
+        -semi_major_axis * sin_e * anomaly_rate,
+        semi_minor_axis * cos_e * anomaly_rate,
+    )
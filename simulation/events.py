@@ -0,0 +1,363 @@
+import math
+
+
+class Event:
+    """
+    Represents an event as a zero crossing of a function of time and state.
+
+    The function is evaluated at the end of every step, and a sign change across the step
+    means the event occurred within it. The crossing is then located by root finding on the
+    step's interpolant. For functions whose rate of change is bounded, e.g. a distance, the
+    step is also sampled in between when the function comes close enough to zero that it
+    could dip across it and back within the step, so grazing crossings are not missed.
+    """
+
+    def __init__(self, name: str, function, direction: int = 0, terminal: bool = False, message: str = None,
+                 rate_bound=None):
+        """
+        Initialize the event.
+
+        Parameters:
+            name (str): Name of the event, e.g. "Earth periapsis".
+            function (callable): Function mapping a time and a state tuple (x, y, velocity_x, velocity_y) to a float.
+            direction (int): 1 to only detect rising crossings, -1 for falling ones, 0 for both.
+            terminal (bool): Whether the run stops at the event.
+            message (str): Message reported when the event stops the run, defaults to the name.
+            rate_bound (callable): Optional function mapping a state to a bound on the function's rate of change.
+        """
+        self.name = name
+        self.function = function
+        self.direction = direction
+        self.terminal = terminal
+        self.message = message if message is not None else name
+        self.rate_bound = rate_bound
+
+    def __repr__(self) -> str:
+        return f"Event(name={self.name!r}, direction={self.direction}, terminal={self.terminal})"
+
+
+class EventRecord:
+    """
+    Represents an occurrence of an event during a run.
+    """
+
+    def __init__(self, event: Event, time: float, state: tuple, direction: int):
+        """
+        Initialize the record.
+
+        Parameters:
+            event (Event): The event that occurred.
+            time (float): Time of the crossing (s).
+            state (tuple): State (x, y, velocity_x, velocity_y) at the crossing.
+            direction (int): 1 if the function was rising through zero, -1 if falling.
+        """
+        self.name = event.name
+        self.terminal = event.terminal
+        self.message = event.message
+        self.time = time
+        self.state = state
+        self.direction = direction
+
+    def as_dict(self) -> dict:
+        """
+        Returns:
+            dict: The record as plain values, e.g. for JSON output.
+        """
+        x, y, velocity_x, velocity_y = self.state
+        return {
+            "name": self.name, "time": self.time, "terminal": self.terminal, "direction": self.direction,
+            "message": self.message, "x": x, "y": y, "velocity_x": velocity_x, "velocity_y": velocity_y,
+        }
+
+    @classmethod
+    def from_dict(cls, values: dict):
+        """
+        Rebuild a record from the output of as_dict, e.g. for a stored run.
+
+        Parameters:
+            values (dict): The record as plain values.
+
+        Returns:
+            EventRecord: The record, with an event that has no function.
+        """
+        event = Event(values["name"], None, values["direction"], values["terminal"], values.get("message"))
+        state = (values["x"], values["y"], values["velocity_x"], values["velocity_y"])
+        return cls(event, values["time"], state, values["direction"])
+
+    def __repr__(self) -> str:
+        return f"EventRecord(name={self.name!r}, time={self.time:.3f}, terminal={self.terminal})"
+
+
+class EventDetector:
+    """
+    Checks a list of events across each step of a run.
+    """
+
+    # Bisection stops once the crossing is bracketed this tightly in time (s)
+    TIME_TOLERANCE = 1e-6
+    # Most intermediate samples taken in a step to look for grazing crossings
+    MAX_SAMPLES = 16
+
+    def __init__(self, events: list):
+        """
+        Initialize the detector.
+
+        Parameters:
+            events (list): The events to check.
+        """
+        self.events = list(events)
+
+        # Events sharing a function, like the two apsis events, evaluate it and its rate bound once per step
+        self._functions = []
+        self._rate_bounds = []
+        self._slot_events = []
+        for event in self.events:
+            if event.function not in self._functions:
+                self._functions.append(event.function)
+                self._rate_bounds.append(event.rate_bound)
+                self._slot_events.append([])
+            self._slot_events[self._functions.index(event.function)].append(event)
+
+        # Time, state, function values and rate bounds at the end of the last step, the start of the next one
+        self._previous = None
+
+    def reset(self, time: float, state: tuple) -> None:
+        """
+        Evaluate the event functions at the start of a run, or after the state was changed from outside.
+
+        Parameters:
+            time (float): Time (s).
+            state (tuple): State (x, y, velocity_x, velocity_y).
+        """
+        self._previous = (time, state, [function(time, state) for function in self._functions], self._rates(state))
+
+    def _rates(self, state: tuple) -> list:
+        """
+        (Private) Evaluate the rate bounds of the event functions at a state, None for functions without one.
+        """
+        return [None if rate_bound is None else rate_bound(state) for rate_bound in self._rate_bounds]
+
+    def check(self, time: float, state: tuple, new_time: float, new_state: tuple, interpolate) -> list:
+        """
+        Find the events that occurred within a step.
+
+        Parameters:
+            time (float): Time at the start of the step (s).
+            state (tuple): State at the start of the step.
+            new_time (float): Time at the end of the step (s).
+            new_state (tuple): State at the end of the step.
+            interpolate (callable): Function mapping theta in [0, 1] to the state at time + theta * (new_time - time).
+
+        Returns:
+            list: The EventRecords of the step in time order, ending at the first terminal one.
+        """
+        previous = self._previous
+        if previous is None or previous[0] != time or previous[1] != state:
+            self.reset(time, state)
+            previous = self._previous
+            # A terminal event already past at the start, e.g. a rocket placed below the surface, stops the run there
+            for events, g0 in zip(self._slot_events, previous[2]):
+                for event in events:
+                    if event.terminal and (event.direction < 0 and g0 <= 0 or event.direction > 0 and g0 >= 0):
+                        return [EventRecord(event, time, state, event.direction)]
+
+        start_values, start_rates = previous[2], previous[3]
+        end_values = [function(new_time, new_state) for function in self._functions]
+        end_rates = self._rates(new_state)
+        self._previous = (new_time, new_state, end_values, end_rates)
+
+        h = new_time - time
+        records = []
+        for events, g0, g1, rate0, rate1 in zip(self._slot_events, start_values, end_values, start_rates, end_rates):
+            if (g0 > 0) == (g1 > 0) and (rate0 is None or min(abs(g0), abs(g1)) >= h * max(rate0, rate1)):
+                # Neither a sign change nor close enough to zero to cross it and back within the step
+                continue
+
+            for event in events:
+                bracket = self._bracket(event, time, h, g0, g1, rate0, rate1, interpolate)
+                if bracket is not None:
+                    records.append(self._locate(event, time, h, interpolate, *bracket))
+
+        if not records:
+            return records
+        records.sort(key=lambda record: record.time)
+        for index, record in enumerate(records):
+            if record.terminal:
+                return records[:index + 1]
+        return records
+
+    @staticmethod
+    def _crosses(event: Event, g0: float, g1: float) -> bool:
+        """
+        (Private) Check whether the function crosses zero from g0 to g1 in the event's direction.
+        """
+        if event.direction >= 0 and g0 < 0 <= g1:
+            return True
+        if event.direction <= 0 and g0 > 0 >= g1:
+            return True
+        return False
+
+    def _bracket(self, event: Event, time: float, h: float, g0: float, g1: float, rate0: float, rate1: float,
+                 interpolate):
+        """
+        (Private) Find the first sub-interval of the step, in theta, over which the event function crosses zero.
+
+        Returns:
+            tuple: theta and function value at both ends of the sub-interval, or None if there is no crossing.
+        """
+        samples = 1
+        if rate0 is not None:
+            # The function can only reach zero in between if it is within reach at its rate bound
+            reach = h * max(rate0, rate1)
+            closest = min(abs(g0), abs(g1))
+            if 0 < closest < reach:
+                samples = min(self.MAX_SAMPLES, math.ceil(2 * reach / closest))
+
+        theta_low, g_low = 0.0, g0
+        for k in range(1, samples + 1):
+            theta_high = k / samples
+            if k == samples:
+                g_high = g1
+            else:
+                g_high = event.function(time + theta_high * h, interpolate(theta_high))
+            if self._crosses(event, g_low, g_high):
+                return theta_low, g_low, theta_high, g_high
+            theta_low, g_low = theta_high, g_high
+        return None
+
+    def _locate(self, event: Event, time: float, h: float, interpolate,
+                theta_low: float, g_low: float, theta_high: float, g_high: float) -> EventRecord:
+        """
+        (Private) Narrow a bracketed crossing down by bisection on the interpolant.
+        """
+        direction = 1 if g_high > g_low else -1
+        while (theta_high - theta_low) * abs(h) > self.TIME_TOLERANCE:
+            theta_mid = 0.5 * (theta_low + theta_high)
+            if theta_mid <= theta_low or theta_mid >= theta_high:
+                break
+            g_mid = event.function(time + theta_mid * h, interpolate(theta_mid))
+            if (g_mid >= 0) == (g_high >= 0):
+                theta_high, g_high = theta_mid, g_mid
+            else:
+                theta_low, g_low = theta_mid, g_mid
+
+        # Report the end of the bracket, which lies on the far side of the crossing
+        return EventRecord(event, time + theta_high * h, interpolate(theta_high), direction)
+
+
+def _distance_function(body, offset: float):
+    """
+    (Private) Build the function of time and state giving the distance from a body's centre minus an offset.
+
+    The position of a body without an ephemeris is bound once instead of looked up on every call.
+    """
+    if body.ephemeris is None:
+        body_x, body_y = body.x, body.y
+
+        def distance(time: float, state: tuple) -> float:
+            return math.hypot(state[0] - body_x, state[1] - body_y) - offset
+    else:
+        position = body.ephemeris.position
+
+        def distance(time: float, state: tuple) -> float:
+            x, y = position(time)
+            return math.hypot(state[0] - x, state[1] - y) - offset
+
+    return distance
+
+
+def contact_event(body) -> Event:
+    """
+    Build the terminal event of the rocket reaching a body's surface.
+
+    Parameters:
+        body (Planet): The body.
+
+    Returns:
+        Event: The contact event.
+    """
+    body_speed = body.ephemeris.max_speed if body.ephemeris is not None else 0.0
+    return Event(
+        f"{body.name} impact", _distance_function(body, body.radius), direction=-1, terminal=True,
+        message=f"Rocket has crashed into the {body.name}!",
+        rate_bound=lambda state: math.hypot(state[2], state[3]) + body_speed,
+    )
+
+
+def apsis_events(body) -> list:
+    """
+    Build the periapsis and apoapsis passage events about a body.
+
+    The radial velocity relative to the body crosses zero rising at periapsis and falling at apoapsis.
+
+    Parameters:
+        body (Planet): The body, assumed not to move.
+
+    Returns:
+        list: The periapsis and apoapsis events.
+    """
+    body_x, body_y = body.x, body.y
+
+    def radial_velocity(time: float, state: tuple) -> float:
+        return (state[0] - body_x) * state[2] + (state[1] - body_y) * state[3]
+
+    return [
+        Event(f"{body.name} periapsis", radial_velocity, direction=1),
+        Event(f"{body.name} apoapsis", radial_velocity, direction=-1),
+    ]
+
+
+def sphere_of_influence_radius(body, central) -> float:
+    """
+    Compute Laplace's sphere of influence radius a * (m / M)^(2/5) of a body with respect to a central body,
+    with a the body's distance from the central body at t = 0.
+
+    Parameters:
+        body (Planet): The body whose sphere of influence is tracked.
+        central (Planet): The central body.
+
+    Returns:
+        float: The radius (m).
+    """
+    body_x, body_y = body.position(0.0)
+    central_x, central_y = central.position(0.0)
+    return math.hypot(body_x - central_x, body_y - central_y) * (body.mass / central.mass) ** 0.4
+
+
+def sphere_of_influence_events(body, central) -> list:
+    """
+    Build the events of entering and leaving a body's sphere of influence with respect to a central body.
+
+    The radius is Laplace's, see sphere_of_influence_radius.
+
+    Parameters:
+        body (Planet): The body whose sphere of influence is tracked.
+        central (Planet): The central body.
+
+    Returns:
+        list: The entry and exit events.
+    """
+    distance_outside = _distance_function(body, sphere_of_influence_radius(body, central))
+    return [
+        Event(f"{body.name} SOI entry", distance_outside, direction=-1),
+        Event(f"{body.name} SOI exit", distance_outside, direction=1),
+    ]
+
+
+def default_events(field) -> list:
+    """
+    Build the standard events of a field: contact with every body, apsis passages about the first
+    body, and sphere of influence crossings of the others.
+
+    Parameters:
+        field (GravityField): The gravitational field.
+
+    Returns:
+        list: The events.
+    """
+    central = field.bodies[0]
+    events = [contact_event(body) for body in field.bodies]
+    events += apsis_events(central)
+    for body in field.bodies[1:]:
+        events += sphere_of_influence_events(body, central)
+    return events
@@ -0,0 +1,139 @@
+import math
+
+import numpy as np
+
+from simulation.ephemeris import kepler_ephemeris
+from simulation.planet import Planet
+from simulation.planet_constants import G_CONSTANT, EARTH_MASS, EARTH_RADIUS, MOON_MASS, MOON_RADIUS, MOON_DISTANCE
+
+
+class GravityField:
+    """
+    Represents the gravitational field of a list of Planet bodies.
+
+    A single fused evaluation returns the acceleration, the potential and any surface
+    contact at a point, so integrators, energy logging and crash detection can share
+    the distance computations instead of repeating them. Bodies without mass contribute
+    nothing and are left out. Bodies with an ephemeris are looked up at the evaluation time.
+    """
+
+    def __init__(self, bodies: list, G: float = G_CONSTANT):
+        """
+        Initialize the field from its bodies.
+
+        Parameters:
+            bodies (list): The Planet bodies producing the field, in the order crashes are checked.
+            G (float): Gravitational constant (m^3 kg^-1 s^-2).
+        """
+        self.G = G
+        self.bodies = [body for body in bodies if body.mass > 0]
+
+        # Per-body constants of the evaluation: gravitational parameter, position, squared radius and ephemeris
+        self._terms = [(G * body.mass, body.x, body.y, body.radius**2, body.ephemeris, body) for body in self.bodies]
+        self.moving = any(body.ephemeris is not None for body in self.bodies)
+
+    @classmethod
+    def earth_moon(cls, include_moon: bool, moving_moon: bool = False, epoch: float = 0.0) -> "GravityField":
+        """
+        Build the field of the Earth at the origin and, optionally, the Moon.
+
+        The Moon either stays fixed on the x-axis, or moves along a circular orbit that
+        starts on the x-axis at the epoch.
+
+        Parameters:
+            include_moon (bool): Whether the Moon is included.
+            moving_moon (bool): Whether the Moon orbits the Earth instead of staying fixed.
+            epoch (float): Time since the Moon crossed the x-axis at t = 0 (s), for a moving Moon.
+
+        Returns:
+            GravityField: The field built from the constants in planet_constants.
+        """
+        bodies = [Planet("Earth", EARTH_MASS, EARTH_RADIUS)]
+        if include_moon:
+            ephemeris = None
+            if moving_moon:
+                ephemeris = kepler_ephemeris(G_CONSTANT * (EARTH_MASS + MOON_MASS), MOON_DISTANCE, epoch=epoch)
+            bodies.append(Planet("Moon", MOON_MASS, MOON_RADIUS, x=MOON_DISTANCE, ephemeris=ephemeris))
+        return cls(bodies)
+
+    @property
+    def central_mu(self) -> float:
+        """
+        Returns:
+            float: The gravitational parameter of the first body (m^3 s^-2), used for orbit estimates.
+        """
+        return self.G * self.bodies[0].mass
+
+    def evaluate(self, x: float, y: float, time: float = 0.0) -> tuple:
+        """
+        Evaluate the field at a point.
+
+        Parameters:
+            x (float): x-coordinate (m).
+            y (float): y-coordinate (m).
+            time (float): Time (s), only used for bodies with an ephemeris.
+
+        Returns:
+            tuple: The accelerations in the x and y directions (m/s^2), the potential per unit mass (J/kg)
+                and the first body whose surface contains the point, or None.
+        """
+        acceleration_x = 0.0
+        acceleration_y = 0.0
+        potential = 0.0
+        contact = None
+        for mu, body_x, body_y, radius_squared, ephemeris, body in self._terms:
+            if ephemeris is not None:
+                body_x, body_y = ephemeris.position(time)
+            dx = x - body_x
+            dy = y - body_y
+            distance_squared = dx * dx + dy * dy
+            distance = math.sqrt(distance_squared)
+            mu_over_distance = mu / distance
+            factor = mu_over_distance / distance_squared
+            acceleration_x -= factor * dx
+            acceleration_y -= factor * dy
+            potential -= mu_over_distance
+            if contact is None and distance_squared < radius_squared:
+                contact = body
+        return acceleration_x, acceleration_y, potential, contact
+
+    def evaluate_arrays(self, x: np.ndarray, y: np.ndarray, time=0.0) -> tuple:
+        """
+        Evaluate the field at many points at once.
+
+        Parameters:
+            x (np.ndarray): x-coordinates (m).
+            y (np.ndarray): y-coordinates (m).
+            time (float or np.ndarray): Time of all points or of each point (s), only used for bodies with an ephemeris.
+
+        Returns:
+            tuple: Arrays of the accelerations in the x and y directions (m/s^2), the potential per unit
+                mass (J/kg) and the index into bodies of the first body whose surface contains each point, -1 for none.
+        """
+        acceleration_x = np.zeros_like(x)
+        acceleration_y = np.zeros_like(x)
+        potential = np.zeros_like(x)
+        contact = np.full(x.shape, -1, dtype=np.int64)
+        for index, (mu, body_x, body_y, radius_squared, ephemeris, _) in enumerate(self._terms):
+            if ephemeris is not None:
+                body_x, body_y = ephemeris.positions(np.asarray(time, dtype=float))
+            dx = x - body_x
+            dy = y - body_y
+            distance_squared = dx * dx + dy * dy
+            distance = np.sqrt(distance_squared)
+            mu_over_distance = mu / distance
+            factor = mu_over_distance / distance_squared
+            acceleration_x -= factor * dx
+            acceleration_y -= factor * dy
+            potential -= mu_over_distance
+            contact[(contact < 0) & (distance_squared < radius_squared)] = index
+        return acceleration_x, acceleration_y, potential, contact
+
+    def __repr__(self) -> str:
+        """
+        Return a string representation of the field.
+
+        Returns:
+            str: A string listing the names of the bodies.
+        """
+        return f"GravityField(bodies={[body.name for body in self.bodies]})"
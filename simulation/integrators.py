@@ -0,0 +1,247 @@
+import math
+
+# Integrators that can be selected for a Rocket, mapped to their display names
+INTEGRATORS = {
+    "rk4": "Runge-Kutta 4 (fixed step)",
+    "dopri5": "Dormand-Prince 5(4) (adaptive)",
+    "verlet": "Velocity Verlet (symplectic)",
+    "yoshida4": "Yoshida 4th order (symplectic)",
+}
+
+# Version of the numerical results, to be bumped by any change that alters the trajectories the
+# integrators produce, so results cached by earlier versions are recomputed
+INTEGRATOR_VERSION = 3
+
+# Substep weights of the symplectic integrators, each substep being one kick-drift-kick Verlet step
+_YOSHIDA_W1 = 1 / (2 - 2 ** (1 / 3))
+_YOSHIDA_W0 = -(2 ** (1 / 3)) * _YOSHIDA_W1
+SYMPLECTIC_WEIGHTS = {
+    "verlet": (1.0,),
+    "yoshida4": (_YOSHIDA_W1, _YOSHIDA_W0, _YOSHIDA_W1),
+}
+
+# Dormand-Prince 5(4) Butcher tableau
+_DP_C = (0.0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1.0, 1.0)
+_DP_A = (
+    (),
+    (1 / 5,),
+    (3 / 40, 9 / 40),
+    (44 / 45, -56 / 15, 32 / 9),
+    (19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729),
+    (9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656),
+    (35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84),
+)
+# Difference between the 5th and 4th order weights, used for the error estimate
+_DP_E = (71 / 57600, 0.0, -71 / 16695, 71 / 1920, -17253 / 339200, 22 / 525, -1 / 40)
+# Coefficients of the continuous extension (Hairer, Norsett and Wanner's dense output)
+_DP_D = (
+    -12715105075 / 11282082432, 0.0, 87487479700 / 32700410799, -10690763975 / 1880347072,
+    701980252875 / 199316789632, -1453857185 / 822651844, 69997945 / 29380423,
+)
+
+# Step size controller settings
+_SAFETY = 0.9
+_MIN_FACTOR = 0.2
+_MAX_FACTOR = 10.0
+
+
+def dormand_prince_step(derivative, time: float, state: tuple, h: float, k1: tuple):
+    """
+    Take a single Dormand-Prince 5(4) step from the given state.
+
+    Parameters:
+        derivative (callable): Function mapping a time and a state tuple to the state's time derivative tuple.
+        time (float): The current time (s).
+        state (tuple): The current state.
+        h (float): Step size (s).
+        k1 (tuple): Derivative at the current state, reused from the previous step (first same as last).
+
+    Returns:
+        tuple: The 5th order state at the end of the step, the local error estimate and the seven stage derivatives.
+    """
+    stages = [k1]
+    for i in range(1, 7):
+        row = _DP_A[i]
+        stage_state = tuple(
+            value + h * sum(a * k[j] for a, k in zip(row, stages) if a)
+            for j, value in enumerate(state)
+        )
+        if i == 6:
+            # The last stage is evaluated at the new state itself
+            new_state = stage_state
+        stages.append(derivative(time + _DP_C[i] * h, stage_state))
+
+    error = tuple(
+        h * sum(e * k[j] for e, k in zip(_DP_E, stages) if e)
+        for j in range(len(state))
+    )
+    return new_state, error, stages
+
+
+def dormand_prince_dense(state: tuple, new_state: tuple, stages: list, h: float):
+    """
+    Build the continuous extension of an accepted Dormand-Prince step.
+
+    Parameters:
+        state (tuple): The state at the start of the step.
+        new_state (tuple): The state at the end of the step.
+        stages (list): The seven stage derivatives of the step.
+        h (float): Step size (s).
+
+    Returns:
+        callable: Function mapping theta in [0, 1] to the interpolated state at the start time + theta * h.
+    """
+    coefficients = []
+    for j, value in enumerate(state):
+        difference = new_state[j] - value
+        spline = h * stages[0][j] - difference
+        coefficients.append((
+            value,
+            difference,
+            spline,
+            difference - h * stages[6][j] - spline,
+            h * sum(d * k[j] for d, k in zip(_DP_D, stages) if d),
+        ))
+
+    def interpolate(theta: float) -> tuple:
+        theta1 = 1 - theta
+        return tuple(
+            c0 + theta * (c1 + theta1 * (c2 + theta * (c3 + theta1 * c4)))
+            for c0, c1, c2, c3, c4 in coefficients
+        )
+
+    return interpolate
+
+
+def hermite_interpolant(state: tuple, derivative: tuple, new_state: tuple, new_derivative: tuple, h: float):
+    """
+    Build the cubic Hermite interpolant of a step from the states and derivatives at both of its ends.
+
+    Any integrator provides these, so the interpolant serves where no dense output is available.
+
+    Parameters:
+        state (tuple): The state at the start of the step.
+        derivative (tuple): The state's time derivative at the start of the step.
+        new_state (tuple): The state at the end of the step.
+        new_derivative (tuple): The state's time derivative at the end of the step.
+        h (float): Step size (s).
+
+    Returns:
+        callable: Function mapping theta in [0, 1] to the interpolated state at the start time + theta * h.
+    """
+    def interpolate(theta: float) -> tuple:
+        theta2 = theta * theta
+        theta3 = theta2 * theta
+        h00 = 2 * theta3 - 3 * theta2 + 1
+        h10 = h * (theta3 - 2 * theta2 + theta)
+        h01 = -2 * theta3 + 3 * theta2
+        h11 = h * (theta3 - theta2)
+        return tuple(
+            h00 * p0 + h10 * m0 + h01 * p1 + h11 * m1
+            for p0, m0, p1, m1 in zip(state, derivative, new_state, new_derivative)
+        )
+
+    return interpolate
+
+
+def error_norm(error: tuple, state: tuple, new_state: tuple, rtol: float, atol: float) -> float:
+    """
+    Compute the scaled root-mean-square norm of a local error estimate.
+
+    Parameters:
+        error (tuple): The local error estimate.
+        state (tuple): The state at the start of the step.
+        new_state (tuple): The state at the end of the step.
+        rtol (float): Relative tolerance.
+        atol (float): Absolute tolerance.
+
+    Returns:
+        float: The error norm, where values up to 1 mean the step is accepted.
+    """
+    total = 0.0
+    for err, old, new in zip(error, state, new_state):
+        scale = atol + rtol * max(abs(old), abs(new))
+        total += (err / scale) ** 2
+    return math.sqrt(total / len(error))
+
+
+def next_step_size(h: float, norm: float) -> float:
+    """
+    Propose the next step size from the error norm of the current step.
+
+    Parameters:
+        h (float): The current step size (s).
+        norm (float): The error norm of the current step.
+
+    Returns:
+        float: The proposed step size (s).
+    """
+    if norm == 0:
+        return h * _MAX_FACTOR
+    factor = _SAFETY * norm ** (-1 / 5)
+    return h * min(_MAX_FACTOR, max(_MIN_FACTOR, factor))
+
+
+def symplectic_step(evaluate, state: tuple, time: float, h: float, weights: tuple, evaluation: tuple):
+    """
+    Take a single symplectic step as a composition of kick-drift-kick velocity Verlet substeps.
+
+    The field evaluation at the end of each substep is reused at the start of the next one, so a
+    step costs one force evaluation per weight.
+
+    Parameters:
+        evaluate (callable): Function mapping x, y and time to a field evaluation starting with (ax, ay), see GravityField.evaluate.
+        state (tuple): The current state (x, y, velocity_x, velocity_y).
+        time (float): The current time (s).
+        h (float): Step size (s).
+        weights (tuple): Substep weights, see SYMPLECTIC_WEIGHTS.
+        evaluation (tuple): Field evaluation at the current state, reused from the previous step.
+
+    Returns:
+        tuple: The state at the end of the step and the field evaluation there.
+    """
+    x, y, velocity_x, velocity_y = state
+    acceleration_x, acceleration_y = evaluation[0], evaluation[1]
+    for weight in weights:
+        dt = weight * h
+        velocity_x += 0.5 * dt * acceleration_x
+        velocity_y += 0.5 * dt * acceleration_y
+        x += dt * velocity_x
+        y += dt * velocity_y
+        time += dt
+        evaluation = evaluate(x, y, time)
+        acceleration_x, acceleration_y = evaluation[0], evaluation[1]
+        velocity_x += 0.5 * dt * acceleration_x
+        velocity_y += 0.5 * dt * acceleration_y
+    return (x, y, velocity_x, velocity_y), evaluation
+
+
+def energy_drift_per_orbit(total_energy_log: list, time_log: list, mu: float, x: float, y: float,
+                           velocity_x: float, velocity_y: float):
+    """
+    Estimate the relative drift of the total energy per orbital period.
+
+    The period is taken from the two-body orbit around the central body with gravitational
+    parameter mu, evaluated at the given state.
+
+    Parameters:
+        total_energy_log (list): Logged total energies (J).
+        time_log (list): Logged times (s).
+        mu (float): Gravitational parameter of the central body (m^3 s^-2).
+        x (float): x-coordinate (m).
+        y (float): y-coordinate (m).
+        velocity_x (float): Velocity in the x-direction (m/s).
+        velocity_y (float): Velocity in the y-direction (m/s).
+
+    Returns:
+        float: The relative energy change per orbit, or None if the orbit is unbound or no time has elapsed.
+    """
+    elapsed = time_log[-1] - time_log[0]
+    specific_energy = 0.5 * (velocity_x**2 + velocity_y**2) - mu / math.sqrt(x**2 + y**2)
+    if elapsed <= 0 or specific_energy >= 0 or total_energy_log[0] == 0:
+        return None
+
+    semi_major_axis = -mu / (2 * specific_energy)
+    period = 2 * math.pi * math.sqrt(semi_major_axis**3 / mu)
+    relative_drift = (total_energy_log[-1] - total_energy_log[0]) / abs(total_energy_log[0])
+    return relative_drift * period / elapsed
@@ -0,0 +1,277 @@
+"""
+Analytic two-body propagation.
+
+With a single body that does not move, the rocket follows a Kepler orbit, so its state at
+any time follows from the state at an epoch by solving Kepler's equation. The equation is
+solved in universal variables, which cover elliptic, parabolic and hyperbolic orbits, as
+well as radial ones, with a single formulation, vectorized over a whole grid of times.
+Apsis passages and the time the orbit reaches a given radius, e.g. the surface, are found
+in closed form from the eccentric, hyperbolic or parabolic anomaly.
+"""
+import math
+
+import numpy as np
+
+# Orbits with |alpha * r0| below this are treated as parabolic by the closed form event times
+PARABOLIC_TOLERANCE = 1e-9
+# Newton iterations stop once the universal anomaly changes by less than this, relative to its size
+_CHI_TOLERANCE = 1e-14
+_MAX_ITERATIONS = 100
+
+
+def stumpff(psi: np.ndarray) -> tuple:
+    """
+    Evaluate the Stumpff functions C and S.
+
+    Parameters:
+        psi (np.ndarray): Argument, alpha times the universal anomaly squared.
+
+    Returns:
+        tuple: Arrays of C(psi) and S(psi).
+    """
+    psi = np.asarray(psi, dtype=float)
+    c = np.empty_like(psi)
+    s = np.empty_like(psi)
+
+    # Series near zero, where the closed forms lose precision to cancellation
+    small = np.abs(psi) < 1e-2
+    p = psi[small]
+    c[small] = 1 / 2 - p / 24 + p**2 / 720 - p**3 / 40320
+    s[small] = 1 / 6 - p / 120 + p**2 / 5040 - p**3 / 362880
+
+    positive = psi >= 1e-2
+    root = np.sqrt(psi[positive])
+    c[positive] = (1 - np.cos(root)) / psi[positive]
+    s[positive] = (root - np.sin(root)) / root**3
+
+    negative = psi <= -1e-2
+    root = np.sqrt(-psi[negative])
+    c[negative] = (np.cosh(root) - 1) / -psi[negative]
+    s[negative] = (np.sinh(root) - root) / root**3
+    return c, s
+
+
+class KeplerOrbit:
+    """
+    Represents the two-body orbit through a state at an epoch.
+    """
+
+    def __init__(self, mu: float, time: float, x: float, y: float, velocity_x: float, velocity_y: float):
+        """
+        Initialize the orbit.
+
+        Parameters:
+            mu (float): Gravitational parameter of the central body (m^3 s^-2), which sits at the origin.
+            time (float): Epoch (s).
+            x (float): x-coordinate at the epoch (m).
+            y (float): y-coordinate at the epoch (m).
+            velocity_x (float): Velocity in the x-direction at the epoch (m/s).
+            velocity_y (float): Velocity in the y-direction at the epoch (m/s).
+        """
+        self.mu = mu
+        self.time = time
+        self.state = (x, y, velocity_x, velocity_y)
+
+        self._sqrt_mu = math.sqrt(mu)
+        self.r0 = math.hypot(x, y)
+        # r0 * radial velocity / sqrt(mu), and the reciprocal of the semi-major axis
+        self.sigma0 = (x * velocity_x + y * velocity_y) / self._sqrt_mu
+        self.alpha = 2 / self.r0 - (velocity_x**2 + velocity_y**2) / mu
+
+        if self.alpha * self.r0 > PARABOLIC_TOLERANCE:
+            self.kind = "elliptic"
+            self.period = 2 * math.pi / math.sqrt(mu * self.alpha**3)
+        elif self.alpha * self.r0 < -PARABOLIC_TOLERANCE:
+            self.kind = "hyperbolic"
+            self.period = math.inf
+        else:
+            self.kind = "parabolic"
+            self.period = math.inf
+
+    def _kepler(self, chi: np.ndarray) -> tuple:
+        """
+        (Private) Evaluate the universal Kepler equation.
+
+        Returns:
+            tuple: sqrt(mu) times the time of flight to the universal anomaly chi, and its derivative, the radius.
+        """
+        chi_squared = chi * chi
+        c, s = stumpff(self.alpha * chi_squared)
+        one_minus_alpha_r0 = 1 - self.alpha * self.r0
+        time_of_flight = (self.sigma0 * chi_squared * c + one_minus_alpha_r0 * chi_squared * chi * s
+                          + self.r0 * chi)
+        radius = (self.sigma0 * chi * (1 - self.alpha * chi_squared * s) + one_minus_alpha_r0 * chi_squared * c
+                  + self.r0)
+        return time_of_flight, radius
+
+    def _universal_anomaly(self, dt: np.ndarray) -> np.ndarray:
+        """
+        (Private) Solve the universal Kepler equation for non-negative times of flight.
+
+        Newton's method is safeguarded by bisection on a bracket, as the time of flight grows
+        monotonically with the universal anomaly.
+        """
+        target = self._sqrt_mu * dt
+        lower = np.zeros_like(dt)
+        if self.kind == "elliptic":
+            # Times are reduced to a single period, over which the anomaly grows by 2 pi / sqrt(alpha). The
+            # first guess comes from a first order solution of Kepler's equation in the eccentric anomaly
+            eccentricity, mean_anomaly, mean_motion, anomaly = self._anomalies()
+            mean_anomaly = mean_anomaly + mean_motion * dt
+            guess = np.mod(mean_anomaly + eccentricity * np.sin(mean_anomaly) - anomaly, 2 * math.pi)
+            upper = np.full_like(dt, 2 * math.pi / math.sqrt(self.alpha))
+            chi = guess / math.sqrt(self.alpha)
+        else:
+            if self.kind == "hyperbolic":
+                # Asymptotic solution of Kepler's equation in the hyperbolic anomaly
+                eccentricity, mean_anomaly, mean_motion, anomaly = self._anomalies()
+                mean_anomaly = mean_anomaly + mean_motion * dt
+                guess = np.sign(mean_anomaly) * np.log(2 * np.abs(mean_anomaly) / eccentricity + 1.8)
+                chi = np.maximum(guess - anomaly, 0.0) / math.sqrt(-self.alpha)
+            else:
+                chi = target / self.r0
+            upper = np.maximum(2 * chi, 1.0)
+            while True:
+                short = self._kepler(upper)[0] < target
+                if not short.any():
+                    break
+                upper[short] *= 2
+            chi = np.minimum(chi, upper)
+
+        for _ in range(_MAX_ITERATIONS):
+            time_of_flight, radius = self._kepler(chi)
+            residual = time_of_flight - target
+            lower = np.where(residual < 0, chi, lower)
+            upper = np.where(residual > 0, chi, upper)
+
+            new_chi = chi - residual / radius
+            outside = ~((new_chi >= lower) & (new_chi <= upper))
+            new_chi[outside] = 0.5 * (lower[outside] + upper[outside])
+            converged = np.abs(new_chi - chi) <= _CHI_TOLERANCE * (np.abs(new_chi) + 1)
+            chi = new_chi
+            if converged.all():
+                break
+        return chi
+
+    def states(self, times) -> tuple:
+        """
+        Evaluate the state at times at or after the epoch.
+
+        Parameters:
+            times (np.ndarray): Times (s).
+
+        Returns:
+            tuple: Arrays of the x and y coordinates (m) and velocities (m/s).
+        """
+        dt = np.asarray(times, dtype=float) - self.time
+        if self.kind == "elliptic":
+            dt = np.mod(dt, self.period)
+        chi = self._universal_anomaly(dt)
+
+        chi_squared = chi * chi
+        c, s = stumpff(self.alpha * chi_squared)
+        x0, y0, velocity_x0, velocity_y0 = self.state
+
+        # Lagrange coefficients
+        f = 1 - chi_squared * c / self.r0
+        g = dt - chi_squared * chi * s / self._sqrt_mu
+        x = f * x0 + g * velocity_x0
+        y = f * y0 + g * velocity_y0
+        radius = np.hypot(x, y)
+        f_dot = self._sqrt_mu / (radius * self.r0) * chi * (self.alpha * chi_squared * s - 1)
+        g_dot = 1 - chi_squared * c / radius
+        return x, y, f_dot * x0 + g_dot * velocity_x0, f_dot * y0 + g_dot * velocity_y0
+
+    def _anomalies(self) -> tuple:
+        """
+        (Private) Return the eccentricity, the mean anomaly at the epoch, the mean motion and the eccentric
+        or hyperbolic anomaly at the epoch of an elliptic or hyperbolic orbit.
+        """
+        cos_term = 1 - self.alpha * self.r0
+        if self.kind == "elliptic":
+            sin_term = self.sigma0 * math.sqrt(self.alpha)
+            eccentricity = math.hypot(cos_term, sin_term)
+            anomaly = math.atan2(sin_term, cos_term)
+            return eccentricity, anomaly - sin_term, math.sqrt(self.mu * self.alpha**3), anomaly
+        sinh_term = self.sigma0 * math.sqrt(-self.alpha)
+        eccentricity = math.sqrt(max(cos_term**2 - sinh_term**2, 0.0))
+        anomaly = math.atanh(sinh_term / cos_term)
+        return eccentricity, sinh_term - anomaly, math.sqrt(self.mu * (-self.alpha)**3), anomaly
+
+    def radius_crossing_time(self, radius: float):
+        """
+        Find when the orbit first falls to a radius, e.g. the surface of the central body.
+
+        Parameters:
+            radius (float): The radius (m).
+
+        Returns:
+            float: The time (s), the epoch if the state is already at or within the radius,
+                or None if the orbit never falls to it.
+        """
+        if self.r0 <= radius:
+            return self.time
+
+        if self.kind == "parabolic":
+            # r = r0 + sigma0 chi + chi^2 / 2, falling while chi < -sigma0
+            discriminant = self.sigma0**2 - 2 * (self.r0 - radius)
+            if discriminant < 0:
+                return None
+            chi = -self.sigma0 - math.sqrt(discriminant)
+            if chi <= 0:
+                return None
+            return self.time + (self.r0 * chi + self.sigma0 * chi**2 / 2 + chi**3 / 6) / self._sqrt_mu
+
+        eccentricity, mean_anomaly, mean_motion, _ = self._anomalies()
+        if eccentricity == 0:
+            return None
+        # e cos E (or e cosh F) at the radius, on the falling side of the orbit
+        cos_term = (1 - self.alpha * radius) / eccentricity
+        if self.kind == "elliptic":
+            if cos_term > 1:
+                return None
+            anomaly = 2 * math.pi - math.acos(max(cos_term, -1.0))
+            target = anomaly - eccentricity * math.sin(anomaly)
+            return self.time + ((target - mean_anomaly) % (2 * math.pi)) / mean_motion
+        if cos_term < 1:
+            return None
+        anomaly = -math.acosh(cos_term)
+        target = eccentricity * math.sinh(anomaly) - anomaly
+        if target <= mean_anomaly:
+            return None
+        return self.time + (target - mean_anomaly) / mean_motion
+
+    def apsis_times(self, start_time: float, end_time: float) -> tuple:
+        """
+        Find the periapsis and apoapsis passages within a time span.
+
+        Parameters:
+            start_time (float): Start of the span, excluded (s).
+            end_time (float): End of the span, included (s).
+
+        Returns:
+            tuple: Arrays of the periapsis and the apoapsis passage times (s).
+        """
+        if self.kind == "parabolic":
+            times = np.array([self.time + (self.r0 * -self.sigma0 + self.sigma0**3 / 3) / self._sqrt_mu])
+            if self.sigma0 >= 0:
+                times = np.empty(0)
+            return times[(times > start_time) & (times <= end_time)], np.empty(0)
+
+        eccentricity, mean_anomaly, mean_motion, _ = self._anomalies()
+        if self.kind == "hyperbolic":
+            times = np.array([self.time - mean_anomaly / mean_motion]) if mean_anomaly < 0 else np.empty(0)
+            return times[(times > start_time) & (times <= end_time)], np.empty(0)
+
+        # The mean anomaly is a multiple of 2 pi at periapsis, and pi more at apoapsis
+        passages = []
+        for phase in (0.0, math.pi):
+            first = math.floor((mean_anomaly + mean_motion * (start_time - self.time) - phase) / (2 * math.pi)) + 1
+            last = math.floor((mean_anomaly + mean_motion * (end_time - self.time) - phase) / (2 * math.pi))
+            turns = np.arange(first, last + 1, dtype=float)
+            times = self.time + (phase + 2 * math.pi * turns - mean_anomaly) / mean_motion
+            passages.append(times[(times > start_time) & (times <= end_time)])
+        return passages[0], passages[1]
+
+    def __repr__(self) -> str:
+        return f"KeplerOrbit(kind={self.kind!r}, time={self.time}, r0={self.r0:.1f}, alpha={self.alpha:.3e})"
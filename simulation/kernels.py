@@ -0,0 +1,229 @@
+"""
+Compiled propagation kernel for fixed-step runs.
+
+When Numba is installed, whole chunks of Runge-Kutta 4 or symplectic steps, with their logging,
+energies and event checks, run in a single compiled call that writes the logged samples straight
+into the trajectory's preallocated store. The kernel repeats the arithmetic of Rocket.step and
+GravityField.evaluate operation for operation, so it reproduces the Python path's states and logs
+bit for bit. It does not locate events itself: it stops before any step within which an event
+function could cross zero, and the rocket takes that step in Python, so the event records are the
+same as well. Only fields whose bodies do not move, with the standard events, are supported.
+
+The compiled code is cached on disk next to this module, so only the first run after installing
+or changing it pays for the compilation. Without Numba the functions below are plain Python, and
+runners keep using Rocket.step, see Rocket.compiled_applicable.
+"""
+import math
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Whether the kernel is compiled, and so worth using in place of Rocket.step
+JIT_AVAILABLE = numba is not None
+
+# Reasons propagate returns: the step limit or end time was reached, an event may occur within
+# the next step, or the log store is full
+STOPPED = 0
+EVENT = 1
+FULL = 2
+
+# Integration methods of the kernel
+RK4 = 0
+SYMPLECTIC = 1
+
+# Event function values within this fraction of their scale of zero, or of the distance the rocket
+# can cover in a step, are left to the Python path, so rounding differences in math.hypot between
+# the two paths can never change which steps are checked for events
+_EVENT_MARGIN = 1e-9
+
+
+def _jit(function):
+    """
+    (Private) Compile a function with Numba when it is installed, caching the machine code on disk.
+    """
+    if numba is None:
+        return function
+    return numba.njit(cache=True)(function)
+
+
+@_jit
+def evaluate(x, y, mu, body_x, body_y):
+    """
+    Evaluate the field of bodies that do not move at a point, as GravityField.evaluate.
+
+    Parameters:
+        x (float): x-coordinate (m).
+        y (float): y-coordinate (m).
+        mu (np.ndarray): Gravitational parameter of each body (m^3 s^-2).
+        body_x (np.ndarray): x-coordinate of each body (m).
+        body_y (np.ndarray): y-coordinate of each body (m).
+
+    Returns:
+        tuple: The accelerations in the x and y directions (m/s^2) and the potential per unit mass (J/kg).
+    """
+    acceleration_x = 0.0
+    acceleration_y = 0.0
+    potential = 0.0
+    for index in range(mu.shape[0]):
+        dx = x - body_x[index]
+        dy = y - body_y[index]
+        distance_squared = dx * dx + dy * dy
+        distance = math.sqrt(distance_squared)
+        mu_over_distance = mu[index] / distance
+        factor = mu_over_distance / distance_squared
+        acceleration_x -= factor * dx
+        acceleration_y -= factor * dy
+        potential -= mu_over_distance
+    return acceleration_x, acceleration_y, potential
+
+
+@_jit
+def event_possible(x0, y0, velocity_x0, velocity_y0, x1, y1, velocity_x1, velocity_y1, h,
+                   body_x, body_y, radius, influence):
+    """
+    Check conservatively whether any of the standard events could occur within a step, see events.default_events.
+
+    Parameters:
+        x0, y0, velocity_x0, velocity_y0 (float): State at the start of the step.
+        x1, y1, velocity_x1, velocity_y1 (float): State at the end of the step.
+        h (float): Step size (s).
+        body_x (np.ndarray): x-coordinate of each body (m), the first one being the central body.
+        body_y (np.ndarray): y-coordinate of each body (m).
+        radius (np.ndarray): Radius of each body (m).
+        influence (np.ndarray): Sphere of influence radius of each body but the first (m).
+
+    Returns:
+        bool: False only if the EventDetector would find no crossing within the step.
+    """
+    # Apsis passages about the central body, where the radial velocity changes sign
+    dx0 = x0 - body_x[0]
+    dy0 = y0 - body_y[0]
+    dx1 = x1 - body_x[0]
+    dy1 = y1 - body_y[0]
+    radial0 = dx0 * velocity_x0 + dy0 * velocity_y0
+    radial1 = dx1 * velocity_x1 + dy1 * velocity_y1
+    if (radial0 > 0) != (radial1 > 0):
+        return True
+    speed0 = math.hypot(velocity_x0, velocity_y0)
+    speed1 = math.hypot(velocity_x1, velocity_y1)
+    if min(abs(radial0), abs(radial1)) <= _EVENT_MARGIN * math.hypot(dx0, dy0) * speed0:
+        return True
+
+    reach = h * max(speed0, speed1) * (1 + _EVENT_MARGIN)
+    for index in range(body_x.shape[0]):
+        distance0 = math.hypot(x0 - body_x[index], y0 - body_y[index])
+        distance1 = math.hypot(x1 - body_x[index], y1 - body_y[index])
+
+        # Contact, which the detector also samples within the step when the surface is within reach
+        margin = _EVENT_MARGIN * radius[index]
+        if min(distance0, distance1) - radius[index] <= reach + margin:
+            return True
+
+        # Sphere of influence crossings of the other bodies
+        if index > 0:
+            margin = _EVENT_MARGIN * influence[index]
+            outside0 = distance0 - influence[index]
+            outside1 = distance1 - influence[index]
+            if (outside0 > 0) != (outside1 > 0) or min(abs(outside0), abs(outside1)) <= margin:
+                return True
+    return False
+
+
+@_jit
+def propagate(x, y, velocity_x, velocity_y, time, h, method, weights, mu, body_x, body_y, radius, influence,
+              mass, every, interval, logged_steps, last_logged_time, samples, max_steps, time_target):
+    """
+    Take fixed steps until the step limit or end time is reached, an event may occur, or the log store is full.
+
+    Parameters:
+        x, y, velocity_x, velocity_y (float): The current state.
+        time (float): The current time (s).
+        h (float): Time step (s).
+        method (int): RK4 or SYMPLECTIC.
+        weights (np.ndarray): Substep weights of the symplectic method, see integrators.SYMPLECTIC_WEIGHTS.
+        mu, body_x, body_y, radius, influence (np.ndarray): The bodies, see evaluate and event_possible.
+        mass (float): The mass of the rocket (kg).
+        every (int): Record every Nth step, see Trajectory.due.
+        interval (float): Record a step only once this many seconds have passed since the last sample (s),
+            0 to use every instead.
+        logged_steps (int): Steps counted by the trajectory so far.
+        last_logged_time (float): Time of the last recorded sample (s).
+        samples (np.ndarray): Free rows of the log store, see Trajectory.reserve.
+        max_steps (int): Maximum number of steps to take.
+        time_target (float): End time of the run (s).
+
+    Returns:
+        tuple: The number of steps taken, the number of samples written, the reason for returning,
+            and the time and state (x, y, velocity_x, velocity_y) reached.
+    """
+    acceleration_x, acceleration_y, potential = evaluate(x, y, mu, body_x, body_y)
+    steps = 0
+    count = 0
+    status = STOPPED
+    while steps < max_steps and time < time_target:
+        if method == RK4:
+            kutta_2x = velocity_x + (h * acceleration_x) / 2
+            kutta_2y = velocity_y + (h * acceleration_y) / 2
+            kutta_2vx, kutta_2vy, _ = evaluate(x + (h * velocity_x) / 2, y + (h * velocity_y) / 2, mu, body_x, body_y)
+
+            kutta_3x = velocity_x + (h * kutta_2vx) / 2
+            kutta_3y = velocity_y + (h * kutta_2vy) / 2
+            kutta_3vx, kutta_3vy, _ = evaluate(x + (h * kutta_2x) / 2, y + (h * kutta_2y) / 2, mu, body_x, body_y)
+
+            kutta_4x = velocity_x + (h * kutta_3vx)
+            kutta_4y = velocity_y + (h * kutta_3vy)
+            kutta_4vx, kutta_4vy, _ = evaluate(x + (h * kutta_3x), y + (h * kutta_3y), mu, body_x, body_y)
+
+            new_x = x + ((h / 6) * (velocity_x + (2 * kutta_2x) + (2 * kutta_3x) + kutta_4x))
+            new_y = y + ((h / 6) * (velocity_y + (2 * kutta_2y) + (2 * kutta_3y) + kutta_4y))
+            new_velocity_x = velocity_x + ((h / 6) * (acceleration_x + (2 * kutta_2vx) + (2 * kutta_3vx) + kutta_4vx))
+            new_velocity_y = velocity_y + ((h / 6) * (acceleration_y + (2 * kutta_2vy) + (2 * kutta_3vy) + kutta_4vy))
+            new_acceleration_x, new_acceleration_y, new_potential = evaluate(new_x, new_y, mu, body_x, body_y)
+        else:
+            new_x, new_y, new_velocity_x, new_velocity_y = x, y, velocity_x, velocity_y
+            new_acceleration_x, new_acceleration_y, new_potential = acceleration_x, acceleration_y, potential
+            for weight in weights:
+                dt = weight * h
+                new_velocity_x += 0.5 * dt * new_acceleration_x
+                new_velocity_y += 0.5 * dt * new_acceleration_y
+                new_x += dt * new_velocity_x
+                new_y += dt * new_velocity_y
+                new_acceleration_x, new_acceleration_y, new_potential = evaluate(new_x, new_y, mu, body_x, body_y)
+                new_velocity_x += 0.5 * dt * new_acceleration_x
+                new_velocity_y += 0.5 * dt * new_acceleration_y
+        new_time = time + h
+
+        # Leave the step to the Python path if it needs a closer look for events
+        if event_possible(x, y, velocity_x, velocity_y, new_x, new_y, new_velocity_x, new_velocity_y, h,
+                          body_x, body_y, radius, influence):
+            status = EVENT
+            break
+
+        if interval > 0:
+            due = new_time >= last_logged_time + interval
+        else:
+            due = (logged_steps + 1) % every == 0
+        if due and count == samples.shape[0]:
+            status = FULL
+            break
+
+        x, y, velocity_x, velocity_y, time = new_x, new_y, new_velocity_x, new_velocity_y, new_time
+        acceleration_x, acceleration_y, potential = new_acceleration_x, new_acceleration_y, new_potential
+        logged_steps += 1
+        steps += 1
+        if due:
+            ke = 0.5 * mass * (velocity_x * velocity_x + velocity_y * velocity_y)
+            gpe = mass * potential
+            samples[count, 0] = time
+            samples[count, 1] = x
+            samples[count, 2] = y
+            samples[count, 3] = velocity_x
+            samples[count, 4] = velocity_y
+            samples[count, 5] = ke
+            samples[count, 6] = gpe
+            samples[count, 7] = ke + gpe
+            last_logged_time = time
+            count += 1
+    return steps, count, status, time, x, y, velocity_x, velocity_y
@@ -0,0 +1,669 @@
+"""
+Multi-body mode: massive bodies that attract each other, and vehicles that only feel them.
+
+The bodies are Planets with initial velocities, integrated together as an N-body system
+instead of being held fixed or moved along an ephemeris. The vehicles are test particles:
+they are pulled by every body but have no pull of their own, so adding vehicles never
+changes the bodies' motion. The forces are evaluated with array operations in two separate
+parts, the M x M interactions among the M bodies and the N x M pulls on the N vehicles, so
+the cost of a step grows linearly with the number of vehicles.
+
+A scenario is read from a JSON file, see NBodySimulation.from_config, and can be run from
+the GUI (Open Scenario...) or without a display:
+    python -m simulation.nbody scenarios/earth_moon_constellation.json --output logs.npz
+"""
+import argparse
+import json
+import math
+
+import numpy as np
+
+from simulation.integrators import SYMPLECTIC_WEIGHTS
+from simulation.planet import Planet
+from simulation.planet_constants import G_CONSTANT
+
+# Integrators of the multi-body mode, the adaptive one is only available for single rockets
+NBODY_INTEGRATORS = ("rk4", "verlet", "yoshida4")
+
+# Samples preallocated in the logs, which grow by at least this much when full
+_LOG_CHUNK = 4096
+
+# Keys allowed in a scenario file and in its body and vehicle entries
+_SCENARIO_KEYS = {"name", "G", "h", "duration", "integrator", "log_every", "barycentric", "bodies", "vehicles"}
+_BODY_KEYS = {"name", "mass", "radius", "x", "y", "vx", "vy", "relative_to", "circular"}
+_VEHICLE_KEYS = {"name", "x", "y", "vx", "vy", "relative_to", "circular", "count"}
+
+
+def body_accelerations(x: np.ndarray, y: np.ndarray, mu: np.ndarray):
+    """
+    Evaluate the mutual gravity of the massive bodies.
+
+    Parameters:
+        x (np.ndarray): x-coordinate of each body (m).
+        y (np.ndarray): y-coordinate of each body (m).
+        mu (np.ndarray): Gravitational parameter G * mass of each body (m^3 s^-2).
+
+    Returns:
+        tuple: The accelerations in the x and y directions of each body (m/s^2), and the potential per unit
+            mass at each body due to the others (J/kg).
+    """
+    # Separation from each body (rows) to each other body (columns)
+    dx = x[np.newaxis, :] - x[:, np.newaxis]
+    dy = y[np.newaxis, :] - y[:, np.newaxis]
+    distance_squared = dx * dx + dy * dy
+    # A body does not attract itself
+    np.fill_diagonal(distance_squared, np.inf)
+    distance = np.sqrt(distance_squared)
+
+    mu_over_distance = mu[np.newaxis, :] / distance
+    factor = mu_over_distance / distance_squared
+    acceleration_x = (factor * dx).sum(axis=1)
+    acceleration_y = (factor * dy).sum(axis=1)
+    potential = -mu_over_distance.sum(axis=1)
+    return acceleration_x, acceleration_y, potential
+
+
+def vehicle_accelerations(x: np.ndarray, y: np.ndarray, body_x: np.ndarray, body_y: np.ndarray, mu: np.ndarray,
+                          radius_squared: np.ndarray):
+    """
+    Evaluate the gravity of the massive bodies on test particles.
+
+    Parameters:
+        x (np.ndarray): x-coordinate of each vehicle (m).
+        y (np.ndarray): y-coordinate of each vehicle (m).
+        body_x (np.ndarray): x-coordinate of each body (m).
+        body_y (np.ndarray): y-coordinate of each body (m).
+        mu (np.ndarray): Gravitational parameter G * mass of each body (m^3 s^-2).
+        radius_squared (np.ndarray): Squared radius of each body (m^2).
+
+    Returns:
+        tuple: The accelerations in the x and y directions of each vehicle (m/s^2), and the index of the
+            body each vehicle is in contact with, -1 for none.
+    """
+    # Separation from each vehicle (rows) to each body (columns)
+    dx = body_x[np.newaxis, :] - x[:, np.newaxis]
+    dy = body_y[np.newaxis, :] - y[:, np.newaxis]
+    distance_squared = dx * dx + dy * dy
+    factor = mu[np.newaxis, :] / (distance_squared * np.sqrt(distance_squared))
+    acceleration_x = (factor * dx).sum(axis=1)
+    acceleration_y = (factor * dy).sum(axis=1)
+
+    inside = distance_squared < radius_squared[np.newaxis, :]
+    contact = np.where(inside.any(axis=1), inside.argmax(axis=1), -1)
+    return acceleration_x, acceleration_y, contact
+
+
+def _body_contact(x: np.ndarray, y: np.ndarray, radius: np.ndarray):
+    """
+    (Private) Find the first pair of bodies whose surfaces overlap.
+
+    Returns:
+        tuple: The indices of the two bodies, or None if no surfaces overlap.
+    """
+    dx = x[np.newaxis, :] - x[:, np.newaxis]
+    dy = y[np.newaxis, :] - y[:, np.newaxis]
+    reach = radius[np.newaxis, :] + radius[:, np.newaxis]
+    overlap = np.triu(dx * dx + dy * dy < reach * reach, k=1)
+    if not overlap.any():
+        return None
+    first, second = np.argwhere(overlap)[0]
+    return int(first), int(second)
+
+
+def _circular_velocity(mu: float, dx: float, dy: float) -> tuple:
+    """
+    (Private) Velocity of a circular orbit, counterclockwise, at an offset from the attracting body.
+    """
+    distance = math.hypot(dx, dy)
+    if distance == 0:
+        raise ValueError("A circular orbit needs a nonzero offset from the body it orbits.")
+    speed = math.sqrt(mu / distance)
+    return -speed * dy / distance, speed * dx / distance
+
+
+class NBodySimulation:
+    """
+    Propagates massive bodies under their mutual gravity together with test-particle vehicles.
+
+    All objects share one fixed-step integrator. Every step evaluates the body-body forces once
+    per substep and the vehicle forces for the surviving vehicles only, like Ensemble, a vehicle
+    that touches a body being stopped on its own. Two bodies touching end the run.
+
+    The interface follows SimulationRunner (run_chunk, progress, steps, finished, crash_message),
+    so the GUI's SimulationWorker can drive either.
+    """
+
+    def __init__(self, bodies: list, vehicles: list, h: float, time_target: float, integrator: str = "rk4",
+                 log_every: int = 1, G: float = G_CONSTANT, name: str = "Scenario"):
+        """
+        Initialize the simulation with the initial states of the bodies and vehicles.
+
+        Parameters:
+            bodies (list[Planet]): The massive bodies, at their positions and velocities at time 0.
+            vehicles (list[tuple]): The vehicles as (name, x, y, velocity_x, velocity_y) tuples (m, m/s).
+            h (float): Time step (s).
+            time_target (float): Time to propagate up to (s).
+            integrator (str): One of NBODY_INTEGRATORS.
+            log_every (int): Record every Nth step.
+            G (float): The gravitational constant (m^3 kg^-1 s^-2).
+            name (str): Name of the scenario.
+        """
+        if not bodies:
+            raise ValueError("A multi-body simulation needs at least one body.")
+        if h <= 0:
+            raise ValueError("Time step must be positive.")
+        if integrator not in NBODY_INTEGRATORS:
+            raise ValueError(f"Unknown multi-body integrator {integrator!r}, expected one of {', '.join(NBODY_INTEGRATORS)}.")
+        if log_every < 1:
+            raise ValueError("Logging interval must be at least one step.")
+
+        self.name = name
+        self.bodies = list(bodies)
+        self.vehicle_names = [vehicle[0] for vehicle in vehicles]
+        self.h = float(h)
+        self.time_target = float(time_target)
+        self.integrator = integrator
+        self.log_every = int(log_every)
+        self.G = G
+
+        # Constants of the bodies
+        self.mass = np.array([body.mass for body in self.bodies], dtype=float)
+        self.mu = G * self.mass
+        self.radius = np.array([body.radius for body in self.bodies], dtype=float)
+        self._radius_squared = self.radius * self.radius
+
+        # One state array for all objects, the bodies first and then the vehicles
+        vehicle_states = np.array([vehicle[1:] for vehicle in vehicles], dtype=float).reshape(-1, 4)
+        self.x = np.concatenate([[body.x for body in self.bodies], vehicle_states[:, 0]])
+        self.y = np.concatenate([[body.y for body in self.bodies], vehicle_states[:, 1]])
+        self.velocity_x = np.concatenate([[body.velocity_x for body in self.bodies], vehicle_states[:, 2]])
+        self.velocity_y = np.concatenate([[body.velocity_y for body in self.bodies], vehicle_states[:, 3]])
+        self.time = 0.0
+        self.start_time = 0.0
+        self.steps = 0
+
+        # A vehicle merely inside a body crashes at once, but at its centre the body's pull is undefined
+        at_centre = ((vehicle_states[:, 0, np.newaxis] == self.x[np.newaxis, :self.body_count])
+                     & (vehicle_states[:, 1, np.newaxis] == self.y[np.newaxis, :self.body_count]))
+        if at_centre.any():
+            vehicle, body = np.argwhere(at_centre)[0]
+            raise ValueError(f"Vehicle {self.vehicle_names[vehicle]!r} must not start at the centre of "
+                             f"{self.bodies[body].name!r}.")
+
+        # Crash bookkeeping per vehicle
+        self.alive = np.ones(self.vehicle_count, dtype=bool)
+        self.crash_time = np.full(self.vehicle_count, np.nan)
+        self.crash_body = np.full(self.vehicle_count, -1, dtype=np.int64)
+        self.finished = False
+        self.crash_message = None
+
+        # Accelerations at the current states, carried from step to step, and the bodies' potentials
+        self.acceleration_x, self.acceleration_y, self._body_potential, contact = self._accelerations(
+            self.x, self.y, self.body_count
+        )
+        if _body_contact(self.x[:self.body_count], self.y[:self.body_count], self.radius) is not None:
+            raise ValueError("Bodies must not overlap at the start of the run.")
+        self._record_crashes(np.arange(self.vehicle_count), contact)
+
+        # Logs, grown in chunks with one row per logged step and one column per body or vehicle
+        self._size = 0
+        capacity = min(math.ceil(max(self.time_target, 0.0) / self.h / self.log_every) + 2, _LOG_CHUNK)
+        self._time_log = np.empty(capacity)
+        self._body_x_log = np.empty((capacity, self.body_count))
+        self._body_y_log = np.empty((capacity, self.body_count))
+        self._x_log = np.empty((capacity, self.vehicle_count))
+        self._y_log = np.empty((capacity, self.vehicle_count))
+        self._energy_log = np.empty((capacity, 3))
+        self.initial_energy = self.energy()[2]
+        self._log()
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Build a simulation from a scenario.
+
+        The scenario is a JSON object with the keys
+            name         name of the scenario
+            h            time step (s)
+            duration     time to propagate up to (s)
+            integrator   one of NBODY_INTEGRATORS, default "rk4"
+            log_every    record every Nth step, default 1
+            G            gravitational constant, default the SI value
+            barycentric  whether to move the bodies to their barycentre's frame, default false
+            bodies       list of bodies with a name, mass (kg) and radius (m)
+            vehicles     list of vehicles with a name, optionally a count of copies
+
+        Every body and vehicle takes a position x, y (m) and velocity vx, vy (m/s), all default 0.
+        With relative_to set to the name of a body listed earlier, these are offsets from that body's
+        state, and with circular set to true the velocity offset of a circular orbit about it is
+        added. The copies of a vehicle with a count are spread evenly around the body it is
+        relative to, named by appending their number.
+
+        Parameters:
+            config (dict | str): The scenario, or the path of a JSON file holding it.
+
+        Returns:
+            NBodySimulation: The simulation at time 0.
+        """
+        if isinstance(config, str):
+            with open(config) as file:
+                config = json.load(file)
+        if not isinstance(config, dict):
+            raise ValueError("A scenario must be a JSON object.")
+        _check_keys(config, _SCENARIO_KEYS, "scenario")
+        for key in ("h", "duration", "bodies"):
+            if key not in config:
+                raise ValueError(f"Scenario is missing {key!r}.")
+
+        G = float(config.get("G", G_CONSTANT))
+        bodies = []
+        by_name = {}
+        for entry in config["bodies"]:
+            _check_keys(entry, _BODY_KEYS, "body")
+            name = str(entry.get("name", f"Body {len(bodies) + 1}"))
+            if name in by_name:
+                raise ValueError(f"Body name {name!r} is used twice.")
+            try:
+                mass, radius = float(entry["mass"]), float(entry["radius"])
+            except KeyError as e:
+                raise ValueError(f"Body {name!r} is missing {e.args[0]!r}.") from None
+            if mass <= 0 or radius <= 0:
+                raise ValueError(f"Body {name!r} must have a positive mass and radius.")
+            x, y, velocity_x, velocity_y = _resolve_state(entry, by_name, G, mass)
+            body = Planet(name, mass, radius, x, y, velocity_x=velocity_x, velocity_y=velocity_y)
+            bodies.append(body)
+            by_name[name] = body
+
+        if config.get("barycentric", False):
+            _to_barycentre(bodies)
+
+        vehicles = []
+        for entry in config.get("vehicles", []):
+            _check_keys(entry, _VEHICLE_KEYS, "vehicle")
+            name = str(entry.get("name", f"Vehicle {len(vehicles) + 1}"))
+            count = int(entry.get("count", 1))
+            if count < 1:
+                raise ValueError(f"Vehicle {name!r} must have a count of at least 1.")
+            if count > 1 and "relative_to" not in entry:
+                raise ValueError(f"Vehicle {name!r} needs relative_to to spread its {count} copies around.")
+            for copy in range(count):
+                angle = 2 * math.pi * copy / count
+                x, y, velocity_x, velocity_y = _resolve_state(entry, by_name, G, 0.0, angle)
+                vehicles.append((f"{name} {copy + 1}" if count > 1 else name, x, y, velocity_x, velocity_y))
+
+        return cls(
+            bodies, vehicles, float(config["h"]), float(config["duration"]),
+            integrator=config.get("integrator", "rk4"), log_every=int(config.get("log_every", 1)), G=G,
+            name=str(config.get("name", "Scenario")),
+        )
+
+    @property
+    def body_count(self) -> int:
+        """
+        Returns:
+            int: The number of massive bodies.
+        """
+        return len(self.bodies)
+
+    @property
+    def vehicle_count(self) -> int:
+        """
+        Returns:
+            int: The number of vehicles.
+        """
+        return len(self.vehicle_names)
+
+    @property
+    def body_names(self) -> list:
+        """
+        Returns:
+            list[str]: The names of the bodies.
+        """
+        return [body.name for body in self.bodies]
+
+    @property
+    def progress(self) -> float:
+        """
+        Returns:
+            float: Fraction of the simulated time span completed, between 0 and 1.
+        """
+        span = self.time_target - self.start_time
+        if self.finished or span <= 0:
+            return 1.0
+        return min(1.0, max(0.0, (self.time - self.start_time) / span))
+
+    @property
+    def logged_samples(self) -> int:
+        """
+        Returns:
+            int: The number of samples in the logs, which are safe to plot while the run continues.
+        """
+        return self._size
+
+    def _accelerations(self, x: np.ndarray, y: np.ndarray, bodies: int):
+        """
+        (Private) Evaluate the accelerations of a state array whose first entries are the bodies.
+
+        Returns:
+            tuple: The accelerations in the x and y directions of every object (m/s^2), the potential per
+                unit mass at each body (J/kg), and the body each vehicle is in contact with, -1 for none.
+        """
+        body_x, body_y = x[:bodies], y[:bodies]
+        body_ax, body_ay, potential = body_accelerations(body_x, body_y, self.mu)
+        vehicle_ax, vehicle_ay, contact = vehicle_accelerations(
+            x[bodies:], y[bodies:], body_x, body_y, self.mu, self._radius_squared
+        )
+        return np.concatenate([body_ax, vehicle_ax]), np.concatenate([body_ay, vehicle_ay]), potential, contact
+
+    def _runge_kutta_step(self, h: float, x, y, velocity_x, velocity_y, acceleration_x, acceleration_y):
+        """
+        (Private) Advance the given states by one RK4 step. This mirrors Ensemble._runge_kutta_step.
+
+        Returns:
+            tuple: The new x, y, x-velocity and y-velocity, and the result of _accelerations there.
+        """
+        bodies = self.body_count
+
+        # Second Runge Kutta evaluations
+        kutta_2x = velocity_x + (h * acceleration_x) / 2
+        kutta_2y = velocity_y + (h * acceleration_y) / 2
+        kutta_2vx, kutta_2vy, _, _ = self._accelerations(x + (h * velocity_x) / 2, y + (h * velocity_y) / 2, bodies)
+
+        # Third Runge Kutta evaluations
+        kutta_3x = velocity_x + (h * kutta_2vx) / 2
+        kutta_3y = velocity_y + (h * kutta_2vy) / 2
+        kutta_3vx, kutta_3vy, _, _ = self._accelerations(x + (h * kutta_2x) / 2, y + (h * kutta_2y) / 2, bodies)
+
+        # Fourth Runge Kutta evaluations
+        kutta_4x = velocity_x + (h * kutta_3vx)
+        kutta_4y = velocity_y + (h * kutta_3vy)
+        kutta_4vx, kutta_4vy, _, _ = self._accelerations(x + (h * kutta_3x), y + (h * kutta_3y), bodies)
+
+        # Position and velocity updates
+        x_plus1 = x + ((h / 6) * (velocity_x + (2 * kutta_2x) + (2 * kutta_3x) + kutta_4x))
+        y_plus1 = y + ((h / 6) * (velocity_y + (2 * kutta_2y) + (2 * kutta_3y) + kutta_4y))
+        velocity_x_plus1 = velocity_x + ((h / 6) * (acceleration_x + (2 * kutta_2vx) + (2 * kutta_3vx) + kutta_4vx))
+        velocity_y_plus1 = velocity_y + ((h / 6) * (acceleration_y + (2 * kutta_2vy) + (2 * kutta_3vy) + kutta_4vy))
+        return (x_plus1, y_plus1, velocity_x_plus1, velocity_y_plus1,
+                *self._accelerations(x_plus1, y_plus1, bodies))
+
+    def _symplectic_step(self, h: float, x, y, velocity_x, velocity_y, acceleration_x, acceleration_y):
+        """
+        (Private) Advance the given states by one step of the symplectic integrator, as Rocket does.
+
+        Returns:
+            tuple: The new x, y, x-velocity and y-velocity, and the result of _accelerations there.
+        """
+        bodies = self.body_count
+        for weight in SYMPLECTIC_WEIGHTS[self.integrator]:
+            dt = weight * h
+            velocity_x = velocity_x + 0.5 * dt * acceleration_x
+            velocity_y = velocity_y + 0.5 * dt * acceleration_y
+            x = x + dt * velocity_x
+            y = y + dt * velocity_y
+            acceleration_x, acceleration_y, potential, contact = self._accelerations(x, y, bodies)
+            velocity_x = velocity_x + 0.5 * dt * acceleration_x
+            velocity_y = velocity_y + 0.5 * dt * acceleration_y
+        return x, y, velocity_x, velocity_y, acceleration_x, acceleration_y, potential, contact
+
+    def step(self) -> None:
+        """
+        Advance every body and surviving vehicle by one time step, log it when due, and stop crashed vehicles.
+        """
+        bodies = self.body_count
+        # Only the bodies and surviving vehicles are stepped
+        if self.alive.all():
+            index = slice(None)
+            vehicles = np.arange(self.vehicle_count)
+        else:
+            vehicles = np.flatnonzero(self.alive)
+            index = np.concatenate([np.arange(bodies), bodies + vehicles])
+
+        advance = self._runge_kutta_step if self.integrator == "rk4" else self._symplectic_step
+        x, y, velocity_x, velocity_y, acceleration_x, acceleration_y, self._body_potential, contact = advance(
+            self.h, self.x[index], self.y[index], self.velocity_x[index], self.velocity_y[index],
+            self.acceleration_x[index], self.acceleration_y[index]
+        )
+        self.x[index] = x
+        self.y[index] = y
+        self.velocity_x[index] = velocity_x
+        self.velocity_y[index] = velocity_y
+        self.acceleration_x[index] = acceleration_x
+        self.acceleration_y[index] = acceleration_y
+        self.time += self.h
+        self.steps += 1
+
+        self._record_crashes(vehicles, contact)
+        collision = _body_contact(x[:bodies], y[:bodies], self.radius)
+        if collision is not None:
+            first, second = (self.bodies[i].name for i in collision)
+            self.crash_message = f"{first} collided with {second}!"
+            self.finished = True
+
+        if self.finished or self.steps % self.log_every == 0:
+            self._log()
+
+    def _record_crashes(self, vehicles: np.ndarray, contact: np.ndarray) -> None:
+        """
+        (Private) Stop the given vehicles that are in contact with a body.
+        """
+        crashed = contact >= 0
+        if crashed.any():
+            members = vehicles[crashed]
+            self.alive[members] = False
+            self.crash_time[members] = self.time
+            self.crash_body[members] = contact[crashed]
+
+    def run_chunk(self, max_steps: int) -> bool:
+        """
+        Advance the simulation by at most max_steps steps.
+
+        Parameters:
+            max_steps (int): Maximum number of steps to take.
+
+        Returns:
+            bool: True once the run has reached the target time or bodies collided.
+        """
+        for _ in range(max_steps):
+            if self.finished or self.time >= self.time_target:
+                break
+            self.step()
+
+        if not self.finished and self.time >= self.time_target:
+            # Make sure the end of a decimated run is in the logs
+            if self._time_log[self._size - 1] != self.time:
+                self._log()
+            self.finished = True
+        return self.finished
+
+    def run(self) -> None:
+        """
+        Advance the simulation until it reaches the target time or bodies collide.
+        """
+        while not self.run_chunk(10000):
+            pass
+
+    def close(self) -> None:
+        """
+        Nothing to release, for compatibility with SimulationRunner.
+        """
+
+    def energy(self) -> tuple:
+        """
+        Returns:
+            tuple: The kinetic, potential and total energy of the bodies (J), which the vehicles do not change.
+        """
+        bodies = self.body_count
+        velocity_x, velocity_y = self.velocity_x[:bodies], self.velocity_y[:bodies]
+        ke = float(0.5 * (self.mass * (velocity_x * velocity_x + velocity_y * velocity_y)).sum())
+        # Every pair is counted from both sides
+        gpe = float(0.5 * (self.mass * self._body_potential).sum())
+        return ke, gpe, ke + gpe
+
+    def energy_error(self) -> float:
+        """
+        Returns:
+            float: The largest relative deviation of the bodies' logged total energy from its initial value.
+        """
+        if self.initial_energy == 0:
+            return 0.0
+        total = self._energy_log[:self._size, 2]
+        return float(np.max(np.abs(total - self.initial_energy)) / abs(self.initial_energy))
+
+    def _log(self) -> None:
+        """
+        (Private) Record the current time, positions and energies, NaN for vehicles that have crashed.
+        """
+        if self._size == self._time_log.shape[0]:
+            self._grow()
+        row = self._size
+        bodies = self.body_count
+        self._time_log[row] = self.time
+        self._body_x_log[row] = self.x[:bodies]
+        self._body_y_log[row] = self.y[:bodies]
+        self._x_log[row] = np.where(self.alive, self.x[bodies:], np.nan)
+        self._y_log[row] = np.where(self.alive, self.y[bodies:], np.nan)
+        self._energy_log[row] = self.energy()
+        # Rows are complete before they are counted, so a reader never sees a partial one
+        self._size = row + 1
+
+    def _grow(self) -> None:
+        """
+        (Private) Reallocate the logs with room for at least another chunk of samples.
+        """
+        extra = max(self._size, _LOG_CHUNK)
+        for name in ("_time_log", "_body_x_log", "_body_y_log", "_x_log", "_y_log", "_energy_log"):
+            log = getattr(self, name)
+            grown = np.empty((log.shape[0] + extra,) + log.shape[1:])
+            grown[:self._size] = log[:self._size]
+            setattr(self, name, grown)
+
+    def logs(self, count: int = None) -> dict:
+        """
+        Return views of the first count logged samples.
+
+        Parameters:
+            count (int): Number of samples, defaults to all of them.
+
+        Returns:
+            dict: Arrays under the keys 'time', 'body_x', 'body_y' (one column per body), 'x', 'y' (one column
+                per vehicle, NaN after a crash), and 'ke', 'gpe', 'total_energy' of the bodies.
+        """
+        count = self._size if count is None else min(count, self._size)
+        energies = self._energy_log[:count]
+        return {
+            "time": self._time_log[:count],
+            "body_x": self._body_x_log[:count], "body_y": self._body_y_log[:count],
+            "x": self._x_log[:count], "y": self._y_log[:count],
+            "ke": energies[:, 0], "gpe": energies[:, 1], "total_energy": energies[:, 2],
+        }
+
+    def crashes(self) -> list:
+        """
+        Returns:
+            list[tuple]: The name of each crashed vehicle with the name of the body it hit and the time, in time order.
+        """
+        members = np.flatnonzero(~self.alive)
+        members = members[np.argsort(self.crash_time[members], kind="stable")]
+        return [(self.vehicle_names[m], self.bodies[self.crash_body[m]].name, float(self.crash_time[m]))
+                for m in members]
+
+    def summary(self) -> dict:
+        """
+        Returns:
+            dict: The scenario name, counts of bodies, vehicles and steps, the time reached, the bodies'
+                relative energy error, the crash message and the vehicles' crashes.
+        """
+        return {
+            "name": self.name, "bodies": self.body_count, "vehicles": self.vehicle_count, "steps": self.steps,
+            "time": self.time, "energy_error": self.energy_error(), "crash_message": self.crash_message,
+            "crashes": [{"vehicle": vehicle, "body": body, "time": time} for vehicle, body, time in self.crashes()],
+        }
+
+    def save(self, path: str) -> None:
+        """
+        Write the logs and the names of the bodies and vehicles to a NumPy .npz file.
+
+        Parameters:
+            path (str): Path of the file.
+        """
+        np.savez_compressed(path, body_names=np.array(self.body_names), vehicle_names=np.array(self.vehicle_names),
+                            crash_time=self.crash_time, **self.logs())
+
+    def __repr__(self) -> str:
+        """
+        Return a string representation of the simulation's current state.
+
+        Returns:
+            str: A string summarizing the scenario, its size, time and number of crashed vehicles.
+        """
+        return (f"NBodySimulation(name={self.name!r}, bodies={self.body_count}, vehicles={self.vehicle_count}, "
+                f"time={self.time:.2f}, crashed={int((~self.alive).sum())})")
+
+
+def _check_keys(entry, allowed: set, kind: str) -> None:
+    """
+    (Private) Reject scenario entries that are not objects or have unknown keys.
+    """
+    if not isinstance(entry, dict):
+        raise ValueError(f"Each {kind} entry must be a JSON object.")
+    unknown = set(entry) - allowed
+    if unknown:
+        raise ValueError(f"Unknown {kind} parameters: {', '.join(sorted(unknown))}.")
+
+
+def _resolve_state(entry: dict, by_name: dict, G: float, mass: float, angle: float = 0.0) -> tuple:
+    """
+    (Private) Absolute initial state of a scenario entry, see NBodySimulation.from_config.
+
+    The offset and velocity offset are rotated by angle (rad) about the body the entry is relative to.
+    """
+    dx, dy = float(entry.get("x", 0.0)), float(entry.get("y", 0.0))
+    velocity_dx, velocity_dy = float(entry.get("vx", 0.0)), float(entry.get("vy", 0.0))
+    parent = entry.get("relative_to")
+    if parent is None:
+        if entry.get("circular", False):
+            raise ValueError(f"{entry.get('name', 'An entry')!r} needs relative_to for a circular orbit.")
+        return dx, dy, velocity_dx, velocity_dy
+    if parent not in by_name:
+        raise ValueError(f"Unknown body {parent!r}, relative_to must name a body listed earlier.")
+    parent = by_name[parent]
+
+    cos, sin = math.cos(angle), math.sin(angle)
+    dx, dy = cos * dx - sin * dy, sin * dx + cos * dy
+    velocity_dx, velocity_dy = cos * velocity_dx - sin * velocity_dy, sin * velocity_dx + cos * velocity_dy
+    if entry.get("circular", False):
+        # The two bodies orbit their common barycentre, a vehicle adds no mass
+        circular_x, circular_y = _circular_velocity(G * (parent.mass + mass), dx, dy)
+        velocity_dx += circular_x
+        velocity_dy += circular_y
+    return parent.x + dx, parent.y + dy, parent.velocity_x + velocity_dx, parent.velocity_y + velocity_dy
+
+
+def _to_barycentre(bodies: list) -> None:
+    """
+    (Private) Shift the bodies' states so their barycentre is at rest at the origin.
+    """
+    total = sum(body.mass for body in bodies)
+    for attribute in ("x", "y", "velocity_x", "velocity_y"):
+        centre = sum(body.mass * getattr(body, attribute) for body in bodies) / total
+        for body in bodies:
+            setattr(body, attribute, getattr(body, attribute) - centre)
+
+
+def main(argv: list = None) -> None:
+    """Command line entry point of the multi-body mode."""
+    parser = argparse.ArgumentParser(description="Run a multi-body scenario without the GUI.")
+    parser.add_argument("scenario", help="JSON file describing the bodies and vehicles.")
+    parser.add_argument("--output", default=None, help="Write the logs to this .npz file.")
+    args = parser.parse_args(argv)
+
+    simulation = NBodySimulation.from_config(args.scenario)
+    simulation.run()
+    if args.output is not None:
+        simulation.save(args.output)
+    print(json.dumps(simulation.summary(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
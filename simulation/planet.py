@@ -2,18 +2,54 @@ import math
 
 class Planet:
     """
-    Represents a celestial body located at the origin (0, 0).
+    Represents a celestial body at a fixed position, by default the origin (0, 0),
+    or moving along a tabulated ephemeris. The velocity is the initial one of a body
+    integrated in the multi-body mode, see simulation.nbody.
     """
 
-    def __init__(self, name: str, mass: float, radius: float):
+    def __init__(self, name: str, mass: float, radius: float, x: float = 0.0, y: float = 0.0, ephemeris=None,
+                 velocity_x: float = 0.0, velocity_y: float = 0.0):
         """
-        Initialize the planet with its name, mass, and radius.
+        Initialize the planet with its name, mass, radius, position and velocity.
 
         Parameters:
             name (str): The name of the planet.
             mass (float): The mass of the planet in kilograms.
             radius (float): The radius of the planet in meters.
+            x (float): The x-coordinate of the planet's centre in meters.
+            y (float): The y-coordinate of the planet's centre in meters.
+            ephemeris (Ephemeris): Optional tabulated orbit, which overrides the fixed position.
+            velocity_x (float): The x-velocity of the planet in m/s.
+            velocity_y (float): The y-velocity of the planet in m/s.
         """
         self.name = name
         self.mass = mass
         self.radius = radius
+        self.x = x
+        self.y = y
+        self.ephemeris = ephemeris
+        self.velocity_x = velocity_x
+        self.velocity_y = velocity_y
+
+    def position(self, time: float) -> tuple:
+        """
+        Return the planet's position at a time.
+
+        Parameters:
+            time (float): Time (s).
+
+        Returns:
+            tuple: The x and y coordinates of the planet's centre in meters.
+        """
+        if self.ephemeris is None:
+            return self.x, self.y
+        return self.ephemeris.position(time)
+
+    def __repr__(self) -> str:
+        """
+        Return a string representation of the planet.
+
+        Returns:
+            str: A string summarizing the planet's name, mass, radius and position.
+        """
+        return f"Planet(name={self.name!r}, mass={self.mass:.4e}, radius={self.radius:.4e}, x={self.x:.4e}, y={self.y:.4e})"
@@ -0,0 +1,322 @@
+"""
+Instrumentation of the simulation loop and the plot.
+
+A Profiler attached to a SimulationRunner (see SimulationRunner.set_profiler) or a
+SimulationPlot collects the wall time of each phase of a run:
+    run         chunks of steps, including the following phases
+      force     field evaluations, wherever they are made
+      events    event detection, without its field evaluations
+      logging   energies and log appends, without their field evaluations
+      stream    writing the logs to a trajectory file
+      compiled  steps taken in the compiled kernel, see simulation.kernels
+    integrator  the rest of the run phase, i.e. the integrator's own arithmetic
+    plot        updating the plot's artists and decimating the logs
+    render      drawing the canvas
+
+and counters of steps, rejected steps, force evaluations, events and logged samples.
+Phases that run many times per step are only accumulated, while chunks, plot updates and
+draws are also recorded as spans that can be exported as a Chrome trace, viewable in
+chrome://tracing or Perfetto.
+
+Without a profiler attached, the instrumented code only checks an attribute for None,
+and the field and canvas are not wrapped at all, so profiling can be turned on and off
+at any time, even during a run. A runner picks up a new profiler at the start of its next
+chunk, so the field is never rewrapped while a step is evaluating it.
+
+One profiler can be shared by a simulation worker and the GUI thread drawing the plot.
+Each thread accumulates its own timers and counters, which the report merges.
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+
+# Phases within the run phase, which are subtracted from it to get the integrator's own time
+_RUN_PHASES = ("force", "events", "logging", "stream", "compiled")
+# Phases timed without the field evaluations made within them, which go to the force phase
+_EXCLUSIVE_PHASES = ("events", "logging", "stream")
+# Phases that do not overlap, whose sum is the instrumented time
+_TOP_PHASES = ("run", "plot", "render")
+
+
+class _ThreadProfile:
+    """
+    (Private) The timers, counters and force time recorded by one thread.
+    """
+
+    __slots__ = ("timers", "counters", "force_seconds", "force_mark")
+
+    def __init__(self):
+        # Seconds and number of calls of each phase, and the counters
+        self.timers = {}
+        self.counters = {}
+        # Total force time, and its value at the start of the current exclusive phase
+        self.force_seconds = 0.0
+        self.force_mark = 0.0
+
+
+class Profiler:
+    """
+    Collects per-phase timers, counters and trace spans, see the module docstring.
+    """
+
+    def __init__(self, trace: bool = True, max_spans: int = 100000):
+        """
+        Initialize an empty profile.
+
+        Parameters:
+            trace (bool): Whether to record spans for a Chrome trace.
+            max_spans (int): Most spans kept, later ones are only accumulated.
+        """
+        self.trace = trace
+        self.max_spans = max_spans
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Discard everything collected so far.
+        """
+        self.spans = []
+        self.dropped_spans = 0
+        self._origin = time.perf_counter()
+
+        # The profile of each thread that recorded into this one, see _thread_profile
+        self._local = threading.local()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def _thread_profile(self) -> _ThreadProfile:
+        """
+        (Private) The profile the calling thread records into, created on its first use.
+        """
+        try:
+            return self._local.profile
+        except AttributeError:
+            profile = _ThreadProfile()
+            with self._lock:
+                self._threads.append(profile)
+            self._local.profile = profile
+            return profile
+
+    @property
+    def timers(self) -> dict:
+        """
+        Returns:
+            dict: The seconds and number of calls of each phase, summed over the threads.
+        """
+        timers = {}
+        for profile in list(self._threads):
+            for phase, (seconds, calls) in list(profile.timers.items()):
+                entry = timers.setdefault(phase, [0.0, 0])
+                entry[0] += seconds
+                entry[1] += calls
+        return timers
+
+    @property
+    def counters(self) -> dict:
+        """
+        Returns:
+            dict: The counters, summed over the threads.
+        """
+        counters = {}
+        for profile in list(self._threads):
+            for name, amount in list(profile.counters.items()):
+                counters[name] = counters.get(name, 0) + amount
+        return counters
+
+    def start(self) -> float:
+        """
+        Start timing a phase.
+
+        Returns:
+            float: The current time.perf_counter(), to pass to lap.
+        """
+        profile = self._thread_profile()
+        profile.force_mark = profile.force_seconds
+        return time.perf_counter()
+
+    def lap(self, phase: str, start: float) -> float:
+        """
+        Add the time since start to a phase. Consecutive phases can be timed by passing the
+        returned time to the next lap.
+
+        Parameters:
+            phase (str): Name of the phase.
+            start (float): Time returned by start or the previous lap.
+
+        Returns:
+            float: The current time.perf_counter(), to start the next phase from.
+        """
+        now = time.perf_counter()
+        seconds = now - start
+        profile = self._thread_profile()
+        if phase in _EXCLUSIVE_PHASES:
+            seconds -= profile.force_seconds - profile.force_mark
+            profile.force_mark = profile.force_seconds
+        entry = profile.timers.get(phase)
+        if entry is None:
+            profile.timers[phase] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+        return now
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """
+        Increase a counter.
+
+        Parameters:
+            name (str): Name of the counter.
+            amount (int): Amount to add.
+        """
+        counters = self._thread_profile().counters
+        counters[name] = counters.get(name, 0) + amount
+
+    def add_span(self, phase: str, start: float, **args) -> None:
+        """
+        Add the time since start to a phase and record it as a trace span.
+
+        Parameters:
+            phase (str): Name of the phase.
+            start (float): time.perf_counter() at the start of the phase.
+            args: Values shown with the span in the trace.
+        """
+        end = self.lap(phase, start)
+        if self.trace:
+            if len(self.spans) < self.max_spans:
+                self.spans.append((phase, start, end, threading.get_ident(), args))
+            else:
+                self.dropped_spans += 1
+
+    @contextlib.contextmanager
+    def span(self, phase: str, **args):
+        """
+        Time a block as a phase and record it as a trace span, see add_span.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(phase, start, **args)
+
+    def attach_field(self, field) -> None:
+        """
+        Time and count the evaluations of a gravity field as the force phase.
+
+        Only call it while nothing evaluates the field, e.g. between the chunks of a run.
+
+        Parameters:
+            field (GravityField): The field, whose evaluation methods are wrapped on the instance.
+        """
+        evaluate = type(field).evaluate.__get__(field)
+        evaluate_arrays = type(field).evaluate_arrays.__get__(field)
+
+        def timed_evaluate(*args):
+            start = time.perf_counter()
+            result = evaluate(*args)
+            self._thread_profile().force_seconds += self.lap("force", start) - start
+            self.count("force_evaluations")
+            return result
+
+        def timed_evaluate_arrays(x, *args):
+            start = time.perf_counter()
+            result = evaluate_arrays(x, *args)
+            self._thread_profile().force_seconds += self.lap("force", start) - start
+            # One evaluation per point
+            self.count("force_evaluations", getattr(x, "size", 1))
+            return result
+
+        field.evaluate = timed_evaluate
+        field.evaluate_arrays = timed_evaluate_arrays
+
+    @staticmethod
+    def detach_field(field) -> None:
+        """
+        Restore the evaluation methods of a field wrapped by attach_field.
+
+        Parameters:
+            field (GravityField): The field.
+        """
+        vars(field).pop("evaluate", None)
+        vars(field).pop("evaluate_arrays", None)
+
+    def report(self) -> dict:
+        """
+        Summarize the profile.
+
+        Returns:
+            dict: The 'wall_seconds' since the profile was started and the 'instrumented_seconds' of the run,
+                plot and render phases. Under 'phases' the 'seconds', 'calls', mean 'microseconds' per call and
+                'share' of the instrumented time of each phase, including 'integrator'. Under 'counters' the
+                counters, and under 'rates' the steps per second and force evaluations per step.
+        """
+        timers = {phase: tuple(entry) for phase, entry in self.timers.items()}
+        if "run" in timers:
+            inner = sum(timers[phase][0] for phase in _RUN_PHASES if phase in timers)
+            timers["integrator"] = (max(timers["run"][0] - inner, 0.0), timers["run"][1])
+        instrumented = sum(timers[phase][0] for phase in _TOP_PHASES if phase in timers)
+
+        phases = {
+            phase: {
+                "seconds": seconds, "calls": calls, "microseconds": seconds / calls * 1e6 if calls else 0.0,
+                "share": seconds / instrumented if instrumented > 0 else 0.0,
+            }
+            for phase, (seconds, calls) in sorted(timers.items(), key=lambda item: -item[1][0])
+        }
+
+        counters = self.counters
+        steps = counters.get("steps", 0)
+        run_seconds = timers.get("run", (0.0, 0))[0]
+        rates = {
+            "steps_per_second": steps / run_seconds if steps and run_seconds > 0 else None,
+            "force_evaluations_per_step": counters.get("force_evaluations", 0) / steps if steps else None,
+        }
+        return {
+            "wall_seconds": time.perf_counter() - self._origin, "instrumented_seconds": instrumented,
+            "phases": phases, "counters": counters, "rates": rates, "dropped_spans": self.dropped_spans,
+        }
+
+    def summary(self) -> str:
+        """
+        Returns:
+            str: A one-line summary of the phases with the largest shares and the steps per second.
+        """
+        report = self.report()
+        parts = [f"{phase} {values['share']:.0%}" for phase, values in report["phases"].items()
+                 if phase != "run" and values["share"] >= 0.01]
+        steps_per_second = report["rates"]["steps_per_second"]
+        if steps_per_second is not None:
+            parts.append(f"{steps_per_second:,.0f} steps/s")
+        if "render" in report["phases"]:
+            parts.append(f"{report['phases']['render']['microseconds'] / 1000:.1f} ms per draw")
+        return "Profile: " + (", ".join(parts) if parts else "nothing recorded")
+
+    def export_json(self, path: str) -> None:
+        """
+        Write the report to a JSON file.
+
+        Parameters:
+            path (str): Path of the file.
+        """
+        with open(path, "w") as file:
+            json.dump(self.report(), file, indent=2)
+
+    def export_chrome_trace(self, path: str) -> None:
+        """
+        Write the spans to a Chrome trace file, with the report's counters as metadata.
+
+        Parameters:
+            path (str): Path of the file.
+        """
+        pid = os.getpid()
+        events = [
+            {"name": phase, "ph": "X", "ts": (start - self._origin) * 1e6, "dur": (end - start) * 1e6,
+             "pid": pid, "tid": thread, "args": args}
+            for phase, start, end, thread, args in self.spans
+        ]
+        with open(path, "w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms", "otherData": self.report()}, file)
+
+    def __repr__(self) -> str:
+        return f"Profiler(phases={list(self.timers)}, counters={self.counters}, spans={len(self.spans)})"
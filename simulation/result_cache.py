@@ -0,0 +1,371 @@
+"""
+Content-addressed cache of finished runs.
+
+A run is identified by a hash of every input that affects its result: the case parameters
+(see simulation.batch.DEFAULT_CASE), the physical constants in simulation.planet_constants
+and the integrator version. Repeating a run then returns the stored trajectory instead of
+integrating it again.
+
+The cache has two tiers: recently used results are kept in memory up to a byte budget, and
+with a directory given, every result is also stored there as a trajectory file (see
+simulation.trajectory_file) and a JSON file with its summary and events, evicting the least
+recently used results beyond a size limit. The disk tier can be shared between processes,
+e.g. the workers of a batch run.
+"""
+import functools
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from simulation import planet_constants
+from simulation.events import EventRecord
+from simulation.integrators import INTEGRATOR_VERSION
+from simulation.trajectory_file import DEFAULT_FILE_CHUNK, TrajectoryFile, TrajectoryWriter
+
+# Default byte budgets of the memory and disk tiers
+DEFAULT_MEMORY_BYTES = 512 * 1024 * 1024
+DEFAULT_DISK_BYTES = 4 * 1024 * 1024 * 1024
+
+_SUFFIX = ".traj"
+_SUMMARY_SUFFIX = ".json"
+
+
+def cache_key(case: dict) -> str:
+    """
+    Hash the inputs of a run.
+
+    Numbers are hashed by value, so e.g. a mass of 100 and 100.0 give the same key. Runs on the analytic
+    orbit around the Earth alone, the default, do not depend on the integrator settings, only on whether the
+    integrator is adaptive, which sets the time of the last step, so these are left out of their key.
+
+    Parameters:
+        case (dict): The complete case parameters, see simulation.batch.DEFAULT_CASE.
+
+    Returns:
+        str: The hex digest identifying the run.
+    """
+    parameters = {
+        name: float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else value
+        for name, value in case.items()
+    }
+    if parameters.get("analytic") and not parameters.get("moon"):
+        parameters["integrator"] = "adaptive" if parameters.get("integrator") == "dopri5" else "fixed"
+        parameters.pop("rtol", None)
+        parameters.pop("atol", None)
+    constants = {name: value for name, value in vars(planet_constants).items() if name.isupper()}
+    encoded = json.dumps(
+        {"case": parameters, "constants": constants, "integrator_version": INTEGRATOR_VERSION}, sort_keys=True
+    )
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class SimulationResult:
+    """
+    The outcome of a run, detached from the rocket and runner that produced it.
+    """
+
+    def __init__(self, case: dict, header: dict, data: np.ndarray, crash_message: str = None, crash_time: float = None,
+                 steps: int = 0, end_time: float = None, events: list = None, energy_drift_per_orbit: float = None):
+        """
+        Initialize the result.
+
+        Parameters:
+            case (dict): The case parameters of the run.
+            header (dict): Description of the run, see SimulationRunner.header.
+            data (np.ndarray): The logged samples, with dtype TRAJECTORY_DTYPE.
+            crash_message (str): Message of the event or error that stopped the run, None if it reached its end.
+            crash_time (float): Time of the terminal event (s), None if there was none.
+            steps (int): Number of steps taken.
+            end_time (float): Time the run ended at (s).
+            events (list): The EventRecords of the run.
+            energy_drift_per_orbit (float): Relative energy drift per orbit, see Rocket.energy_drift_per_orbit.
+        """
+        self.case = case
+        self.header = header
+        self.data = data
+        self.crash_message = crash_message
+        self.crash_time = crash_time
+        self.steps = steps
+        self.end_time = end_time
+        self.events = events if events is not None else []
+        self.energy_drift_per_orbit = energy_drift_per_orbit
+
+    @classmethod
+    def from_runner(cls, case: dict, runner):
+        """
+        Collect the result of a run.
+
+        Parameters:
+            case (dict): The case parameters of the run.
+            runner (SimulationRunner): The run, whose logs must have been kept in memory.
+
+        Returns:
+            SimulationResult: The result, sharing the logs of the runner's rocket.
+        """
+        rocket = runner.rocket
+        return cls(
+            case, runner.header(), rocket.trajectory.data, crash_message=runner.crash_message,
+            crash_time=rocket.terminal_event.time if rocket.terminal_event is not None else None,
+            steps=runner.steps, end_time=rocket.time, events=list(runner.events),
+            energy_drift_per_orbit=runner.energy_drift_per_orbit(),
+        )
+
+    def summary(self) -> dict:
+        """
+        Returns:
+            dict: Everything but the logs as plain values, e.g. for JSON output.
+        """
+        return {
+            "case": self.case, "crash_message": self.crash_message, "crash_time": self.crash_time,
+            "steps": self.steps, "end_time": self.end_time, "events": [record.as_dict() for record in self.events],
+            "energy_drift_per_orbit": self.energy_drift_per_orbit,
+        }
+
+    def save(self, path: str, chunk_size: int = DEFAULT_FILE_CHUNK, events: bool = True) -> None:
+        """
+        Write the logs to a trajectory file, as if the run had been streamed to it.
+
+        Parameters:
+            path (str): Path of the file.
+            chunk_size (int): Number of samples per chunk of the file.
+            events (bool): Whether the events are written to the file's sidecar, so a continuation keeps them.
+        """
+        with TrajectoryWriter(path, self.header, chunk_size) as writer:
+            writer.append(self.data)
+            if events and self.events:
+                writer.write_events([record.as_dict() for record in self.events])
+
+    @classmethod
+    def load(cls, path: str, summary: dict):
+        """
+        Read a result from a trajectory file and its summary.
+
+        Parameters:
+            path (str): Path of the trajectory file, see save.
+            summary (dict): The output of summary.
+
+        Returns:
+            SimulationResult: The result.
+        """
+        trajectory_file = TrajectoryFile(path)
+        data = trajectory_file.slice()
+        trajectory_file.close()
+
+        header = trajectory_file.header
+        return cls(
+            summary["case"], header, data, crash_message=summary["crash_message"], crash_time=summary["crash_time"],
+            steps=summary["steps"], end_time=summary["end_time"],
+            events=[EventRecord.from_dict(values) for values in summary["events"]],
+            energy_drift_per_orbit=summary["energy_drift_per_orbit"],
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns:
+            int: The number of bytes of the logs.
+        """
+        return self.data.nbytes
+
+    def __repr__(self) -> str:
+        return f"SimulationResult(samples={self.data.shape[0]}, steps={self.steps}, crash_message={self.crash_message!r})"
+
+
+class ResultCache:
+    """
+    Two-tier cache of SimulationResults keyed by their case, see the module docstring.
+    """
+
+    def __init__(self, memory_bytes: int = DEFAULT_MEMORY_BYTES, directory: str = None,
+                 disk_bytes: int = DEFAULT_DISK_BYTES):
+        """
+        Initialize the cache.
+
+        Parameters:
+            memory_bytes (int): Most bytes of logs kept in memory. Larger results are only stored on disk.
+            directory (str): Optional directory of the disk tier, created if needed.
+            disk_bytes (int): Most bytes of trajectory files kept in the directory.
+        """
+        self.memory_bytes = memory_bytes
+        self.directory = directory
+        self.disk_bytes = disk_bytes
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+        # Results in memory from least to most recently used, and the bytes they hold
+        self._memory = OrderedDict()
+        self._memory_size = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, case: dict):
+        """
+        Look up the result of a case.
+
+        Parameters:
+            case (dict): The complete case parameters.
+
+        Returns:
+            SimulationResult: The stored result, or None if the case has not been stored.
+        """
+        key = cache_key(case)
+        result = self._memory.get(key)
+        if result is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return result
+
+        result = self._load(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self._remember(key, result)
+        self.hits += 1
+        return result
+
+    def put(self, case: dict, result: SimulationResult) -> None:
+        """
+        Store the result of a case in both tiers.
+
+        Only results of runs that reached their end or a terminal event should be stored, not cancelled ones.
+
+        Parameters:
+            case (dict): The complete case parameters.
+            result (SimulationResult): The result, whose logs are copied.
+        """
+        key = cache_key(case)
+        if self.directory is not None:
+            self._store(key, result)
+        if result.nbytes <= self.memory_bytes:
+            # Copied, so later changes to the run's logs do not reach the cache
+            data = result.data.copy()
+            data.flags.writeable = False
+            self._remember(key, SimulationResult(
+                dict(case), result.header, data, result.crash_message, result.crash_time, result.steps,
+                result.end_time, list(result.events), result.energy_drift_per_orbit,
+            ))
+
+    def _remember(self, key: str, result: SimulationResult) -> None:
+        """
+        (Private) Add a result to the memory tier, evicting the least recently used ones beyond the budget.
+        """
+        if key in self._memory:
+            self._memory_size -= self._memory.pop(key).nbytes
+        if result.nbytes > self.memory_bytes:
+            return
+        self._memory[key] = result
+        self._memory_size += result.nbytes
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= evicted.nbytes
+
+    def _path(self, key: str) -> str:
+        """
+        (Private) Path of a result's trajectory file in the disk tier, its summary sits next to it.
+        """
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def _load(self, key: str):
+        """
+        (Private) Read a result from the disk tier, None if it is not there or unreadable.
+        """
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            with open(path[:-len(_SUFFIX)] + _SUMMARY_SUFFIX) as file:
+                summary = json.load(file)
+            result = SimulationResult.load(path, summary)
+            # Mark the result as recently used for eviction
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError):
+            # A damaged result is dropped and recomputed
+            self._remove(path)
+            return None
+        result.data.flags.writeable = False
+        return result
+
+    def _store(self, key: str, result: SimulationResult) -> None:
+        """
+        (Private) Write a result to the disk tier, then evict the least recently used results beyond the limit.
+        """
+        path = self._path(key)
+        summary_path = path[:-len(_SUFFIX)] + _SUMMARY_SUFFIX
+        partial = f".{os.getpid()}.partial"
+
+        # Written under temporary names, so other processes never read a partial file. The trajectory
+        # file goes last, as a result only counts as stored once it exists
+        with open(summary_path + partial, "w") as file:
+            json.dump(result.summary(), file)
+        os.replace(summary_path + partial, summary_path)
+        # The events are in the summary already
+        result.save(path + partial, chunk_size=min(max(result.data.shape[0], 1), DEFAULT_FILE_CHUNK), events=False)
+        os.replace(path + partial, path)
+
+        results = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(_SUFFIX):
+                try:
+                    stat = entry.stat()
+                    size = stat.st_size + os.path.getsize(entry.path[:-len(_SUFFIX)] + _SUMMARY_SUFFIX)
+                except FileNotFoundError:
+                    continue
+                results.append((stat.st_mtime, size, entry.path))
+        total = sum(size for _, size, _ in results)
+        for _, size, result_path in sorted(results):
+            if total <= self.disk_bytes:
+                break
+            self._remove(result_path)
+            total -= size
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        """
+        (Private) Delete a result's files from the disk tier, which another process may have deleted already.
+        """
+        for file_path in (path, path[:-len(_SUFFIX)] + _SUMMARY_SUFFIX):
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+
+    def clear(self) -> None:
+        """
+        Drop every stored result from both tiers.
+        """
+        self._memory.clear()
+        self._memory_size = 0
+        if self.directory is not None:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(_SUFFIX):
+                    self._remove(entry.path)
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def __repr__(self) -> str:
+        return (f"ResultCache(entries={len(self._memory)}, memory_bytes={self._memory_size}, "
+                f"directory={self.directory!r}, hits={self.hits}, misses={self.misses})")
+
+
+@functools.lru_cache(maxsize=None)
+def shared_cache(directory: str = None, disk_bytes: int = DEFAULT_DISK_BYTES,
+                 memory_bytes: int = DEFAULT_MEMORY_BYTES) -> ResultCache:
+    """
+    Return the cache this process uses for a disk directory, creating it on first use.
+
+    Parameters:
+        directory (str): Directory of the disk tier, None for a memory-only cache.
+        disk_bytes (int): Most bytes of trajectory files kept in the directory.
+        memory_bytes (int): Most bytes of logs kept in memory.
+
+    Returns:
+        ResultCache: The same cache for every call with the same arguments.
+    """
+    return ResultCache(memory_bytes, directory, disk_bytes)
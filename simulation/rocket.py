@@ -1,5 +1,18 @@
 import math
 
+import numpy as np
+
+from simulation import kernels
+from simulation.events import (
+    EventDetector, EventRecord, apsis_events, contact_event, default_events, sphere_of_influence_radius
+)
+from simulation.integrators import (
+    INTEGRATORS, SYMPLECTIC_WEIGHTS, dormand_prince_dense, dormand_prince_step, energy_drift_per_orbit, error_norm,
+    hermite_interpolant, next_step_size, symplectic_step
+)
+from simulation.kepler import KeplerOrbit
+from simulation.trajectory import DEFAULT_CHUNK, TRAJECTORY_DTYPE, Trajectory
+
 class Rocket:
     """
     Represents a rocket in a 2D space with position, velocity, and mass.
@@ -8,7 +21,9 @@ class Rocket:
     its properties, such as kinetic energy.
     """
     
-    def __init__(self, mass: float, x: float, y: float, velocity_x: float, velocity_y: float, time: float):
+    def __init__(self, mass: float, x: float, y: float, velocity_x: float, velocity_y: float, time: float,
+                 integrator: str = "rk4", rtol: float = 1e-9, atol: float = 1e-3,
+                 log_every: int = 1, log_interval: float = None, capacity: int = DEFAULT_CHUNK, events: list = None):
         """
         Initialize the Rocket with its mass, position, and velocity.
 
@@ -18,7 +33,20 @@ class Rocket:
             y (float): Initial y-coordinate in meters.
             velocity_x (float): Initial velocity in the x-direction in m/s.
             velocity_y (float): Initial velocity in the y-direction in m/s.
+            integrator (str): Key of the integrator used by step(), see simulation.integrators.INTEGRATORS.
+            rtol (float): Relative error tolerance of the adaptive integrator.
+            atol (float): Absolute error tolerance of the adaptive integrator.
+            log_every (int): Record every Nth step in the logs.
+            log_interval (float): Record a step only once this many seconds have passed since the last sample (s).
+            capacity (int): Number of log samples to preallocate, see Trajectory.capacity_for.
+            events (list): Events to detect, see simulation.events. Defaults to the field's standard events,
+                whose contact events stop the rocket at a crash.
         """
+        if integrator not in INTEGRATORS:
+            raise ValueError(f"Unknown integrator '{integrator}'.")
+        if not (rtol >= 0 and atol >= 0 and rtol + atol > 0):
+            raise ValueError("Tolerances must not be negative, and at least one must be positive.")
+
         # Parameters
         self.mass = mass
         self.x = x
@@ -26,141 +54,206 @@ class Rocket:
         self.velocity_x = velocity_x
         self.velocity_y = velocity_y
         self.time = time
+
+        # Integrator settings and adaptive step state
+        self.integrator = integrator
+        self.rtol = rtol
+        self.atol = atol
+        self.adaptive_step = None
+        self.accepted_steps = 0
+        self.rejected_steps = 0
+        self._adaptive_k1 = None
+        self._last_sample_time = time
+
+        # Field evaluation at the current state, shared by the energy log, the event check and the next step
+        self._current_evaluation = None
+
+        # Event detection, the detector is built for the field of the first step
+        self.events = events
+        self.event_log = []
+        self.terminal_event = None
+        self._event_detector = None
+
+        # Analytic orbit of the two-body fast path, with the time and state it was last advanced to
+        self._kepler = None
+
+        # Field the compiled kernel's body arrays were built for, and the arrays
+        self._kernel_bodies = None
+
+        # Optional Profiler timing the event checks and logging of each step, see simulation.profiling
+        self.profiler = None
+
+        # Indices of the samples logged by impulses, and a copy of the latest, which the energy drift is measured from
+        self.impulse_samples = []
+        self.impulse_reference = None
         
-        # Logs
-        self.x_log = [self.x]
-        self.y_log = [self.y]
-        self.velocity_x_log = [self.velocity_x]
-        self.velocity_y_log = [self.velocity_y]
-        self.time_log = [self.time] 
-        self.ke_log = [self._kinetic_energy()]
-        self.gpe_log = []
-        self.total_energy_log = []
-
-    def _kinetic_energy(self) -> float:
-        """
-        (Private) Calculate the rocket's kinetic energy.
+        # Logs, the potential energy of the first sample is filled in by initialize_energies()
+        self.trajectory = Trajectory(capacity, log_every, log_interval)
+        self.trajectory.append(self.time, self.x, self.y, self.velocity_x, self.velocity_y, self._kinetic_energy(), math.nan)
 
-        Returns:
-            float: The kinetic energy of the rocket in joules.
-        """
-        return 0.5 * self.mass * (self.velocity_x**2 + self.velocity_y**2)
-    
-    def _calculate_gpe(self, G: float, Mass_Earth: float, Mass_Moon: float, Moon_Distance: float) -> float:
+    @classmethod
+    def from_logs(cls, logs, mass: float, capacity: int = DEFAULT_CHUNK, event_log: list = None,
+                  impulse_samples: list = None, **settings):
         """
-        (Private) Calculates the gravitational potential energy of the rocket due to the Earth and optionally the Moon.
+        Build a rocket that continues from the last sample of earlier logs, e.g. a saved or cached run.
+
+        The logs are copied, and new samples are appended after them.
 
         Parameters:
-            G (float): Gravitational constant.
-            Mass_Earth (float): Mass of the Earth in kilograms.
-            Mass_Moon (float): Mass of the Moon in kilograms.
-            Moon_Distance (float): Distance of the Moon from the Earth in meters.
+            logs (np.ndarray): The logged samples, with dtype TRAJECTORY_DTYPE.
+            mass (float): The mass of the rocket in kilograms.
+            capacity (int): Number of log samples to preallocate, including the earlier ones.
+            event_log (list): The EventRecords of the earlier logs.
+            impulse_samples (list): Indices of the samples of the earlier logs that were logged by impulses.
+            **settings: Integrator, tolerance and logging arguments, see __init__.
 
         Returns:
-            float: Gravitational potential energy (Joules).
+            Rocket: The rocket, at the state and time of the last sample.
         """
-        # Calculate the GPE contributions from Earth and Moon
-        gpe_earth = -(G * Mass_Earth * self.mass) / math.sqrt((self.x**2) + (self.y**2))
-        gpe_moon = -(G * Mass_Moon * self.mass) / math.sqrt(((self.x - Moon_Distance)**2) + (self.y**2))
+        last = logs[-1]
+        rocket = cls(mass, float(last["x"]), float(last["y"]), float(last["velocity_x"]), float(last["velocity_y"]),
+                     float(last["time"]), capacity=1, **settings)
+        rocket.trajectory = Trajectory(max(capacity, logs.shape[0]), rocket.trajectory.every, rocket.trajectory.interval)
+        rocket.trajectory.extend(logs)
+        rocket.event_log = list(event_log) if event_log is not None else []
+        rocket.impulse_samples = list(impulse_samples) if impulse_samples else []
+        if rocket.impulse_samples:
+            rocket.impulse_reference = logs[rocket.impulse_samples[-1]].copy()
+        return rocket
 
-        # Total GPE
-        total_gpe = gpe_earth + gpe_moon
-        return total_gpe
-    
-    def initialize_energies(self, G: float, Mass_Earth: float, Mass_Moon: float, Moon_Distance: float):
+    @property
+    def x_log(self):
+        """Logged x-coordinates (m)."""
+        return self.trajectory.column("x")
+
+    @property
+    def y_log(self):
+        """Logged y-coordinates (m)."""
+        return self.trajectory.column("y")
+
+    @property
+    def velocity_x_log(self):
+        """Logged x-velocities (m/s)."""
+        return self.trajectory.column("velocity_x")
+
+    @property
+    def velocity_y_log(self):
+        """Logged y-velocities (m/s)."""
+        return self.trajectory.column("velocity_y")
+
+    @property
+    def time_log(self):
+        """Logged times (s)."""
+        return self.trajectory.column("time")
+
+    @property
+    def ke_log(self):
+        """Logged kinetic energies (J)."""
+        return self.trajectory.column("ke")
+
+    @property
+    def gpe_log(self):
+        """Logged gravitational potential energies (J)."""
+        return self.trajectory.column("gpe")
+
+    @property
+    def total_energy_log(self):
+        """Logged total energies (J)."""
+        return self.trajectory.column("total_energy")
+
+    def _kinetic_energy(self, velocity_x: float = None, velocity_y: float = None) -> float:
         """
-        Initialize the gravitational potential energy (GPE) and total energy (TE) logs.
+        (Private) Calculate the rocket's kinetic energy.
 
         Parameters:
-            G (float): Gravitational constant.
-            Mass_Earth (float): Mass of the Earth in kilograms.
-            Mass_Moon (float): Mass of the Moon in kilograms.
-            Moon_Distance (float): Distance of the Moon from the Earth in meters.
+            velocity_x (float): Velocity in the x-direction (m/s), defaults to the current velocity.
+            velocity_y (float): Velocity in the y-direction (m/s), defaults to the current velocity.
+
+        Returns:
+            float: The kinetic energy of the rocket in joules.
         """
-        initial_gpe = self._calculate_gpe(G, Mass_Earth, Mass_Moon, Moon_Distance)
-        initial_te = initial_gpe + self.ke_log[0]
+        if velocity_x is None:
+            velocity_x, velocity_y = self.velocity_x, self.velocity_y
+        # Products rather than powers, which the compiled kernel reproduces exactly
+        return 0.5 * self.mass * (velocity_x * velocity_x + velocity_y * velocity_y)
 
-        self.gpe_log.append(initial_gpe)
-        self.total_energy_log.append(initial_te)
-    
-    def _acceleration_x(self, G: float, Mass_Earth: float, Mass_Moon: float, x: float, y: float, Moon_Distance: float) -> float:
+    def _evaluate_current(self, field) -> tuple:
         """
-        (Private) The function uses the gravitational forces of the Earth and the Moon to compute the 
-        acceleration in the x direction, based on the rocket's x and y coordinates.
+        (Private) Evaluate the field at the current position, reusing the last evaluation when it is still valid.
 
         Parameters:
-            G (float): Gravitational constant (m^3 kg^-1 s^-2).
-            Mass_Earth (float): Mass of the Earth (kg).
-            Mass_Moon (float): Mass of the Moon (kg).
-            x (float): x-coordinate of the rocket (m).
-            y (float): y-coordinate of the rocket (m).
-            Moon_Distance (float): Distance of the Moon from the Earth along the x-axis (m).
+            field (GravityField): The gravitational field.
 
         Returns:
-            float: The acceleration in the x direction (m/s^2).
+            tuple: The field evaluation, see GravityField.evaluate.
         """
-        acceleration_x=-((G*Mass_Earth*x)/(((x**2)+(y**2))**(3/2)))-((G*Mass_Moon*(x-Moon_Distance))/(abs(math.sqrt(((x-Moon_Distance)**2)+(y**2)))**3))
-        return acceleration_x
-    
-    def _acceleration_y(self, G: float, Mass_Earth: float, Mass_Moon: float, x: float, y: float, Moon_Distance: float) -> float:
+        cached = self._current_evaluation
+        if (cached is None or cached[0] is not field or cached[1] != self.x or cached[2] != self.y
+                or (field.moving and cached[3] != self.time)):
+            cached = (field, self.x, self.y, self.time, field.evaluate(self.x, self.y, self.time))
+            self._current_evaluation = cached
+        return cached[4]
+
+    def _set_current_evaluation(self, field, evaluation: tuple) -> None:
+        """
+        (Private) Store a field evaluation made at the current position by an integrator.
         """
-        (Private) The function uses the gravitational forces of the Earth and the Moon to compute the 
-        acceleration in the y direction, based on the rocket's x and y coordinates.
+        self._current_evaluation = (field, self.x, self.y, self.time, evaluation)
 
-        Parameters:
-            G (float): Gravitational constant (m^3 kg^-1 s^-2).
-            Mass_Earth (float): Mass of the Earth (kg).
-            Mass_Moon (float): Mass of the Moon (kg).
-            x (float): x-coordinate of the rocket (m).
-            y (float): y-coordinate of the rocket (m).
-            Moon_Distance (float): Distance of the Moon from the Earth along the x-axis (m).
+    def initialize_energies(self, field):
+        """
+        Initialize the gravitational potential energy (GPE) and total energy (TE) logs.
 
-        Returns:
-            float: The acceleration in the y direction (m/s^2).
+        Parameters:
+            field (GravityField): The gravitational field.
         """
-        acceleration_y=-((G*Mass_Earth*y)/(((x**2)+(y**2))**(3/2)))-((G*Mass_Moon*y)/(abs(math.sqrt(((x-Moon_Distance)**2)+(y**2)))**3))
-        return acceleration_y
+        if not math.isnan(self.gpe_log[0]):
+            # Logs continued from an earlier run already hold their energies
+            return
+        initial_gpe = self.mass * self._evaluate_current(field)[2]
+        initial_te = initial_gpe + self.ke_log[0]
 
-    def update_position_and_velocity(self, G: float, h: float, Mass_Earth: float, Mass_Moon: float, Moon_Distance: float,  Earth_Radius: float, Moon_Radius: float) -> None:
+        self.gpe_log[0] = initial_gpe
+        self.total_energy_log[0] = initial_te
+
+    def update_position_and_velocity(self, field, h: float) -> list:
         """
         Update the rocket's position and velocity using the Runge-Kutta method, and log the changes.
 
         Parameters:
-            G (float): Gravitational constant (m^3 kg^-1 s^-2).
+            field (GravityField): The gravitational field.
             h (float): Time step (s).
-            Mass_Earth (float): Mass of the Earth (kg).
-            Mass_Moon (float): Mass of the Moon (kg).
-            Moon_Distance (float): Distance of the Moon from the Earth along the x-axis (m).
+
+        Returns:
+            list: The EventRecords of the step, see _finish_step.
         """
-        # First Runge Kutta evaluations 
+        start = (self.time, (self.x, self.y, self.velocity_x, self.velocity_y), self._evaluate_current(field))
+
+        # First Runge Kutta evaluations, reusing the field evaluated at the end of the previous step
         kutta_1x = self.velocity_x
         kutta_1y = self.velocity_y
-        kutta_1vx = self._acceleration_x(G, Mass_Earth, Mass_Moon, self.x, self.y, Moon_Distance)
-        kutta_1vy = self._acceleration_y(G, Mass_Earth, Mass_Moon, self.x, self.y, Moon_Distance)
+        kutta_1vx, kutta_1vy, _, _ = start[2]
 
         # Second Runge Kutta evaluations 
         kutta_2x = self.velocity_x + (h*kutta_1vx)/2
         kutta_2y = self.velocity_y + (h*kutta_1vy)/2
         a = self.x + (h*kutta_1x)/2
         b = self.y + (h*kutta_1y)/2
-        kutta_2vx = self._acceleration_x(G, Mass_Earth, Mass_Moon, a, b, Moon_Distance)
-        kutta_2vy = self._acceleration_y(G, Mass_Earth, Mass_Moon, a, b, Moon_Distance)
+        kutta_2vx, kutta_2vy, _, _ = field.evaluate(a, b, self.time + h/2)
 
         # Third Runge Kutta evaluations 
         kutta_3x = self.velocity_x + (h*kutta_2vx)/2
         kutta_3y = self.velocity_y + (h*kutta_2vy)/2
         a = self.x +(h*kutta_2x)/2
         b = self.y + (h*kutta_2y)/2
-        kutta_3vx = self._acceleration_x(G, Mass_Earth, Mass_Moon, a, b, Moon_Distance)
-        kutta_3vy = self._acceleration_y(G, Mass_Earth, Mass_Moon, a, b, Moon_Distance)
+        kutta_3vx, kutta_3vy, _, _ = field.evaluate(a, b, self.time + h/2)
 
         # Fourth Runge Kutta evaluations 
         kutta_4x = self.velocity_x + (h*kutta_3vx)
         kutta_4y = self.velocity_y + (h*kutta_3vy)
         a = self.x +(h*kutta_3x)
         b = self.y + (h*kutta_3y)       
-        kutta_4vx = self._acceleration_x(G, Mass_Earth, Mass_Moon, a, b, Moon_Distance)
-        kutta_4vy = self._acceleration_y(G, Mass_Earth, Mass_Moon, a, b, Moon_Distance)
+        kutta_4vx, kutta_4vy, _, _ = field.evaluate(a, b, self.time + h)
 
         # Position, velocity, and time updates to be made
         x_plus1 = self.x + ((h/6)*(kutta_1x+(2*kutta_2x)+(2*kutta_3x)+kutta_4x))
@@ -175,30 +268,477 @@ class Rocket:
         self.velocity_x = velocity_x_plus1
         self.velocity_y = velocity_y_plus1
         self.time = time_plus1
-        
-        # Log changes
-        self.x_log.append(self.x)
-        self.y_log.append(self.y)
-        self.velocity_x_log.append(self.velocity_x)
-        self.velocity_y_log.append(self.velocity_y)
-        self.time_log.append(self.time)
-
-        # Log energies
-        ke = self._kinetic_energy()
-        gpe = self._calculate_gpe(G, Mass_Earth, Mass_Moon, Moon_Distance)
-        self.ke_log.append(ke)
-        self.gpe_log.append(gpe)
-        self.total_energy_log.append(ke + gpe)
-
-        # Crash detection if position is within Earth or Moon radii
-        earth_distance = (self.x**2 + self.y**2)**0.5
-        if earth_distance < Earth_Radius:
-            raise ValueError("Rocket has crashed into the Earth!")
-
-        if Mass_Moon > 0:  # Check only if Moon is present
-            moon_distance = ((self.x - Moon_Distance)**2 + self.y**2)**0.5
-            if moon_distance < Moon_Radius:
-                raise ValueError("Rocket has crashed into the Moon!")
+
+        return self._finish_step(field, *start)
+
+    def update_position_and_velocity_adaptive(self, field, h: float, time_target: float = None) -> list:
+        """
+        Advance the rocket by one accepted Dormand-Prince 5(4) step and log it on a regular time grid.
+
+        The internal step size is chosen from the rocket's rtol and atol, and steps whose error
+        estimate exceeds the tolerances are rejected and retried with a smaller step. The logs are
+        sampled every h seconds from the dense output of the step, so a single call may log zero,
+        one or several samples. Events are located on the dense output as well.
+
+        Parameters:
+            field (GravityField): The gravitational field.
+            h (float): Logging interval (s), also the first trial step size.
+            time_target (float): Optional end time (s), the step is shortened so it does not pass it.
+
+        Returns:
+            list: The EventRecords of the step, ending at the first terminal one.
+        """
+        last_evaluation = None
+
+        def derivative(time: float, state: tuple) -> tuple:
+            nonlocal last_evaluation
+            x, y, velocity_x, velocity_y = state
+            last_evaluation = field.evaluate(x, y, time)
+            return (velocity_x, velocity_y, last_evaluation[0], last_evaluation[1])
+
+        state = (self.x, self.y, self.velocity_x, self.velocity_y)
+        if self._adaptive_k1 is None:
+            evaluation = self._evaluate_current(field)
+            self._adaptive_k1 = (self.velocity_x, self.velocity_y, evaluation[0], evaluation[1])
+        step = self.adaptive_step if self.adaptive_step is not None else h
+        if time_target is not None and self.time < time_target:
+            step = min(step, time_target - self.time)
+
+        # Retry with smaller steps until the error estimate is within tolerance
+        while True:
+            new_state, error, stages = dormand_prince_step(derivative, self.time, state, step, self._adaptive_k1)
+            norm = error_norm(error, state, new_state, self.rtol, self.atol)
+            if norm <= 1:
+                break
+            self.rejected_steps += 1
+            step = next_step_size(step, norm)
+            if self.time + step == self.time:
+                raise ValueError("Adaptive step size underflow, try looser tolerances.")
+
+        self.accepted_steps += 1
+        self.adaptive_step = next_step_size(step, norm)
+        self._adaptive_k1 = stages[6]
+        interpolate = dormand_prince_dense(state, new_state, stages, step)
+
+        # Update parameters, the last stage was evaluated at the new state
+        start_time = self.time
+        self.x, self.y, self.velocity_x, self.velocity_y = new_state
+        self.time = start_time + step
+        self._set_current_evaluation(field, last_evaluation)
+
+        profiler = self.profiler
+        phase_start = profiler.start() if profiler is not None else 0.0
+        records = self._detector(field).check(start_time, state, self.time, new_state, interpolate)
+        end_time = records[-1].time if records and records[-1].terminal else self.time
+        if profiler is not None:
+            phase_start = profiler.lap("events", phase_start)
+
+        # Log every grid sample that falls within the step, up to a terminal event
+        sample_time = self._last_sample_time + h
+        while sample_time <= end_time:
+            x, y, velocity_x, velocity_y = interpolate((sample_time - start_time) / step)
+            self._log_state(field, x, y, velocity_x, velocity_y, sample_time)
+            self._last_sample_time = sample_time
+            sample_time = self._last_sample_time + h
+        if profiler is not None:
+            profiler.lap("logging", phase_start)
+
+        self._record_events(field, records)
+        return records
+
+    def update_position_and_velocity_symplectic(self, field, h: float) -> list:
+        """
+        Update the rocket's position and velocity using the selected symplectic integrator, and log the changes.
+
+        Velocity Verlet needs one force evaluation per step and Yoshida's 4th order composition three,
+        against four for Runge-Kutta, and their energy error stays bounded instead of drifting.
+
+        Parameters:
+            field (GravityField): The gravitational field.
+            h (float): Time step (s).
+
+        Returns:
+            list: The EventRecords of the step, see _finish_step.
+        """
+        start = (self.time, (self.x, self.y, self.velocity_x, self.velocity_y), self._evaluate_current(field))
+        new_state, evaluation = symplectic_step(
+            field.evaluate, start[1], self.time, h, SYMPLECTIC_WEIGHTS[self.integrator], start[2]
+        )
+
+        # Update parameters, the last substep evaluated the field at the new state
+        self.x, self.y, self.velocity_x, self.velocity_y = new_state
+        self.time = self.time + h
+        self._set_current_evaluation(field, evaluation)
+
+        return self._finish_step(field, *start)
+
+    def step(self, field, h: float, time_target: float = None) -> list:
+        """
+        Advance the rocket with the integrator selected at construction.
+
+        Parameters:
+            field (GravityField): The gravitational field.
+            h (float): Time step of fixed-step integrators, logging interval of adaptive ones (s).
+            time_target (float): Optional end time of the run (s), which adaptive steps do not pass.
+
+        Returns:
+            list: The EventRecords of the step. If the last one is terminal, the rocket has stopped at it
+                and terminal_event is set.
+        """
+        if self.terminal_event is not None:
+            raise ValueError(f"The rocket has stopped at the event '{self.terminal_event.name}'.")
+        if self.integrator == "dopri5":
+            return self.update_position_and_velocity_adaptive(field, h, time_target)
+        elif self.integrator in SYMPLECTIC_WEIGHTS:
+            return self.update_position_and_velocity_symplectic(field, h)
+        else:
+            return self.update_position_and_velocity(field, h)
+
+    def apply_impulse(self, field, delta_vx: float, delta_vy: float) -> None:
+        """
+        Change the velocity instantly, as by an impulsive burn, and log the new state at the same time.
+
+        The new sample also picks up a change of mass since the last one.
+
+        Parameters:
+            field (GravityField): The gravitational field.
+            delta_vx (float): Change of the velocity in the x-direction (m/s).
+            delta_vy (float): Change of the velocity in the y-direction (m/s).
+        """
+        if self.terminal_event is not None:
+            raise ValueError(f"The rocket has stopped at the event '{self.terminal_event.name}'.")
+        self.velocity_x += delta_vx
+        self.velocity_y += delta_vy
+        # The adaptive integrator's first stage holds the old velocity
+        self._adaptive_k1 = None
+        self._log_state(field, self.x, self.y, self.velocity_x, self.velocity_y, self.time,
+                        evaluation=self._evaluate_current(field), force=True)
+        self.impulse_samples.append(len(self.trajectory) + self.trajectory.released - 1)
+        self.impulse_reference = self.trajectory.data[-1].copy()
+
+    def kepler_applicable(self, field) -> bool:
+        """
+        Check whether advance_kepler can stand in for step() in a field.
+
+        Parameters:
+            field (GravityField): The gravitational field.
+
+        Returns:
+            bool: True for the field of a single body that does not move, with the standard events.
+        """
+        return len(field.bodies) == 1 and not field.moving and self.events is None
+
+    def advance_kepler(self, field, h: float, max_steps: int, time_target: float) -> int:
+        """
+        Advance the rocket by up to max_steps steps along its two-body orbit, solved analytically.
+
+        The logs and events are those step() would record, on the same time grid, but the states are
+        exact, the whole span is evaluated at once, and only the samples that are logged are computed.
+        A crash stops the rocket at the exact impact time.
+
+        Parameters:
+            field (GravityField): The gravitational field, see kepler_applicable.
+            h (float): Time step of fixed-step integrators, logging interval of adaptive ones (s).
+            max_steps (int): Maximum number of steps to take.
+            time_target (float): End time of the run (s).
+
+        Returns:
+            int: The number of steps taken.
+        """
+        if self.terminal_event is not None:
+            raise ValueError(f"The rocket has stopped at the event '{self.terminal_event.name}'.")
+        if self.time >= time_target:
+            return 0
+
+        state = (self.x, self.y, self.velocity_x, self.velocity_y)
+        if self._kepler is None or self._kepler[0] is not field or self._kepler[-2:] != (self.time, state):
+            # The orbit is rebuilt whenever the state was changed other than by this method
+            body = field.bodies[0]
+            orbit = KeplerOrbit(field.central_mu, self.time, self.x - body.x, self.y - body.y,
+                                self.velocity_x, self.velocity_y)
+            events = (contact_event(body), *apsis_events(body))
+            self._kepler = (field, orbit, orbit.radius_crossing_time(body.radius), events, self.time, state)
+        _, orbit, crash_time, events, _, _ = self._kepler
+        body = field.bodies[0]
+
+        if self.integrator == "dopri5":
+            # Samples on the logging grid, with the last step ending at the target
+            count = min(max_steps, max(0, math.floor((time_target - self._last_sample_time) / h)))
+            times = self._last_sample_time + h * np.arange(1, count + 1)
+            times = times[times <= time_target]
+            end_time = time_target if count < max_steps or not times.shape[0] else times[-1]
+            steps = max(times.shape[0], 1)
+        else:
+            count = min(max_steps, math.ceil((time_target - self.time) / h))
+            times = self.time + h * np.arange(1, count + 1)
+            end_time = times[-1]
+            steps = count
+
+        crashed = crash_time is not None and crash_time <= end_time
+        if crashed:
+            times = times[times < crash_time]
+            end_time = crash_time
+            # The steps before the impact, and the one cut short by it
+            steps = times.shape[0] + 1
+        if self.integrator == "dopri5" and times.shape[0]:
+            self._last_sample_time = float(times[-1])
+
+        # Log the samples due under the decimation settings
+        logged = times[self.trajectory.due_mask(times)]
+        if logged.shape[0]:
+            x, y, velocity_x, velocity_y = orbit.states(logged)
+            x += body.x
+            y += body.y
+            samples = np.empty(logged.shape[0], dtype=TRAJECTORY_DTYPE)
+            samples["time"] = logged
+            samples["x"], samples["y"] = x, y
+            samples["velocity_x"], samples["velocity_y"] = velocity_x, velocity_y
+            samples["ke"] = 0.5 * self.mass * (velocity_x**2 + velocity_y**2)
+            samples["gpe"] = self.mass * field.evaluate_arrays(x, y, logged)[2]
+            samples["total_energy"] = samples["ke"] + samples["gpe"]
+            self.trajectory.extend(samples)
+
+        # Apsis passages within the span, and the crash at its end
+        records = []
+        start_time = self.time
+        for event, passage_times in zip(events[1:], orbit.apsis_times(start_time, end_time)):
+            if passage_times.shape[0]:
+                x, y, velocity_x, velocity_y = orbit.states(passage_times)
+                for index, time in enumerate(passage_times):
+                    passage_state = (x[index] + body.x, y[index] + body.y, velocity_x[index], velocity_y[index])
+                    records.append(EventRecord(event, float(time), passage_state, event.direction))
+        records.sort(key=lambda record: record.time)
+
+        x, y, velocity_x, velocity_y = (float(value[0]) for value in orbit.states(np.array([end_time])))
+        self.x, self.y, self.velocity_x, self.velocity_y = x + body.x, y + body.y, velocity_x, velocity_y
+        self.time = float(end_time)
+        self._adaptive_k1 = None
+        self._kepler = self._kepler[:4] + (self.time, (self.x, self.y, self.velocity_x, self.velocity_y))
+
+        if crashed:
+            records.append(EventRecord(events[0], self.time, (self.x, self.y, self.velocity_x, self.velocity_y), -1))
+        self._record_events(field, records)
+        return steps
+
+    def compiled_applicable(self, field) -> bool:
+        """
+        Check whether advance_compiled can stand in for step() in a field.
+
+        Parameters:
+            field (GravityField): The gravitational field.
+
+        Returns:
+            bool: True if the compiled kernel is available, for a fixed-step integrator in a field of bodies
+                that do not move, with the standard events.
+        """
+        return kernels.JIT_AVAILABLE and self.integrator != "dopri5" and not field.moving and self.events is None
+
+    def advance_compiled(self, field, h: float, max_steps: int, time_target: float) -> int:
+        """
+        Advance the rocket by up to max_steps fixed steps in the compiled kernel, see simulation.kernels.
+
+        The states, logs and events are those step() would record. Steps within which an event could
+        occur are taken by step(), so only the steps in between run compiled.
+
+        Parameters:
+            field (GravityField): The gravitational field, see compiled_applicable.
+            h (float): Time step (s).
+            max_steps (int): Maximum number of steps to take.
+            time_target (float): End time of the run (s).
+
+        Returns:
+            int: The number of steps taken.
+        """
+        if self.terminal_event is not None:
+            raise ValueError(f"The rocket has stopped at the event '{self.terminal_event.name}'.")
+
+        if self._kernel_bodies is None or self._kernel_bodies[0] is not field:
+            central = field.bodies[0]
+            self._kernel_bodies = (field, tuple(np.array(values, dtype=float) for values in (
+                [field.G * body.mass for body in field.bodies],
+                [body.x for body in field.bodies],
+                [body.y for body in field.bodies],
+                [body.radius for body in field.bodies],
+                [0.0] + [sphere_of_influence_radius(body, central) for body in field.bodies[1:]],
+            )))
+        bodies = self._kernel_bodies[1]
+        if self.integrator in SYMPLECTIC_WEIGHTS:
+            method, weights = kernels.SYMPLECTIC, np.array(SYMPLECTIC_WEIGHTS[self.integrator])
+        else:
+            method, weights = kernels.RK4, np.ones(1)
+
+        trajectory = self.trajectory
+        profiler = self.profiler
+        steps = 0
+        while steps < max_steps and self.time < time_target:
+            phase_start = profiler.start() if profiler is not None else 0.0
+            # Plain floats and ints, so the kernel is compiled for a single signature
+            taken, logged, status, self.time, self.x, self.y, self.velocity_x, self.velocity_y = kernels.propagate(
+                float(self.x), float(self.y), float(self.velocity_x), float(self.velocity_y), float(self.time),
+                float(h), method, weights, *bodies, float(self.mass), trajectory.every, float(trajectory.interval or 0.0),
+                trajectory.steps, float(trajectory.column("time")[-1]), trajectory.reserve(), max_steps - steps,
+                float(time_target)
+            )
+            trajectory.commit(logged, taken)
+            steps += taken
+            if profiler is not None:
+                profiler.lap("compiled", phase_start)
+                # Runge-Kutta evaluates the field four times per step, the symplectic methods once per substep
+                profiler.count("force_evaluations", taken * (4 if method == kernels.RK4 else weights.shape[0]))
+
+            if status == kernels.EVENT:
+                self.step(field, h, time_target)
+                steps += 1
+                if self.terminal_event is not None:
+                    break
+        return steps
+
+    def _detector(self, field) -> EventDetector:
+        """
+        (Private) Return the event detector for a field, building it on the first step in that field.
+        """
+        if self._event_detector is None or self._event_detector[0] is not field:
+            events = self.events if self.events is not None else default_events(field)
+            self._event_detector = (field, EventDetector(events))
+        return self._event_detector[1]
+
+    def _finish_step(self, field, start_time: float, start_state: tuple, start_evaluation: tuple) -> list:
+        """
+        (Private) Check a fixed step for events and log the state it reached, sharing one field evaluation.
+
+        Events are located on the cubic Hermite interpolant between the states and accelerations at both ends of the step.
+
+        Returns:
+            list: The EventRecords of the step, ending at the first terminal one.
+        """
+        evaluation = self._evaluate_current(field)
+        new_state = (self.x, self.y, self.velocity_x, self.velocity_y)
+        interpolate = hermite_interpolant(
+            start_state, (start_state[2], start_state[3], start_evaluation[0], start_evaluation[1]),
+            new_state, (self.velocity_x, self.velocity_y, evaluation[0], evaluation[1]),
+            self.time - start_time
+        )
+        profiler = self.profiler
+        phase_start = profiler.start() if profiler is not None else 0.0
+        records = self._detector(field).check(start_time, start_state, self.time, new_state, interpolate)
+        if profiler is not None:
+            phase_start = profiler.lap("events", phase_start)
+
+        if not records or not records[-1].terminal:
+            self._log_state(field, self.x, self.y, self.velocity_x, self.velocity_y, self.time, evaluation=evaluation)
+        if profiler is not None:
+            profiler.lap("logging", phase_start)
+        self._record_events(field, records)
+        return records
+
+    def _record_events(self, field, records: list) -> None:
+        """
+        (Private) Keep the events of a step, and stop the rocket at a terminal one.
+
+        The rocket is moved back to the state at the terminal event, which is logged even though it is generally off the grid.
+        """
+        self.event_log.extend(records)
+        if records and records[-1].terminal:
+            self.terminal_event = records[-1]
+            self.x, self.y, self.velocity_x, self.velocity_y = self.terminal_event.state
+            self.time = self.terminal_event.time
+            self._adaptive_k1 = None
+            self.log_final_state(field)
+
+    def log_final_state(self, field) -> None:
+        """
+        Log the current state if it has not been logged yet, e.g. at the end of a decimated run.
+
+        Parameters:
+            field (GravityField): The gravitational field.
+        """
+        if self.time_log[-1] != self.time:
+            self._log_state(field, self.x, self.y, self.velocity_x, self.velocity_y, self.time,
+                            evaluation=self._evaluate_current(field), force=True)
+
+    def shortens_step(self, h: float, time_target: float) -> bool:
+        """
+        Check whether the next step is shortened to end at the target time, which only adaptive steps are.
+
+        Parameters:
+            h (float): Logging interval of the adaptive integrator, its first trial step (s).
+            time_target (float): End time of the run (s).
+
+        Returns:
+            bool: True if the next step ends at the target time instead of its own size.
+        """
+        if self.integrator != "dopri5":
+            return False
+        step = self.adaptive_step if self.adaptive_step is not None else h
+        return step > time_target - self.time
+
+    def snapshot(self) -> dict:
+        """
+        Capture the state of the rocket and its integrator, so the steps taken after it can be taken back.
+
+        Returns:
+            dict: The state, with the numbers of samples, counted log steps and events so far, see restore.
+        """
+        trajectory = self.trajectory
+        return {
+            "state": (self.x, self.y, self.velocity_x, self.velocity_y, self.time),
+            "integrator": (self.adaptive_step, self.accepted_steps, self.rejected_steps, self._adaptive_k1,
+                           self._last_sample_time, self._current_evaluation),
+            "samples": len(trajectory) + trajectory.released,
+            "log_steps": trajectory.steps,
+            "events": len(self.event_log),
+        }
+
+    def restore(self, snapshot: dict, last: np.ndarray = None) -> None:
+        """
+        Return the rocket to a snapshot, dropping the samples and events logged since.
+
+        Parameters:
+            snapshot (dict): The output of snapshot.
+            last (np.ndarray): The last sample of the snapshot, needed when it was released from memory.
+        """
+        self.x, self.y, self.velocity_x, self.velocity_y, self.time = snapshot["state"]
+        (self.adaptive_step, self.accepted_steps, self.rejected_steps, self._adaptive_k1,
+         self._last_sample_time, self._current_evaluation) = snapshot["integrator"]
+        self.trajectory.truncate(snapshot["samples"], snapshot["log_steps"], last)
+        del self.event_log[snapshot["events"]:]
+        self.terminal_event = None
+
+    def _log_state(self, field, x: float, y: float, velocity_x: float, velocity_y: float, time: float,
+                   evaluation: tuple = None, force: bool = False) -> None:
+        """
+        (Private) Append a state and its energies to the logs, subject to the logging decimation unless forced.
+
+        The field is only evaluated for the potential energy if no evaluation at the state is given.
+        """
+        if not self.trajectory.due(time) and not force:
+            return
+
+        if evaluation is None:
+            evaluation = field.evaluate(x, y, time)
+        ke = self._kinetic_energy(velocity_x, velocity_y)
+        gpe = self.mass * evaluation[2]
+        self.trajectory.append(time, x, y, velocity_x, velocity_y, ke, gpe)
+
+    def energy_drift_per_orbit(self, field):
+        """
+        Estimate the relative drift of the logged total energy per orbit around the field's first body.
+
+        The drift is measured from the sample of the latest impulse, if any, as an impulse changes the
+        energy and the orbit. Otherwise it is measured from the first sample.
+
+        Parameters:
+            field (GravityField): The gravitational field.
+
+        Returns:
+            float: The relative energy change per orbit, or None if the orbit is unbound or no time has elapsed.
+        """
+        first = self.impulse_reference if self.impulse_reference is not None else self.trajectory.data[0]
+        last = self.trajectory.data[-1]
+        return energy_drift_per_orbit(
+            [first["total_energy"], last["total_energy"]], [first["time"], last["time"]], field.central_mu,
+            float(first["x"]), float(first["y"]), float(first["velocity_x"]), float(first["velocity_y"])
+        )
 
     def __repr__(self) -> str:
         """
@@ -0,0 +1,435 @@
+import threading
+from time import perf_counter
+
+import numpy as np
+
+from simulation.events import EventRecord
+from simulation.gravity import GravityField
+from simulation.planet_constants import G_CONSTANT
+from simulation.profiling import Profiler
+from simulation.rocket import Rocket
+from simulation.trajectory import Trajectory
+from simulation.trajectory_file import TrajectoryFile, TrajectoryWriter
+
+
+# Counters added to the profile after each chunk
+_PROFILE_COUNTERS = ("steps", "rejected_steps", "events", "logged_samples")
+
+# Marks that no profiler is waiting to be swapped in, see SimulationRunner.set_profiler
+_NO_PENDING_PROFILER = object()
+
+
+class SimulationRunner:
+    """
+    Drives a Rocket up to a target time, optionally in chunks of steps.
+
+    Running in chunks lets a caller such as the GUI worker report progress, stream
+    the logs and stop early between chunks, while a script can simply call run().
+
+    A run can be extended past its target time, continued from the logs of an earlier run
+    or a trajectory file, or branched off from any logged time with changed parameters. In
+    each case only the new segment is integrated and appended to the logs.
+    """
+
+    def __init__(self, rocket, h: float, time_target: float, include_moon: bool = False, field: GravityField = None,
+                 moving_moon: bool = False, output: str = None, keep_in_memory: bool = True, analytic: bool = True,
+                 compiled: bool = True, profiler: Profiler = None):
+        """
+        Initialize the runner and the rocket's initial energies.
+
+        Parameters:
+            rocket (Rocket): The rocket to propagate.
+            h (float): Time step of fixed-step integrators, logging interval of adaptive ones (s).
+            time_target (float): Time to propagate up to (s).
+            include_moon (bool): Whether the Moon's gravity is included, used when no field is given.
+            field (GravityField): The gravitational field, defaults to the Earth and optionally the Moon.
+            moving_moon (bool): Whether the default field's Moon orbits the Earth instead of staying fixed.
+            output (str): Optional path of a trajectory file the logs are streamed to after every chunk,
+                see simulation.trajectory_file.
+            keep_in_memory (bool): Whether streamed logs also stay on the rocket. Only used with an output file.
+            analytic (bool): Whether the rocket follows its analytic two-body orbit instead of being
+                integrated when the field allows it, e.g. around the Earth alone, in which case the
+                integrator settings are not used. See Rocket.advance_kepler. Pass False to integrate
+                the run anyway, e.g. to compare integrators.
+            compiled (bool): Whether fixed steps run in the compiled kernel when Numba is installed and the
+                field allows it, with the same results. See Rocket.advance_compiled.
+            profiler (Profiler): Optional profiler timing the phases of the run, see set_profiler.
+        """
+        if h <= 0:
+            raise ValueError("Time step must be positive.")
+
+        self.rocket = rocket
+        self.h = h
+        self.time_target = time_target
+        self.include_moon = include_moon
+        self.moving_moon = moving_moon
+
+        self.field = field if field is not None else GravityField.earth_moon(include_moon, moving_moon)
+        self.analytic = analytic and rocket.kepler_applicable(self.field)
+        self.compiled = compiled and not self.analytic and rocket.compiled_applicable(self.field)
+
+        # Run state
+        self.start_time = rocket.time
+        self.steps = 0
+        self.crash_message = None
+        self.finished = False
+        # Steps and rocket snapshot from before the end of the run depended on the target time, see extend
+        self._resume = None
+
+        self.profiler = None
+        self._pending_profiler = _NO_PENDING_PROFILER
+        self._profiler_lock = threading.Lock()
+        self._use_profiler(profiler)
+
+        self.rocket.initialize_energies(self.field)
+
+        # Trajectory file the logs are streamed to, starting with the initial state
+        self.output = output
+        self.keep_in_memory = keep_in_memory
+        self.writer = TrajectoryWriter(output, self.header()) if output is not None else None
+        self._events_written = 0
+
+    @classmethod
+    def from_logs(cls, logs, header: dict, time_target: float, time: float = None, h: float = None,
+                  mass: float = None, delta_v: tuple = (0.0, 0.0), integrator: str = None, rtol: float = None,
+                  atol: float = None, field: GravityField = None, event_log: list = None, output: str = None,
+                  keep_in_memory: bool = True, analytic: bool = None):
+        """
+        Continue a run from its logs, optionally from an earlier logged time and with changed parameters.
+
+        Parameters:
+            logs (np.ndarray): The logged samples of the run, with dtype TRAJECTORY_DTYPE.
+            header (dict): Description of the run, see header.
+            time_target (float): Time to propagate up to (s).
+            time (float): Continue from the last sample at or before this time (s), defaults to the last sample.
+            h (float): New time step or logging interval (s), defaults to the run's.
+            mass (float): New mass of the rocket (kg), defaults to the run's.
+            delta_v (tuple): Impulsive change of velocity (m/s) applied before continuing, e.g. a burn.
+            integrator (str): New integrator, defaults to the run's.
+            rtol (float): New relative tolerance of the adaptive integrator, defaults to the run's.
+            atol (float): New absolute tolerance of the adaptive integrator, defaults to the run's.
+            field (GravityField): The gravitational field, defaults to the one the header describes.
+            event_log (list): The EventRecords of the run, those up to the continuation are kept.
+            output (str): Optional path of a new trajectory file for the earlier and the new logs.
+            keep_in_memory (bool): Whether streamed logs also stay on the rocket. Only used with an output file.
+            analytic (bool): Whether the analytic two-body orbit may be used, defaults to the run's setting.
+                Runs whose header predates the setting were integrated, and so are their continuations.
+
+        Returns:
+            SimulationRunner: The runner of the continuation.
+        """
+        if time is not None:
+            logs = logs[:int(np.searchsorted(logs["time"], time, side="right"))]
+            if logs.shape[0] == 0:
+                raise ValueError(f"No logged sample at or before t = {time} s.")
+        start_time = float(logs["time"][-1])
+        impulse_samples = [index for index in header.get("impulses", []) if index < logs.shape[0]]
+        if event_log is not None:
+            event_log = [record for record in event_log if record.time <= start_time]
+
+        settings = header["integrator"]
+        h = h if h is not None else settings["h"]
+        previous_mass = header["initial_conditions"]["mass"]
+        mass = mass if mass is not None else previous_mass
+        capacity = logs.shape[0] + Trajectory.capacity_for(
+            time_target - start_time, h, settings["log_every"], settings["log_interval"]
+        )
+        rocket = Rocket.from_logs(
+            logs, mass, capacity=capacity, event_log=event_log, impulse_samples=impulse_samples,
+            integrator=integrator or settings["name"],
+            rtol=rtol if rtol is not None else settings["rtol"], atol=atol if atol is not None else settings["atol"],
+            log_every=settings["log_every"], log_interval=settings["log_interval"],
+        )
+        analytic = analytic if analytic is not None else settings.get("analytic", False)
+        runner = cls(rocket, h, time_target, include_moon=header["include_moon"], field=field,
+                     moving_moon=header["moving_moon"], output=output, keep_in_memory=keep_in_memory,
+                     analytic=analytic)
+        if tuple(delta_v) != (0.0, 0.0) or mass != previous_mass:
+            rocket.apply_impulse(runner.field, *delta_v)
+            if runner.writer is not None:
+                # The header written before the impulse does not list its sample
+                runner.close()
+                runner.writer = TrajectoryWriter(output, runner.header(), append=True)
+        return runner
+
+    @classmethod
+    def from_checkpoint(cls, path: str, time_target: float, keep_in_memory: bool = True):
+        """
+        Continue a run saved or streamed to a trajectory file, appending the new segment to the same file.
+
+        Parameters:
+            path (str): Path of the trajectory file, see simulation.trajectory_file.
+            time_target (float): Time to propagate up to (s).
+            keep_in_memory (bool): Whether the file's samples and the new ones are held on the rocket.
+                If not, only the first and the latest samples are read back, so the cost of
+                continuing does not grow with the length of the run.
+
+        Returns:
+            SimulationRunner: The runner of the continuation.
+        """
+        trajectory_file = TrajectoryFile(path)
+        count = len(trajectory_file)
+        if count == 0:
+            raise ValueError(f"'{path}' holds no samples to continue from.")
+        logs = trajectory_file.slice() if keep_in_memory else trajectory_file.slice(0, count, max(count - 1, 1))
+        event_log = [EventRecord.from_dict(values) for values in trajectory_file.events()]
+        # The sample of the latest impulse may not be among those read back
+        impulse_samples = trajectory_file.header.get("impulses", [])
+        impulse_reference = None
+        if impulse_samples:
+            impulse_reference = trajectory_file.slice(impulse_samples[-1], impulse_samples[-1] + 1)[0].copy()
+        trajectory_file.close()
+
+        runner = cls.from_logs(logs, trajectory_file.header, time_target, event_log=event_log)
+        runner.rocket.impulse_samples = list(impulse_samples)
+        runner.rocket.impulse_reference = impulse_reference
+        runner.rocket.trajectory.mark_streamed(released=count - logs.shape[0])
+        runner.output = path
+        runner.keep_in_memory = keep_in_memory
+        runner.writer = TrajectoryWriter(path, runner.header(), append=True)
+        runner._events_written = len(runner.rocket.event_log)
+        return runner
+
+    @property
+    def progress(self) -> float:
+        """
+        Returns:
+            float: Fraction of the simulated time span completed, between 0 and 1.
+        """
+        span = self.time_target - self.start_time
+        if self.finished or span <= 0:
+            return 1.0
+        return min(1.0, max(0.0, (self.rocket.time - self.start_time) / span))
+
+    @property
+    def logged_samples(self) -> int:
+        """
+        Returns:
+            int: The number of samples in the rocket's logs, which are safe to plot while the run continues.
+        """
+        return len(self.rocket.trajectory)
+
+    def header(self) -> dict:
+        """
+        Describe the run for the header of a trajectory file.
+
+        Returns:
+            dict: The initial conditions, the constants and bodies of the field, the indices of the samples
+                logged by impulses, and the integrator settings.
+        """
+        rocket = self.rocket
+        first = rocket.trajectory.data[0]
+        return {
+            "initial_conditions": {
+                "mass": rocket.mass, "time": float(first["time"]), "x": float(first["x"]), "y": float(first["y"]),
+                "velocity_x": float(first["velocity_x"]), "velocity_y": float(first["velocity_y"]),
+            },
+            "constants": {"G": G_CONSTANT},
+            "bodies": [
+                {"name": body.name, "mass": body.mass, "radius": body.radius, "x": body.x, "y": body.y,
+                 "moving": body.ephemeris is not None}
+                for body in self.field.bodies
+            ],
+            "include_moon": self.include_moon,
+            "moving_moon": self.moving_moon,
+            "impulses": list(rocket.impulse_samples),
+            "integrator": {
+                "name": rocket.integrator, "h": self.h, "time_target": self.time_target,
+                "rtol": rocket.rtol, "atol": rocket.atol,
+                "log_every": rocket.trajectory.every, "log_interval": rocket.trajectory.interval,
+                "analytic": self.analytic,
+            },
+        }
+
+    def run_chunk(self, max_steps: int) -> bool:
+        """
+        Advance the rocket by at most max_steps steps.
+
+        Parameters:
+            max_steps (int): Maximum number of steps to take.
+
+        Returns:
+            bool: True once the run has reached the target time or stopped at a terminal event.
+        """
+        if self._pending_profiler is not _NO_PENDING_PROFILER:
+            with self._profiler_lock:
+                pending, self._pending_profiler = self._pending_profiler, _NO_PENDING_PROFILER
+            self._use_profiler(pending)
+
+        profiler = self.profiler
+        if profiler is not None:
+            chunk_start = perf_counter()
+            counts = self._profile_counts()
+
+        if self.analytic:
+            # The whole chunk is evaluated at once on the analytic orbit
+            self.steps += self.rocket.advance_kepler(self.field, self.h, max_steps, self.time_target)
+            if self.rocket.terminal_event is not None:
+                self.crash_message = self.rocket.terminal_event.message
+                self.finished = True
+        elif self.compiled:
+            self.steps += self.rocket.advance_compiled(self.field, self.h, max_steps, self.time_target)
+            if self.rocket.terminal_event is not None:
+                self.crash_message = self.rocket.terminal_event.message
+                self.finished = True
+        else:
+            for _ in range(max_steps):
+                if self.rocket.time >= self.time_target:
+                    break
+                if self._resume is None and self.rocket.shortens_step(self.h, self.time_target):
+                    self._resume = (self.steps, self.rocket.snapshot())
+                try:
+                    self.rocket.step(self.field, self.h, self.time_target)
+                except ValueError as e:
+                    # The integrator failed, e.g. its step size underflowed, so stop with its message
+                    self.crash_message = str(e)
+                    self.finished = True
+                    break
+                self.steps += 1
+                if self.rocket.terminal_event is not None:
+                    # Keep the event's message, e.g. the crash, and stop the simulation
+                    self.crash_message = self.rocket.terminal_event.message
+                    self.finished = True
+                    break
+
+        if not self.finished and self.rocket.time >= self.time_target:
+            # Make sure the end of a decimated run is in the logs
+            if self._resume is None:
+                self._resume = (self.steps, self.rocket.snapshot())
+            self.rocket.log_final_state(self.field)
+            self.finished = True
+
+        if self.writer is not None:
+            stream_start = profiler.start() if profiler is not None else 0.0
+            self.rocket.trajectory.stream(self.writer, self.keep_in_memory)
+            event_log = self.rocket.event_log
+            if len(event_log) != self._events_written:
+                self.writer.write_events([record.as_dict() for record in event_log])
+                self._events_written = len(event_log)
+            if self.finished:
+                self.close()
+            else:
+                self.writer.flush()
+            if profiler is not None:
+                profiler.lap("stream", stream_start)
+
+        if profiler is not None:
+            for name, before, after in zip(_PROFILE_COUNTERS, counts, self._profile_counts()):
+                profiler.count(name, after - before)
+            profiler.add_span("run", chunk_start, steps=self.steps, time=self.rocket.time)
+        return self.finished
+
+    def _profile_counts(self) -> tuple:
+        """
+        (Private) The totals behind the profile counters, see _PROFILE_COUNTERS.
+        """
+        rocket = self.rocket
+        return (self.steps, rocket.rejected_steps, len(rocket.event_log),
+                len(rocket.trajectory) + rocket.trajectory.released)
+
+    def set_profiler(self, profiler: Profiler) -> None:
+        """
+        Time the phases of the run with a profiler from the next chunk on, see simulation.profiling.
+
+        The profiler is swapped in at the start of the next chunk rather than here, so this can be called
+        from another thread, e.g. the GUI's, while a chunk is running.
+
+        Parameters:
+            profiler (Profiler): The profiler, or None to stop profiling. Can be changed while the run is in progress.
+        """
+        with self._profiler_lock:
+            self._pending_profiler = profiler
+
+    def _use_profiler(self, profiler: Profiler) -> None:
+        """
+        (Private) Swap in a profiler while no step is running, wrapping the field for it.
+        """
+        # The field may still be wrapped for a profiler of another run that shared it
+        Profiler.detach_field(self.field)
+        self.profiler = profiler
+        self.rocket.profiler = profiler
+        if profiler is not None:
+            profiler.attach_field(self.field)
+
+    def extend(self, time_target: float) -> None:
+        """
+        Move the target time of the run further out, so it continues from where it stopped.
+
+        The integrator keeps its state, and the logs and trajectory file are appended to. What depended
+        on the old target time is taken back first: the final sample logged at it, and an adaptive run's
+        last step, which was shortened to end at it. The continued run is then the same, bit for bit, as a
+        run to the new target time in one go.
+
+        Parameters:
+            time_target (float): New time to propagate up to (s).
+        """
+        if self.crash_message is not None:
+            raise ValueError(f"The run has stopped: {self.crash_message}")
+
+        if self._resume is not None:
+            self.steps, snapshot = self._resume
+            self._resume = None
+            last = None
+            if self.rocket.trajectory.released:
+                self.close()
+                trajectory_file = TrajectoryFile(self.output)
+                last = trajectory_file.slice(snapshot["samples"] - 1, snapshot["samples"])[0]
+                trajectory_file.close()
+            self.rocket.restore(snapshot, last)
+        self.time_target = time_target
+        self.start_time = self.rocket.time
+        self.finished = False
+        if self.output is not None:
+            self.close()
+            self.writer = TrajectoryWriter(self.output, self.header(), append=True)
+            self.writer.truncate(len(self.rocket.trajectory) + self.rocket.trajectory.released)
+            # Events taken back must leave the sidecar too
+            self._events_written = -1
+
+    def branch(self, time: float, time_target: float, **changes):
+        """
+        Start a new run from a logged time of this one, e.g. to try a burn there.
+
+        Parameters:
+            time (float): Continue from the last sample at or before this time (s).
+            time_target (float): Time to propagate the new run up to (s).
+            **changes: Changed parameters, see from_logs.
+
+        Returns:
+            SimulationRunner: The runner of the new run, this one is left as it is.
+        """
+        if self.rocket.trajectory.released:
+            raise ValueError("The logs of this run were released from memory, continue from its trajectory file.")
+        return SimulationRunner.from_logs(
+            self.rocket.trajectory.data, self.header(), time_target, time=time, field=self.field,
+            event_log=self.rocket.event_log, **changes
+        )
+
+    def close(self) -> None:
+        """
+        Close the trajectory file, e.g. when a run is cancelled. Finished runs close it themselves.
+        """
+        if self.writer is not None:
+            self.writer.close()
+
+    @property
+    def events(self) -> list:
+        """
+        Returns:
+            list: The EventRecords of the run so far, in time order.
+        """
+        return self.rocket.event_log
+
+    def run(self) -> None:
+        """
+        Advance the rocket until it reaches the target time or crashes.
+        """
+        while not self.run_chunk(10000):
+            pass
+
+    def energy_drift_per_orbit(self):
+        """
+        Returns:
+            float: The rocket's relative energy drift per orbit, see Rocket.energy_drift_per_orbit.
+        """
+        return self.rocket.energy_drift_per_orbit(self.field)
@@ -0,0 +1,632 @@
+"""
+Targeting: solving for the initial velocity that gives a desired trajectory.
+
+A target is a condition on the trajectory, such as the altitude of the next apoapsis, the
+closest approach to the Moon or where the rocket hits a body. The solver drives the
+targets to their values by differential correction, a damped Newton iteration on the
+initial velocity whose Jacobian comes from finite differences. With a single target only
+the speed is varied by default, keeping the direction of the initial guess.
+
+Trial trajectories are propagated until every one of them has reached the event its targets
+are measured at, and at most for about one orbital period of the slowest of them, so the
+horizon follows the trajectories rather than a fixed duration. Trajectories that are not
+bound to the central body are rejected.
+
+Every trajectory the solver needs is propagated with simulation.ensemble.Ensemble: the
+candidate velocities along the Newton step, each with its finite difference neighbours,
+form the members of one ensemble, so an iteration costs a single batched propagation
+instead of a run per trial. Picking the best candidate also yields the Jacobian at it.
+
+Usage:
+    solver = TargetingSolver([ApoapsisAltitude(35786e3)], mass=100, x=0, y=7e6, h=10)
+    result = solver.solve(7543, 0)
+    result.velocity_x, result.velocity_y, result.converged
+"""
+import math
+import time
+
+import numpy as np
+
+from simulation.ensemble import Ensemble
+from simulation.gravity import GravityField
+
+# Velocity components the solver can vary: the x and y components, or alone the speed along the
+# initial guess or the component perpendicular to the initial position
+_FREE = ("vx", "vy", "speed", "tangential")
+_SINGLE_FREE = ("speed", "tangential")
+
+# Default longest propagated time of a trial trajectory (s)
+DEFAULT_MAX_DURATION = 30 * 86400.0
+
+# Steps propagated between checks whether every trajectory has reached its targeted event
+_SEGMENT_STEPS = 1000
+
+# Margin on the osculating period that bounds the propagation
+_PERIOD_MARGIN = 1.1
+
+
+def _body_index(field: GravityField, name: str) -> int:
+    """
+    (Private) Find a body of the field by name.
+    """
+    for index, body in enumerate(field.bodies):
+        if body.name == name:
+            return index
+    raise ValueError(f"No body named {name!r} in the gravity field.")
+
+
+def _body_positions(body, times: np.ndarray) -> tuple:
+    """
+    (Private) Positions of a body at the logged times of an ensemble.
+    """
+    if body.ephemeris is not None:
+        return body.ephemeris.positions(times)
+    return np.full(times.shape, body.x), np.full(times.shape, body.y)
+
+
+def _altitudes(ensemble: Ensemble, body, start: int = 0) -> np.ndarray:
+    """
+    (Private) Altitude above a body of every logged state from a row on, one row per step and one column per member.
+    """
+    body_x, body_y = _body_positions(body, ensemble.time_log[start:])
+    distance = np.hypot(ensemble.x_log[start:] - body_x[:, np.newaxis], ensemble.y_log[start:] - body_y[:, np.newaxis])
+    return distance - body.radius
+
+
+def _extremum_reached(ensemble: Ensemble, body, kind: int, start: int) -> np.ndarray:
+    """
+    (Private) Whether each member has a first local extremum of its altitude centred on a row from start on.
+
+    The two rows before start are read too, as an extremum on the first new row needs its neighbours.
+    """
+    return _first_extremum(_altitudes(ensemble, body, max(start - 2, 0)), kind)[1]
+
+
+def _first_extremum(values: np.ndarray, kind: int) -> tuple:
+    """
+    (Private) The first local extremum of each column after its first sample, refined by a parabola through the
+    samples around it.
+
+    The refinement makes the extremum a smooth function of the initial conditions, rather than one that
+    jumps from step to step, which the finite differences rely on.
+
+    Parameters:
+        values (np.ndarray): One row per step and one column per member, NaN after a crash.
+        kind (int): 1 for a maximum, -1 for a minimum, 0 for either.
+
+    Returns:
+        tuple: The refined value of each column, NaN where there is none, and whether each column has one.
+    """
+    change = np.diff(values, axis=0)
+    found = np.zeros((max(values.shape[0] - 2, 0), values.shape[1]), dtype=bool)
+    if kind >= 0:
+        found |= (change[:-1] > 0) & (change[1:] <= 0)
+    if kind <= 0:
+        found |= (change[:-1] < 0) & (change[1:] >= 0)
+    reached = found.any(axis=0)
+    rows = found.argmax(axis=0) + 1 if found.shape[0] else np.zeros(values.shape[1], dtype=np.int64)
+    members = np.arange(values.shape[1])
+    centre = values[rows, members]
+    previous = values[np.maximum(rows - 1, 0), members]
+    following = values[np.minimum(rows + 1, values.shape[0] - 1), members]
+
+    curvature = previous - 2 * centre + following
+    inner = (rows > 0) & (rows < values.shape[0] - 1) & np.isfinite(curvature) & (curvature != 0)
+    refined = centre.copy()
+    refined[inner] -= (previous[inner] - following[inner])**2 / (8 * curvature[inner])
+    refined[~reached] = np.nan
+    return refined, reached
+
+
+def _osculating_apsis(ensemble: Ensemble, body, field: GravityField, members: np.ndarray, rows: np.ndarray,
+                      periapsis: np.ndarray) -> np.ndarray:
+    """
+    (Private) Altitude above a body of an apsis of the two-body orbit about it that osculates the logged states.
+
+    Parameters:
+        ensemble (Ensemble): The propagated ensemble.
+        body: The body.
+        field (GravityField): The field it was propagated in.
+        members (np.ndarray): The members.
+        rows (np.ndarray): The logged step of each member.
+        periapsis (np.ndarray): Whether the periapsis, rather than the apoapsis, is taken for each member.
+
+    Returns:
+        np.ndarray: The altitude of each member, negative below the surface and NaN for the apoapsis of an
+            unbound orbit.
+    """
+    times = ensemble.time_log[rows]
+    body_x, body_y = _body_positions(body, times)
+    if body.ephemeris is not None:
+        ahead_x, ahead_y = body.ephemeris.positions(times + 1.0)
+        behind_x, behind_y = body.ephemeris.positions(times - 1.0)
+        body_vx, body_vy = (ahead_x - behind_x) / 2, (ahead_y - behind_y) / 2
+    else:
+        body_vx, body_vy = 0.0, 0.0
+    dx = ensemble.x_log[rows, members] - body_x
+    dy = ensemble.y_log[rows, members] - body_y
+    dvx = ensemble.velocity_x_log[rows, members] - body_vx
+    dvy = ensemble.velocity_y_log[rows, members] - body_vy
+
+    mu = field.G * body.mass
+    energy = (dvx**2 + dvy**2) / 2 - mu / np.hypot(dx, dy)
+    momentum = dx * dvy - dy * dvx
+    eccentricity = np.sqrt(np.maximum(1 + 2 * energy * momentum**2 / mu**2, 0.0))
+    # The semi-latus rectum keeps both apsides finite through a parabolic orbit
+    semi_latus = momentum**2 / mu
+    with np.errstate(divide="ignore", invalid="ignore"):
+        apoapsis = np.where(eccentricity < 1, semi_latus / (1 - eccentricity), np.nan)
+    radius = np.where(periapsis, semi_latus / (1 + eccentricity), apoapsis)
+    return radius - body.radius
+
+
+class Target:
+    """
+    A condition on a trajectory, measured on every member of an ensemble.
+    """
+
+    def __init__(self, name: str, body: str, value: float, tolerance: float):
+        """
+        Initialize the target.
+
+        Parameters:
+            name (str): Description of the measured quantity, e.g. for reports.
+            body (str): Name of the body the quantity refers to.
+            value (float): The value the solver aims for.
+            tolerance (float): Largest acceptable difference from the value, also used to weigh targets against each other.
+        """
+        if tolerance <= 0:
+            raise ValueError("Target tolerance must be positive.")
+        self.name = name
+        self.body = body
+        self.value = value
+        self.tolerance = tolerance
+
+    def check_start(self, field: GravityField, x: float, y: float) -> None:
+        """
+        Reject targets that no trajectory from the initial position can meet, by raising ValueError.
+
+        Parameters:
+            field (GravityField): The gravitational field.
+            x (float): Initial x-coordinate (m).
+            y (float): Initial y-coordinate (m).
+        """
+
+    def reached(self, ensemble: Ensemble, field: GravityField, start: int = 0) -> np.ndarray:
+        """
+        Check which members have been propagated far enough to be measured.
+
+        The check looks at the rows logged from start on, so the rows a check has seen are not
+        scanned again as the ensemble is propagated further. A member that reached the event in
+        the earlier rows may or may not be reported again.
+
+        Parameters:
+            ensemble (Ensemble): The ensemble propagated so far.
+            field (GravityField): The field it is propagated in.
+            start (int): The first row of the logs not checked before.
+
+        Returns:
+            np.ndarray: Whether each member has reached the event the quantity is measured at.
+        """
+        raise NotImplementedError
+
+    def measure(self, ensemble: Ensemble, field: GravityField) -> np.ndarray:
+        """
+        Measure the quantity on the propagated members.
+
+        Parameters:
+            ensemble (Ensemble): The propagated ensemble.
+            field (GravityField): The field it was propagated in.
+
+        Returns:
+            np.ndarray: The quantity of each member, NaN where it is undefined.
+        """
+        raise NotImplementedError
+
+    def residuals(self, ensemble: Ensemble, field: GravityField) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: The difference between the measured quantity of each member and the value.
+        """
+        return self.measure(ensemble, field) - self.value
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(body={self.body!r}, value={self.value}, tolerance={self.tolerance})"
+
+
+class ApoapsisAltitude(Target):
+    """
+    The altitude above a body at the first apsis after the start.
+
+    Any first apsis is measured, so the quantity changes smoothly as a trajectory that starts at its
+    apoapsis is sped up until the start becomes its periapsis. The target altitude must lie above
+    the start, so an apsis that meets it is the apoapsis.
+    """
+
+    def __init__(self, altitude: float, body: str = "Earth", tolerance: float = 100.0):
+        """
+        Parameters:
+            altitude (float): Target altitude (m).
+            body (str): Name of the body.
+            tolerance (float): Acceptable error (m).
+        """
+        super().__init__("apoapsis altitude", body, altitude, tolerance)
+
+    def check_start(self, field: GravityField, x: float, y: float) -> None:
+        body = field.bodies[_body_index(field, self.body)]
+        body_x, body_y = body.position(0.0)
+        if self.value <= math.hypot(x - body_x, y - body_y) - body.radius:
+            raise ValueError("The target apoapsis altitude must be above the starting altitude.")
+
+    def reached(self, ensemble: Ensemble, field: GravityField, start: int = 0) -> np.ndarray:
+        return _extremum_reached(ensemble, field.bodies[_body_index(field, self.body)], 0, start)
+
+    def measure(self, ensemble: Ensemble, field: GravityField) -> np.ndarray:
+        body = field.bodies[_body_index(field, self.body)]
+        altitudes, reached = _first_extremum(_altitudes(ensemble, body), 0)
+
+        # A trajectory that hits a body before its first apsis gets the apsis of its osculating orbit
+        # ahead of it, so the quantity stays continuous while the solver raises it off the surface
+        members = np.flatnonzero(~reached & (ensemble.crash_step > 0))
+        if members.shape[0]:
+            rows = ensemble.crash_step[members] - 1
+            body_x, body_y = _body_positions(body, ensemble.time_log[rows])
+            inward = ((ensemble.x_log[rows, members] - body_x) * ensemble.velocity_x_log[rows, members]
+                      + (ensemble.y_log[rows, members] - body_y) * ensemble.velocity_y_log[rows, members]) < 0
+            altitudes[members] = _osculating_apsis(ensemble, body, field, members, rows, inward)
+        return altitudes
+
+
+class PeriapsisAltitude(Target):
+    """
+    The altitude above a body at the first closest approach after the start, e.g. of a lunar flyby.
+    """
+
+    def __init__(self, altitude: float, body: str = "Moon", tolerance: float = 100.0):
+        """
+        Parameters:
+            altitude (float): Target altitude (m).
+            body (str): Name of the body.
+            tolerance (float): Acceptable error (m).
+        """
+        super().__init__("periapsis altitude", body, altitude, tolerance)
+
+    def reached(self, ensemble: Ensemble, field: GravityField, start: int = 0) -> np.ndarray:
+        return _extremum_reached(ensemble, field.bodies[_body_index(field, self.body)], -1, start)
+
+    def measure(self, ensemble: Ensemble, field: GravityField) -> np.ndarray:
+        index = _body_index(field, self.body)
+        body = field.bodies[index]
+        altitudes, reached = _first_extremum(_altitudes(ensemble, body), -1)
+
+        # A trajectory that hits the body before its closest approach gets the periapsis of its osculating
+        # orbit about it, below the surface, so the quantity stays continuous across grazing the body
+        members = np.flatnonzero(~reached & (ensemble.crash_body == index) & (ensemble.crash_step > 0))
+        if members.shape[0]:
+            rows = ensemble.crash_step[members] - 1
+            altitudes[members] = _osculating_apsis(ensemble, body, field, members, rows,
+                                                   np.ones(members.shape[0], dtype=bool))
+        return altitudes
+
+
+class ImpactAngle(Target):
+    """
+    Where the rocket hits a body, as the angle of the impact point from the body's x-axis.
+    """
+
+    def __init__(self, angle: float, body: str = "Earth", tolerance: float = 0.01):
+        """
+        Parameters:
+            angle (float): Target angle, counterclockwise from the x-axis (degrees).
+            body (str): Name of the body.
+            tolerance (float): Acceptable error (degrees).
+        """
+        super().__init__("impact angle", body, angle, tolerance)
+
+    def reached(self, ensemble: Ensemble, field: GravityField, start: int = 0) -> np.ndarray:
+        return ensemble.crash_step >= 0
+
+    def measure(self, ensemble: Ensemble, field: GravityField) -> np.ndarray:
+        index = _body_index(field, self.body)
+        body = field.bodies[index]
+        angles = np.full(ensemble.size, np.nan)
+        members = np.flatnonzero((ensemble.crash_body == index) & (ensemble.crash_step > 0))
+        if members.shape[0] == 0:
+            return angles
+
+        # The impact point is located within the step by the ensemble
+        body_x, body_y = _body_positions(body, ensemble.crash_time[members])
+        angles[members] = np.degrees(np.arctan2(ensemble.crash_y[members] - body_y, ensemble.crash_x[members] - body_x))
+        return angles
+
+    def residuals(self, ensemble: Ensemble, field: GravityField) -> np.ndarray:
+        # Wrapped, so targeting 179 degrees from -179 takes the short way round
+        return (self.measure(ensemble, field) - self.value + 180) % 360 - 180
+
+
+class TargetingResult:
+    """
+    The outcome of a targeting solve.
+    """
+
+    def __init__(self, velocity_x: float, velocity_y: float, residuals: np.ndarray, converged: bool, message: str,
+                 iterations: list, seconds: float):
+        """
+        Parameters:
+            velocity_x (float): The solved initial velocity in the x-direction (m/s).
+            velocity_y (float): The solved initial velocity in the y-direction (m/s).
+            residuals (np.ndarray): The remaining error of each target at the solution.
+            converged (bool): Whether every target is within its tolerance.
+            message (str): Why the solver stopped.
+            iterations (list): One dict per iteration, see TargetingSolver.solve.
+            seconds (float): Wall time of the solve (s).
+        """
+        self.velocity_x = velocity_x
+        self.velocity_y = velocity_y
+        self.residuals = residuals
+        self.converged = converged
+        self.message = message
+        self.iterations = iterations
+        self.seconds = seconds
+
+    def __repr__(self) -> str:
+        return (f"TargetingResult(velocity_x={self.velocity_x:.6f}, velocity_y={self.velocity_y:.6f}, "
+                f"converged={self.converged}, iterations={len(self.iterations)}, seconds={self.seconds:.3f})")
+
+
+class TargetingSolver:
+    """
+    Solves for the initial velocity that meets a list of targets, see the module docstring.
+
+    With fewer targets than free velocity components, e.g. a single altitude with both
+    components free, the smallest correction that meets the targets is taken at each iteration.
+    """
+
+    def __init__(self, targets: list, mass: float, x: float, y: float, h: float,
+                 max_duration: float = DEFAULT_MAX_DURATION, include_moon: bool = False, moving_moon: bool = False,
+                 field: GravityField = None, free: tuple = None, perturbation: float = 0.1, max_iterations: int = 20,
+                 damping: tuple = (1.0, 0.5, 0.25, 0.1, 0.03, 0.01), max_step: float = 1000.0):
+        """
+        Initialize the solver.
+
+        Parameters:
+            targets (list): The Targets to meet.
+            mass (float): Mass of the rocket (kg).
+            x (float): Initial x-coordinate (m).
+            y (float): Initial y-coordinate (m).
+            h (float): Time step of the propagation (s), which uses the RK4 scheme of Ensemble.
+            max_duration (float): Longest propagated time of a trial trajectory (s). Trajectories are only
+                propagated until they reach their targeted events, and for about one orbital period at most.
+            include_moon (bool): Whether the Moon is included, when no field is given.
+            moving_moon (bool): Whether the Moon orbits the Earth, when no field is given.
+            field (GravityField): The gravitational field, overriding the Earth and Moon options.
+            free (tuple): The velocity components that are varied, 'vx' and/or 'vy', or alone 'speed' (along the
+                initial guess) or 'tangential' (perpendicular to the initial position). Defaults to 'speed' for a
+                single target and to both components otherwise.
+            perturbation (float): Velocity perturbation of the finite differences (m/s).
+            max_iterations (int): Most Newton iterations.
+            damping (tuple): Fractions of the Newton step tried at each iteration. They are propagated together,
+                so trying many costs little.
+            max_step (float): Largest velocity correction of a single iteration (m/s).
+        """
+        if not targets:
+            raise ValueError("At least one target is needed.")
+        if free is None:
+            free = ("speed",) if len(targets) == 1 else ("vx", "vy")
+        if not free or any(name not in _FREE for name in free) or len(set(free)) != len(free):
+            raise ValueError(f"Free variables must be among {list(_FREE)}.")
+        if len(free) > 1 and any(name in _SINGLE_FREE for name in free):
+            raise ValueError(f"The free variables {list(_SINGLE_FREE)} can only be varied on their own.")
+        if h <= 0 or max_duration <= 0:
+            raise ValueError("Time step and duration must be positive.")
+
+        self.targets = list(targets)
+        self.mass = mass
+        self.x = x
+        self.y = y
+        self.h = h
+        self.max_duration = max_duration
+        self.field = field if field is not None else GravityField.earth_moon(include_moon, moving_moon)
+        self.free = tuple(free)
+        self.perturbation = perturbation
+        self.max_iterations = max_iterations
+        self.damping = np.asarray(damping, dtype=float)
+        self.max_step = max_step
+
+        # Validates the body names and target values up front rather than after the first propagation
+        for target in self.targets:
+            _body_index(self.field, target.body)
+            target.check_start(self.field, x, y)
+        self._tolerances = np.array([target.tolerance for target in self.targets])
+
+    def basis(self, velocity_x: float, velocity_y: float) -> np.ndarray:
+        """
+        Directions in which the free components vary the initial velocity.
+
+        Parameters:
+            velocity_x (float): The initial guess of the x-velocity (m/s), which sets the direction of 'speed'.
+            velocity_y (float): The initial guess of the y-velocity (m/s).
+
+        Returns:
+            np.ndarray: One unit (vx, vy) row per free component.
+        """
+        rows = []
+        for name in self.free:
+            if name == "vx":
+                rows.append((1.0, 0.0))
+            elif name == "vy":
+                rows.append((0.0, 1.0))
+            elif name == "speed":
+                speed = math.hypot(velocity_x, velocity_y)
+                if speed == 0:
+                    raise ValueError("Solving for the speed needs a nonzero initial guess to set the direction.")
+                rows.append((velocity_x / speed, velocity_y / speed))
+            else:
+                body = self.field.bodies[0]
+                dx, dy = self.x - body.x, self.y - body.y
+                distance = math.hypot(dx, dy)
+                rows.append((-dy / distance, dx / distance))
+        return np.array(rows)
+
+    def _horizon(self, velocities: np.ndarray) -> tuple:
+        """
+        (Private) Which trial velocities give orbits bound to the central body, and how long to propagate them.
+
+        Returns:
+            tuple: The bound mask, and the longest osculating period of the bound orbits with a margin,
+                capped by max_duration (s), 0 if none are bound.
+        """
+        body = self.field.bodies[0]
+        mu = self.field.central_mu
+        distance = math.hypot(self.x - body.x, self.y - body.y)
+        energy = 0.5 * (velocities[:, 0]**2 + velocities[:, 1]**2) - mu / distance
+        bound = energy < 0
+        if not bound.any():
+            return bound, 0.0
+        semi_major_axis = -mu / (2 * energy[bound])
+        period = 2 * math.pi * np.sqrt(semi_major_axis**3 / mu)
+        return bound, min(self.max_duration, _PERIOD_MARGIN * float(period.max()))
+
+    def evaluate(self, velocities: np.ndarray, basis: np.ndarray = None) -> tuple:
+        """
+        Propagate candidate initial velocities together with their finite difference neighbours as one ensemble.
+
+        Each member is propagated until it has reached the events its targets are measured at, or crashed,
+        or for about one orbital period, see _horizon. Members not bound to the central body are not
+        propagated, and their residuals are NaN.
+
+        Parameters:
+            velocities (np.ndarray): Candidate velocities, one (vx, vy) row each (m/s).
+            basis (np.ndarray): Directions of the free components, see basis. Defaults to those at the first candidate.
+
+        Returns:
+            tuple: The residuals of every candidate, shape (candidates, targets), and the Jacobians of the
+                residuals with respect to the free components, shape (candidates, targets, free).
+        """
+        velocities = np.atleast_2d(np.asarray(velocities, dtype=float))
+        if basis is None:
+            basis = self.basis(*velocities[0])
+        columns = len(self.free)
+
+        # Each candidate is followed by one copy per free component, perturbed in that component
+        members = np.repeat(velocities, columns + 1, axis=0)
+        for column in range(columns):
+            members[column + 1::columns + 1] += self.perturbation * basis[column]
+
+        ensemble = Ensemble(self.mass, self.x, self.y, members[:, 0], members[:, 1])
+        bound, horizon = self._horizon(members)
+        ensemble.alive &= bound
+
+        # Whether each target has been reached by each member, updated from the rows of every new segment
+        reached = np.zeros((len(self.targets), ensemble.size), dtype=bool)
+        checked = 0
+        while ensemble.time < horizon and ensemble.alive.any():
+            ensemble.propagate(self.field, self.h, min(horizon, ensemble.time + _SEGMENT_STEPS * self.h))
+            for row, target in zip(reached, self.targets):
+                row |= target.reached(ensemble, self.field, checked)
+            checked = ensemble.time_log.shape[0]
+            if not (ensemble.alive & ~reached.all(axis=0)).any():
+                break
+
+        residuals = np.stack([target.residuals(ensemble, self.field) for target in self.targets], axis=1)
+        residuals[~bound] = np.nan
+
+        residuals = residuals.reshape(velocities.shape[0], columns + 1, len(self.targets))
+        nominal = residuals[:, 0, :]
+        jacobians = (residuals[:, 1:, :] - nominal[:, np.newaxis, :]).transpose(0, 2, 1) / self.perturbation
+        if any(isinstance(target, ImpactAngle) for target in self.targets):
+            # Angle differences are wrapped too, in case a neighbour lands across the +-180 degree seam
+            wrap = np.array([isinstance(target, ImpactAngle) for target in self.targets])
+            jacobians[:, wrap, :] = ((jacobians[:, wrap, :] * self.perturbation + 180) % 360 - 180) / self.perturbation
+        return nominal, jacobians
+
+    def _error(self, residuals: np.ndarray) -> np.ndarray:
+        """
+        (Private) Size of the residuals in units of the tolerances, infinite where a target is undefined.
+        """
+        error = np.max(np.abs(residuals) / self._tolerances, axis=-1)
+        return np.where(np.isnan(error), np.inf, error)
+
+    def solve(self, velocity_x: float, velocity_y: float, callback=None) -> TargetingResult:
+        """
+        Solve for the initial velocity, starting from a guess.
+
+        Parameters:
+            velocity_x (float): Initial guess of the x-velocity (m/s).
+            velocity_y (float): Initial guess of the y-velocity (m/s).
+            callback (callable): Called with the record of each iteration. Returning True stops the solve.
+
+        Returns:
+            TargetingResult: The best velocity found. Each iteration record holds the 'iteration' number, the
+                'velocity_x' and 'velocity_y' reached, their 'residuals' and 'error' relative to the tolerances,
+                the 'damping' of the step taken, the number of propagated 'members' and the wall time in 'seconds'.
+        """
+        start = time.perf_counter()
+        velocity = np.array([velocity_x, velocity_y], dtype=float)
+
+        # The free components are coordinates along the basis, the rest of the guess is kept as it is
+        basis = self.basis(velocity_x, velocity_y)
+        origin = velocity - basis.T @ (basis @ velocity)
+
+        residuals, jacobians = self.evaluate(velocity, basis)
+        residuals, jacobian = residuals[0], jacobians[0]
+        error = self._error(residuals)
+        if not math.isfinite(error) or not np.isfinite(jacobian).all():
+            raise ValueError("The targets cannot be measured from the initial guess, e.g. it is not bound to "
+                             f"{self.field.bodies[0].name} or never reaches the body.")
+
+        iterations = [{
+            "iteration": 0, "velocity_x": float(velocity[0]), "velocity_y": float(velocity[1]),
+            "residuals": residuals.tolist(), "error": float(error), "damping": 0.0,
+            "members": len(self.free) + 1, "seconds": time.perf_counter() - start,
+        }]
+        message = "Reached the iteration limit."
+        stopped = callback is not None and callback(iterations[-1])
+
+        for iteration in range(1, self.max_iterations + 1):
+            if error <= 1:
+                message = "Converged."
+                break
+            if stopped:
+                message = "Stopped."
+                break
+            iteration_start = time.perf_counter()
+
+            # Newton step on the residuals scaled by their tolerances, the smallest one if underdetermined
+            scaled = jacobian / self._tolerances[:, np.newaxis]
+            step = np.linalg.lstsq(scaled, -residuals / self._tolerances, rcond=None)[0]
+            length = np.linalg.norm(step)
+            if length > self.max_step:
+                step *= self.max_step / length
+
+            # Every damped candidate is propagated at once, and the one with the smallest error is taken
+            coordinates = basis @ (velocity - origin) + self.damping[:, np.newaxis] * step
+            candidates = origin + coordinates @ basis
+            candidate_residuals, candidate_jacobians = self.evaluate(candidates, basis)
+            candidate_errors = self._error(candidate_residuals)
+            usable = (candidate_errors < error) & np.isfinite(candidate_jacobians).all(axis=(1, 2))
+            if not usable.any():
+                message = "No step reduced the error."
+                break
+
+            choice = int(np.argmin(np.where(usable, candidate_errors, np.inf)))
+            velocity = candidates[choice]
+            residuals, jacobian, error = candidate_residuals[choice], candidate_jacobians[choice], candidate_errors[choice]
+            iterations.append({
+                "iteration": iteration, "velocity_x": float(velocity[0]), "velocity_y": float(velocity[1]),
+                "residuals": residuals.tolist(), "error": float(error), "damping": float(self.damping[choice]),
+                "members": candidates.shape[0] * (len(self.free) + 1), "seconds": time.perf_counter() - iteration_start,
+            })
+            stopped = callback is not None and callback(iterations[-1])
+        else:
+            if error <= 1:
+                message = "Converged."
+
+        return TargetingResult(
+            float(velocity[0]), float(velocity[1]), residuals, bool(error <= 1), message, iterations,
+            time.perf_counter() - start,
+        )
+
+    def __repr__(self) -> str:
+        return (f"TargetingSolver(targets={self.targets}, free={self.free}, h={self.h}, "
+                f"max_duration={self.max_duration}, field={self.field})")
@@ -0,0 +1,255 @@
+import math
+
+import numpy as np
+
+# Layout of one logged sample, packed as doubles
+TRAJECTORY_DTYPE = np.dtype([
+    ("time", "f8"),
+    ("x", "f8"),
+    ("y", "f8"),
+    ("velocity_x", "f8"),
+    ("velocity_y", "f8"),
+    ("ke", "f8"),
+    ("gpe", "f8"),
+    ("total_energy", "f8"),
+])
+
+# Capacity used when no size hint is given, and the smallest amount the store grows by
+DEFAULT_CHUNK = 4096
+
+
+class Trajectory:
+    """
+    Stores the logged samples of a run in a preallocated NumPy structured array.
+
+    The array grows in chunks when it fills up, so appending stays cheap and the
+    columns can be handed to NumPy or matplotlib as views without conversion.
+    Logging can be decimated to every Nth step or every T seconds, independently
+    of the integration step.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CHUNK, every: int = 1, interval: float = None):
+        """
+        Initialize an empty trajectory store.
+
+        Parameters:
+            capacity (int): Number of samples to preallocate.
+            every (int): Record every Nth step.
+            interval (float): Record a step only once this many seconds have passed since the last sample (s).
+                Takes precedence over every when given.
+        """
+        if every < 1:
+            raise ValueError("Logging decimation must be at least 1.")
+        if interval is not None and interval <= 0:
+            raise ValueError("Logging interval must be positive.")
+
+        self.every = int(every)
+        self.interval = interval
+        self._data = np.empty(max(int(capacity), 1), dtype=TRAJECTORY_DTYPE)
+        self._size = 0
+        self._steps = 0
+
+        # Samples handed to a file by stream(), and samples released from memory afterwards
+        self._streamed = 0
+        self.released = 0
+
+    @staticmethod
+    def capacity_for(simulation_time: float, h: float, every: int = 1, interval: float = None) -> int:
+        """
+        Estimate the number of samples a run will log, used to size the store up front.
+
+        Parameters:
+            simulation_time (float): Total simulation time (s).
+            h (float): Time step or logging interval (s).
+            every (int): Logging decimation in steps.
+            interval (float): Logging decimation in seconds.
+
+        Returns:
+            int: The number of samples, including the initial and final ones.
+        """
+        spacing = max(h * every, interval or 0.0)
+        if spacing <= 0 or not math.isfinite(simulation_time):
+            return DEFAULT_CHUNK
+        return math.ceil(simulation_time / spacing) + 2
+
+    def due(self, time: float) -> bool:
+        """
+        Count a step and report whether it should be recorded under the decimation settings.
+
+        Parameters:
+            time (float): Time of the step (s).
+
+        Returns:
+            bool: True if the step should be recorded.
+        """
+        self._steps += 1
+        if self.interval is not None:
+            return self._size == 0 or time >= self._data["time"][self._size - 1] + self.interval
+        return self._steps % self.every == 0
+
+    def due_mask(self, times: np.ndarray) -> np.ndarray:
+        """
+        Count many steps at once and report which of them should be recorded, see due.
+
+        Parameters:
+            times (np.ndarray): Increasing times of the steps (s).
+
+        Returns:
+            np.ndarray: Boolean mask of the steps to record.
+        """
+        count = times.shape[0]
+        if self.interval is None:
+            mask = (self._steps + np.arange(1, count + 1)) % self.every == 0
+        else:
+            # Jump from one recorded step to the next, so the loop only runs once per sample
+            mask = np.zeros(count, dtype=bool)
+            last = self._data["time"][self._size - 1] if self._size else -math.inf
+            index = int(np.searchsorted(times, last + self.interval))
+            while index < count:
+                mask[index] = True
+                index = int(np.searchsorted(times, times[index] + self.interval))
+        self._steps += count
+        return mask
+
+    def append(self, time: float, x: float, y: float, velocity_x: float, velocity_y: float, ke: float, gpe: float) -> None:
+        """
+        Record a sample, growing the store if it is full.
+        """
+        if self._size == self._data.shape[0]:
+            self._grow()
+        self._data[self._size] = (time, x, y, velocity_x, velocity_y, ke, gpe, ke + gpe)
+        self._size += 1
+
+    def extend(self, samples: np.ndarray) -> None:
+        """
+        Record many samples at once, e.g. the logs of an earlier run being continued.
+
+        Parameters:
+            samples (np.ndarray): Samples with dtype TRAJECTORY_DTYPE.
+        """
+        while self._size + samples.shape[0] > self._data.shape[0]:
+            self._grow()
+        self._data[self._size:self._size + samples.shape[0]] = samples
+        self._size += samples.shape[0]
+
+    def reserve(self, count: int = 1) -> np.ndarray:
+        """
+        Make room for at least count more samples, for code that writes them directly, e.g. a compiled kernel.
+
+        Parameters:
+            count (int): Number of samples to make room for.
+
+        Returns:
+            np.ndarray: The free part of the store as a writable 2D float view, one row per sample and one
+                column per field of TRAJECTORY_DTYPE. Rows written to it are recorded by commit.
+        """
+        while self._size + count > self._data.shape[0]:
+            self._grow()
+        free = self._data[self._size:]
+        return free.view(np.float64).reshape(free.shape[0], len(TRAJECTORY_DTYPE.names))
+
+    def commit(self, count: int, steps: int) -> None:
+        """
+        Record samples written to the view returned by reserve, and count the steps they were logged from.
+
+        Parameters:
+            count (int): Number of samples written.
+            steps (int): Number of steps taken, see due.
+        """
+        self._size += count
+        self._steps += steps
+
+    @property
+    def steps(self) -> int:
+        """
+        Returns:
+            int: The number of steps counted by due, which the every decimation is based on.
+        """
+        return self._steps
+
+    def _grow(self) -> None:
+        """
+        (Private) Reallocate the store with room for at least another chunk of samples.
+        """
+        capacity = self._data.shape[0]
+        data = np.empty(capacity + max(capacity, DEFAULT_CHUNK), dtype=TRAJECTORY_DTYPE)
+        data[:self._size] = self._data[:self._size]
+        self._data = data
+
+    def stream(self, writer, keep: bool = True) -> None:
+        """
+        Append the samples recorded since the last call to a trajectory file.
+
+        Parameters:
+            writer (TrajectoryWriter): The file being written.
+            keep (bool): Whether the samples stay in memory. If not, only the first and the latest
+                samples are kept, which is all a rocket reads back, so runs larger than memory can
+                be written to disk.
+        """
+        writer.append(self._data[self._streamed:self._size])
+        if not keep and self._size > 2:
+            self.released += self._size - 2
+            self._data[1] = self._data[self._size - 1]
+            self._size = 2
+        self._streamed = self._size
+
+    def truncate(self, count: int, steps: int, last: np.ndarray = None) -> None:
+        """
+        Drop the samples recorded after the first count, e.g. to take back the end of a run.
+
+        Parameters:
+            count (int): Number of samples to keep, including released ones.
+            steps (int): Number of steps counted by due up to the kept samples.
+            last (np.ndarray): The last kept sample, needed when it was released from memory.
+        """
+        if count < 1 or count > self._size + self.released:
+            raise ValueError(f"Cannot keep {count} of {self._size + self.released} samples.")
+        size = count - self.released
+        if count == 1:
+            self.released = 0
+            size = 1
+        elif size < 2:
+            # The last kept sample was released, so it takes the place of the latest one again
+            if last is None:
+                raise ValueError("The last kept sample was released from memory.")
+            self._data[1] = last
+            self.released = count - 2
+            size = 2
+        self._size = size
+        self._streamed = min(self._streamed, size)
+        self._steps = steps
+
+    def mark_streamed(self, released: int = 0) -> None:
+        """
+        Treat the samples recorded so far as already written, when continuing the file they were read from.
+
+        Parameters:
+            released (int): Number of samples of the file that were not read back into memory.
+        """
+        self._streamed = self._size
+        self.released = released
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Return a view of one logged column, e.g. 'x' or 'total_energy'.
+        """
+        return self._data[name][:self._size]
+
+    @property
+    def data(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: A view of the recorded samples as a structured array.
+        """
+        return self._data[:self._size]
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns:
+            int: The number of bytes allocated for the store.
+        """
+        return self._data.nbytes
+
+    def __len__(self) -> int:
+        return self._size
@@ -0,0 +1,355 @@
+"""
+On-disk trajectory format.
+
+A trajectory file starts with a fixed-size header block followed by the samples in
+chunks. Every chunk holds up to `chunk_size` samples stored column by column, so a
+single column of a time window can be read from a few contiguous ranges, and new
+chunks can be appended while a run is in progress.
+
+Layout:
+    bytes 0-7       magic b"RKTTRAJ1"
+    bytes 8-15      number of samples written (uint64, little endian)
+    bytes 16-23     chunk size in samples (uint64)
+    bytes 24-31     length of the JSON header (uint64)
+    bytes 32-...    JSON header: initial conditions, constants, integrator settings and columns
+    HEADER_SIZE-... chunks of len(columns) * chunk_size little endian doubles
+
+The sample count is updated after the data it covers has been written, so a file that
+is still being written can be read at any time.
+
+The events of the run are kept in a JSON sidecar next to the file, `<path>.events.json`,
+as a list of records (see simulation.events.EventRecord.as_dict). It is replaced as a
+whole whenever new events are written, since their number is not bounded by the header.
+"""
+import json
+import math
+import os
+import struct
+
+import numpy as np
+
+from simulation.trajectory import TRAJECTORY_DTYPE
+
+MAGIC = b"RKTTRAJ1"
+FORMAT_VERSION = 1
+HEADER_SIZE = 65536
+DEFAULT_FILE_CHUNK = 65536
+
+EVENTS_SUFFIX = ".events.json"
+
+_PREFIX = struct.Struct("<8sQQQ")
+_COUNT = struct.Struct("<Q")
+_COUNT_OFFSET = len(MAGIC)
+_COLUMNS = TRAJECTORY_DTYPE.names
+
+
+def events_path(path: str) -> str:
+    """
+    Path of the events sidecar of a trajectory file.
+    """
+    return path + EVENTS_SUFFIX
+
+
+class TrajectoryWriter:
+    """
+    Appends trajectory samples to a new trajectory file.
+    """
+
+    def __init__(self, path: str, header: dict, chunk_size: int = DEFAULT_FILE_CHUNK, append: bool = False):
+        """
+        Create the file and write its header, or reopen an existing file to append to it.
+
+        Parameters:
+            path (str): Path of the file, overwritten if it exists unless appending.
+            header (dict): JSON-serializable description of the run, see SimulationRunner.header.
+                When appending, None keeps the file's header.
+            chunk_size (int): Number of samples per chunk. When appending, the file's chunk size is used.
+            append (bool): Whether to continue an existing file, e.g. when a run is extended.
+        """
+        if chunk_size < 1:
+            raise ValueError("Chunk size must be at least 1.")
+
+        self.path = path
+        if append:
+            self._file = open(path, "r+b")
+            magic, self.count, chunk_size, _ = _PREFIX.unpack(self._file.read(_PREFIX.size))
+            if magic != MAGIC:
+                self._file.close()
+                raise ValueError(f"'{path}' is not a trajectory file.")
+        else:
+            self._file = open(path, "w+b")
+            self.count = 0
+            # The events of a run the file held before belong to it
+            try:
+                os.remove(events_path(path))
+            except FileNotFoundError:
+                pass
+        self.chunk_size = int(chunk_size)
+
+        if header is not None:
+            header = {**header, "format_version": FORMAT_VERSION, "columns": list(_COLUMNS)}
+            encoded = json.dumps(header).encode()
+            if _PREFIX.size + len(encoded) > HEADER_SIZE:
+                raise ValueError("Trajectory file header is too large.")
+            self._file.seek(0)
+            self._file.write(_PREFIX.pack(MAGIC, self.count, self.chunk_size, len(encoded)) + encoded)
+            if not append:
+                self._file.truncate(HEADER_SIZE)
+
+        # Samples of the current, partially filled chunk, and how many of them are on disk. The
+        # samples of a reopened file's last chunk are on disk already, so only their count is needed
+        self._pending = np.empty(self.chunk_size, dtype=TRAJECTORY_DTYPE)
+        self._pending_size = self.count % self.chunk_size
+        self._pending_written = self._pending_size
+
+    def append(self, samples: np.ndarray) -> None:
+        """
+        Append samples, writing every chunk they complete.
+
+        Parameters:
+            samples (np.ndarray): Samples with dtype TRAJECTORY_DTYPE.
+        """
+        start = 0
+        while start < samples.shape[0]:
+            if self._pending_size == 0:
+                # Reserve the whole chunk up front so readers can map it
+                self._file.truncate(self._chunk_offset(self.count // self.chunk_size + 1))
+            take = min(self.chunk_size - self._pending_size, samples.shape[0] - start)
+            self._pending[self._pending_size:self._pending_size + take] = samples[start:start + take]
+            self._pending_size += take
+            start += take
+            if self._pending_size == self.chunk_size:
+                self._write_pending()
+
+    def flush(self) -> None:
+        """
+        Write the samples of the partially filled chunk too, so readers see every appended sample.
+        """
+        if self._pending_size > self._pending_written:
+            self._write_pending()
+        self._file.flush()
+
+    def truncate(self, count: int) -> None:
+        """
+        Drop the samples written after the first count, e.g. when the end of a run is taken back.
+
+        Parameters:
+            count (int): Number of samples to keep.
+        """
+        self.flush()
+        if count > self.count:
+            raise ValueError(f"Cannot keep {count} of {self.count} samples.")
+        # The kept samples of the last chunk are on disk, later ones are overwritten as the file grows again
+        self.count = count
+        self._pending_size = self._pending_written = count % self.chunk_size
+        self._file.seek(_COUNT_OFFSET)
+        self._file.write(_COUNT.pack(self.count))
+
+    def write_events(self, events: list) -> None:
+        """
+        Replace the events sidecar of the file.
+
+        Written under a temporary name first, so readers never see a partial list.
+
+        Parameters:
+            events (list): Every event of the run so far, as the dicts of EventRecord.as_dict.
+        """
+        path = events_path(self.path)
+        with open(path + ".partial", "w") as file:
+            json.dump(events, file)
+        os.replace(path + ".partial", path)
+
+    def _write_pending(self) -> None:
+        """
+        (Private) Write the unwritten samples of the current chunk column by column, then publish the new count.
+        """
+        chunk = self.count // self.chunk_size
+        first, last = self._pending_written, self._pending_size
+        base = self._chunk_offset(chunk)
+        for index, name in enumerate(_COLUMNS):
+            self._file.seek(base + 8 * (index * self.chunk_size + first))
+            self._file.write(self._pending[name][first:last].astype("<f8").tobytes())
+
+        self.count += last - first
+        self._file.seek(_COUNT_OFFSET)
+        self._file.write(_COUNT.pack(self.count))
+
+        if last == self.chunk_size:
+            self._pending_size = 0
+            self._pending_written = 0
+        else:
+            self._pending_written = last
+
+    def _chunk_offset(self, chunk: int) -> int:
+        """
+        (Private) Byte offset of a chunk in the file.
+        """
+        return HEADER_SIZE + chunk * len(_COLUMNS) * self.chunk_size * 8
+
+    def close(self) -> None:
+        """
+        Write any pending samples and close the file.
+        """
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class TrajectoryFile:
+    """
+    Reads a trajectory file through a memory map, so only the parts that are sliced are loaded.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open a trajectory file and read its header.
+
+        Parameters:
+            path (str): Path of the file.
+        """
+        self.path = path
+        with open(path, "rb") as file:
+            magic, _, chunk_size, header_length = _PREFIX.unpack(file.read(_PREFIX.size))
+            if magic != MAGIC:
+                raise ValueError(f"'{path}' is not a trajectory file.")
+            self.header = json.loads(file.read(header_length))
+        self.chunk_size = chunk_size
+        self.columns = tuple(self.header["columns"])
+        self.count = 0
+        self._chunks = None
+        self.refresh()
+
+    def refresh(self) -> int:
+        """
+        Pick up samples written since the file was opened, for files of runs still in progress.
+
+        Returns:
+            int: The number of samples.
+        """
+        with open(self.path, "rb") as file:
+            file.seek(_COUNT_OFFSET)
+            count = _COUNT.unpack(file.read(_COUNT.size))[0]
+        chunks = math.ceil(count / self.chunk_size)
+        if self._chunks is None or self._chunks.shape[0] != chunks:
+            self._chunks = np.memmap(
+                self.path, dtype="<f8", mode="r", offset=HEADER_SIZE, shape=(chunks, len(self.columns), self.chunk_size)
+            ) if chunks else np.empty((0, len(self.columns), self.chunk_size))
+        self.count = count
+        return count
+
+    def column(self, name: str, start: int = 0, stop: int = None, step: int = 1) -> np.ndarray:
+        """
+        Read one column over a range of samples.
+
+        Parameters:
+            name (str): Column name, e.g. 'x' or 'total_energy'.
+            start (int): Index of the first sample.
+            stop (int): Index past the last sample, defaults to the end.
+            step (int): Read every step-th sample.
+
+        Returns:
+            np.ndarray: The values, copied out of the file.
+        """
+        start, stop, step = slice(start, stop, step).indices(self.count)
+        if stop <= start:
+            return np.empty(0)
+        index = self.columns.index(name)
+
+        # Gather the range chunk by chunk, so only the selected values are copied
+        parts = []
+        position = start
+        while position < stop:
+            chunk = position // self.chunk_size
+            offset = chunk * self.chunk_size
+            end = min(stop, offset + self.chunk_size)
+            parts.append(self._chunks[chunk, index, position - offset:end - offset:step])
+            position += math.ceil((end - position) / step) * step
+        return np.concatenate(parts)
+
+    def slice(self, start: int = 0, stop: int = None, step: int = 1) -> np.ndarray:
+        """
+        Read a range of samples.
+
+        Parameters:
+            start (int): Index of the first sample.
+            stop (int): Index past the last sample, defaults to the end.
+            step (int): Read every step-th sample.
+
+        Returns:
+            np.ndarray: The samples, with dtype TRAJECTORY_DTYPE.
+        """
+        columns = {name: self.column(name, start, stop, step) for name in self.columns}
+        samples = np.empty(columns["time"].shape[0], dtype=TRAJECTORY_DTYPE)
+        for name, values in columns.items():
+            samples[name] = values
+        return samples
+
+    def index_of(self, time: float) -> int:
+        """
+        Find the first sample at or after a time, reading one value per chunk and then a single chunk.
+
+        Parameters:
+            time (float): Time (s).
+
+        Returns:
+            int: The sample index, the number of samples if all are earlier.
+        """
+        if self.count == 0:
+            return 0
+        time_index = self.columns.index("time")
+        chunk = int(np.searchsorted(self._chunks[:, time_index, 0], time, side="right")) - 1
+        if chunk < 0:
+            return 0
+        start = chunk * self.chunk_size
+        times = self.column("time", start, min(start + self.chunk_size, self.count))
+        return start + int(np.searchsorted(times, time))
+
+    def window(self, start_time: float, end_time: float, max_samples: int = None) -> np.ndarray:
+        """
+        Read the samples within a time window.
+
+        Parameters:
+            start_time (float): Start of the window (s).
+            end_time (float): End of the window (s).
+            max_samples (int): Optional limit, longer windows are read with a stride.
+
+        Returns:
+            np.ndarray: The samples, with dtype TRAJECTORY_DTYPE.
+        """
+        start = self.index_of(start_time)
+        stop = self.index_of(end_time)
+        if stop < self.count and self.column("time", stop, stop + 1)[0] == end_time:
+            stop += 1
+        step = max(1, math.ceil((stop - start) / max_samples)) if max_samples else 1
+        return self.slice(start, stop, step)
+
+    def events(self) -> list:
+        """
+        Read the events sidecar of the file.
+
+        Returns:
+            list: The events of the run as the dicts of EventRecord.as_dict, empty if it has no sidecar.
+        """
+        try:
+            with open(events_path(self.path)) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return []
+
+    def close(self) -> None:
+        """
+        Release the memory map.
+        """
+        self._chunks = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __repr__(self) -> str:
+        return f"TrajectoryFile(path={self.path!r}, count={self.count}, chunk_size={self.chunk_size})"
@@ -0,0 +1,29 @@
+import pytest
+
+from simulation.batch import DEFAULT_CASE, complete_case, run_batch, run_case
+
+
+def test_failed_case_records_its_error():
+    row = run_case(3, {**DEFAULT_CASE, "h": -1})
+    assert row["index"] == 3
+    assert row["error"] == "ValueError: Time step must be positive."
+
+
+def test_cases_naming_an_integrator_are_integrated():
+    assert complete_case({})["analytic"]
+    assert not complete_case({"integrator": "yoshida4"})["analytic"]
+    assert complete_case({"integrator": "yoshida4", "analytic": True})["analytic"]
+
+
+@pytest.mark.parametrize("tolerances", [{"rtol": 0, "atol": 0}, {"rtol": -1e-9}, {"atol": float("nan")}])
+def test_invalid_tolerances_are_rejected(tolerances):
+    row = run_case(0, {**DEFAULT_CASE, "integrator": "dopri5", **tolerances})
+    assert row["error"] == "ValueError: Tolerances must not be negative, and at least one must be positive."
+
+
+def test_sweep_continues_past_unexpected_errors():
+    # A mass of None fails deep inside the run with a TypeError
+    cases = [{**DEFAULT_CASE, "mass": None, "duration": 100}, {**DEFAULT_CASE, "duration": 100}]
+    failed, ran = run_batch(cases, workers=1)
+    assert failed["error"].startswith("TypeError: ")
+    assert "error" not in ran and ran["steps"] == 10
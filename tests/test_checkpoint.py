@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from simulation.rocket import Rocket
+from simulation.runner import SimulationRunner
+from simulation.trajectory_file import TrajectoryFile
+
+
+def elliptical_run(time_target: float, output: str = None) -> SimulationRunner:
+    """An elliptical Earth orbit from 7000 km, with an apsis about every 3500 s."""
+    runner = SimulationRunner(Rocket(100, 0, 7e6, 8000, 0, 0), 10, time_target, output=output, analytic=False,
+                              compiled=False)
+    runner.run()
+    return runner
+
+
+@pytest.mark.parametrize("keep_in_memory", [True, False])
+def test_checkpoint_keeps_events(tmp_path, keep_in_memory):
+    path = str(tmp_path / "run.traj")
+    first = elliptical_run(10000, path)
+    continued = SimulationRunner.from_checkpoint(path, 20000, keep_in_memory=keep_in_memory)
+    continued.run()
+    straight = elliptical_run(20000)
+
+    assert 0 < len(first.events) < len(straight.events)
+    assert [record.as_dict() for record in continued.events] == [record.as_dict() for record in straight.events]
+
+
+@pytest.mark.parametrize("integrator", ["rk4", "dopri5", "yoshida4"])
+@pytest.mark.parametrize("settings", [{"log_every": 1}, {"log_every": 7}, {"log_interval": 45.0}])
+def test_extend_matches_a_straight_run(integrator, settings):
+    runners = []
+    for time_target in (10000, 20000):
+        rocket = Rocket(100, 0, 7e6, 8000, 0, 0, integrator=integrator, **settings)
+        runners.append(SimulationRunner(rocket, 10, time_target, include_moon=True, moving_moon=True))
+    extended, straight = runners
+    extended.run()
+    extended.extend(20000)
+    extended.run()
+    straight.run()
+
+    assert extended.steps == straight.steps
+    np.testing.assert_array_equal(extended.rocket.trajectory.data, straight.rocket.trajectory.data)
+    assert [record.as_dict() for record in extended.events] == [record.as_dict() for record in straight.events]
+
+
+@pytest.mark.parametrize("keep_in_memory", [True, False])
+def test_extend_rewrites_the_end_of_the_file(tmp_path, keep_in_memory):
+    paths = str(tmp_path / "extended.traj"), str(tmp_path / "straight.traj")
+    extended = SimulationRunner(Rocket(100, 0, 7e6, 8000, 0, 0, integrator="dopri5", log_every=3), 10, 10000,
+                                output=paths[0], keep_in_memory=keep_in_memory, analytic=False)
+    extended.run()
+    extended.extend(20000)
+    extended.run()
+    SimulationRunner(Rocket(100, 0, 7e6, 8000, 0, 0, integrator="dopri5", log_every=3), 10, 20000,
+                     output=paths[1], analytic=False).run()
+
+    extended_file, straight_file = TrajectoryFile(paths[0]), TrajectoryFile(paths[1])
+    np.testing.assert_array_equal(extended_file.slice(), straight_file.slice())
+    assert extended_file.events() == straight_file.events()
+
+
+@pytest.mark.parametrize("keep_in_memory", [True, False])
+def test_energy_drift_is_measured_from_the_burn(tmp_path, keep_in_memory):
+    path = str(tmp_path / "branch.traj")
+    circular = SimulationRunner(Rocket(100, 0, 7e6, 7546, 0, 0), 10, 10000, analytic=False, compiled=False)
+    circular.run()
+    branched = circular.branch(5000, 10000, delta_v=(1500, 0), output=path)
+    branched.run()
+    burn = branched.rocket.trajectory.data[branched.rocket.impulse_samples[-1]]
+    fresh = SimulationRunner(Rocket(100, *(float(burn[key]) for key in ("x", "y", "velocity_x", "velocity_y")),
+                                    float(burn["time"])), 10, 20000, analytic=False, compiled=False)
+    fresh.run()
+
+    continued = SimulationRunner.from_checkpoint(path, 20000, keep_in_memory=keep_in_memory)
+    continued.run()
+    assert continued.energy_drift_per_orbit() == pytest.approx(fresh.energy_drift_per_orbit(), rel=1e-6)
+    # Measured from the first sample, the burn would swamp the drift of the integrator
+    assert abs(fresh.energy_drift_per_orbit()) < 1e-6
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from simulation.ensemble import Ensemble
+from simulation.gravity import GravityField
+from simulation.rocket import Rocket
+from simulation.runner import SimulationRunner
+
+# Speeds from 7000 km: a suborbital arc that hits the Earth after about 520 s, and two orbits
+SPEEDS = np.array([5000.0, 7543.0, 8000.0])
+
+
+@pytest.mark.parametrize("moon", [False, True])
+def test_members_match_rocket_runs(moon):
+    field = GravityField.earth_moon(moon, moon)
+    ensemble = Ensemble(100, 0, 7e6, SPEEDS, 0)
+    # Propagated in two segments, which must not change the result
+    ensemble.propagate(field, 10, 3000)
+    ensemble.propagate(field, 10, 10000)
+
+    for member, speed in enumerate(SPEEDS):
+        runner = SimulationRunner(Rocket(100, 0, 7e6, speed, 0, 0), 10, 10000, field=field, analytic=False,
+                                  compiled=False)
+        runner.run()
+        logs = runner.rocket.trajectory.data
+        trajectory = ensemble.trajectory(member)
+        for name in ("time", "x", "y", "velocity_x", "velocity_y"):
+            np.testing.assert_array_equal(trajectory[name], logs[name])
+
+        crashed = runner.crash_message is not None
+        assert crashed == (ensemble.crash_step[member] >= 0)
+        if crashed:
+            assert ensemble.crash_time[member] == runner.rocket.time
+            assert ensemble.crash_body[member] == 0
+
+
+def test_logs_grow_across_many_segments():
+    ensemble = Ensemble(100, 0, 7e6, SPEEDS[1:], 0)
+    field = GravityField.earth_moon(False, False)
+    for segment in range(1, 51):
+        ensemble.propagate(field, 10, 100 * segment)
+    assert ensemble.x_log.shape == (501, 2)
+    np.testing.assert_array_equal(ensemble.time_log, 10.0 * np.arange(501))
+    assert not np.isnan(ensemble.x_log).any()
@@ -0,0 +1,35 @@
+import math
+
+import numpy as np
+import pytest
+
+from simulation.ephemeris import kepler_ephemeris
+from simulation.gravity import GravityField
+from simulation.kepler import KeplerOrbit
+from simulation.planet_constants import EARTH_MASS, G_CONSTANT, MOON_DISTANCE, MOON_MASS
+
+MU = G_CONSTANT * (EARTH_MASS + MOON_MASS)
+
+
+@pytest.mark.parametrize("eccentricity, bound", [(0.0, 1e-3), (0.055, 1e-3), (0.5, 1e-2)])
+@pytest.mark.parametrize("epoch", [0.0, 1e5])
+def test_mid_segment_error_against_kepler(eccentricity, bound, epoch):
+    # The Hermite segments are least accurate halfway between samples, a few periods on to check the wrap
+    ephemeris = kepler_ephemeris(MU, MOON_DISTANCE, eccentricity, epoch)
+    times = (np.arange(ephemeris.segments) + 0.5) * ephemeris.spacing + 3 * ephemeris.period
+    periapsis = MOON_DISTANCE * (1 - eccentricity)
+    orbit = KeplerOrbit(MU, -epoch, periapsis, 0, 0, math.sqrt(MU * (1 + eccentricity) / periapsis))
+    x, y, _, _ = orbit.states(times)
+
+    ephemeris_x, ephemeris_y = ephemeris.positions(times)
+    assert np.max(np.hypot(ephemeris_x - x, ephemeris_y - y)) < bound
+    for time, expected_x, expected_y in zip(times[::97], x[::97], y[::97]):
+        assert math.hypot(*np.subtract(ephemeris.position(time), (expected_x, expected_y))) < bound
+
+
+def test_tables_are_shared():
+    table = kepler_ephemeris(MU, MOON_DISTANCE, 0.0, 1e5)
+    assert kepler_ephemeris(MU, MOON_DISTANCE, 0.0, 1e5) is table
+    assert kepler_ephemeris(MU, MOON_DISTANCE, 0.0, 2e5) is not table
+    first, second = GravityField.earth_moon(True, True), GravityField.earth_moon(True, True)
+    assert first.bodies[1].ephemeris is second.bodies[1].ephemeris
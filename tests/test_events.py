@@ -0,0 +1,43 @@
+import math
+
+import pytest
+
+from simulation.gravity import GravityField
+from simulation.kepler import KeplerOrbit
+from simulation.rocket import Rocket
+from simulation.runner import SimulationRunner
+
+
+@pytest.mark.parametrize("integrator, h", [("rk4", 60), ("dopri5", 60), ("yoshida4", 10)])
+def test_crash_is_located_within_the_step(integrator, h):
+    # A suborbital arc from 7000 km that reaches the surface after about 520 s, mid-step for every h
+    field = GravityField.earth_moon(False, False)
+    earth = field.bodies[0]
+    crash_time = KeplerOrbit(field.central_mu, 0, 0, 7e6, 5000, 0).radius_crossing_time(earth.radius)
+    runner = SimulationRunner(Rocket(100, 0, 7e6, 5000, 0, 0, integrator=integrator), h, 10000, analytic=False,
+                              compiled=False)
+    runner.run()
+
+    event = runner.rocket.terminal_event
+    assert runner.crash_message == event.message
+    # Within 10 ms of the analytic time and 1 cm of the surface, rather than at the end of the step
+    assert event.time == pytest.approx(crash_time, abs=1e-2)
+    assert math.hypot(event.state[0], event.state[1]) == pytest.approx(earth.radius, abs=1e-2)
+    assert runner.rocket.time == event.time
+    assert runner.rocket.trajectory.data["time"][-1] == event.time
+
+
+@pytest.mark.parametrize("integrator, h", [("rk4", 120), ("dopri5", 60), ("yoshida4", 60)])
+def test_grazing_crash_is_not_missed(integrator, h):
+    # The periapsis is 200 m below the surface, a dip that long steps can step across
+    field = GravityField.earth_moon(False, False)
+    earth = field.bodies[0]
+    periapsis, apoapsis = earth.radius - 200, 7e6
+    speed = math.sqrt(2 * field.central_mu * periapsis / (apoapsis * (apoapsis + periapsis)))
+    runner = SimulationRunner(Rocket(100, 0, apoapsis, speed, 0, 0, integrator=integrator), h, 10000,
+                              analytic=False, compiled=False)
+    runner.run()
+
+    event = runner.rocket.terminal_event
+    assert event is not None and event.terminal
+    assert math.hypot(event.state[0], event.state[1]) == pytest.approx(earth.radius, abs=1e-2)
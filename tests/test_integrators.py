@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from simulation.gravity import GravityField
+from simulation.kepler import KeplerOrbit
+from simulation.rocket import Rocket
+from simulation.runner import SimulationRunner
+
+
+def kepler_error(integrator: str, h: float, **settings) -> float:
+    """
+    Largest position error over a day of an orbit with an eccentricity of about 0.6, against its analytic solution.
+    """
+    runner = SimulationRunner(Rocket(100, 0, 7e6, 9500, 0, 0, integrator=integrator, **settings), h, 86400,
+                              analytic=False, compiled=False)
+    runner.run()
+    logs = runner.rocket.trajectory.data
+    x, y, _, _ = KeplerOrbit(GravityField.earth_moon(False, False).central_mu, 0, 0, 7e6, 9500, 0).states(logs["time"])
+    return float(np.max(np.hypot(logs["x"] - x, logs["y"] - y)))
+
+
+def test_dopri5_follows_kepler_orbit():
+    # Within 50 m at the default tolerances, about 15 m in practice, and tightening them tightens the orbit
+    default = kepler_error("dopri5", 60)
+    tight = kepler_error("dopri5", 60, rtol=1e-11, atol=1e-5)
+    assert default < 50.0
+    assert tight < 1.0 and tight < default / 10
+
+
+
+def test_yoshida4_follows_kepler_orbit():
+    # Within 50 m at a 10 s step, about 6 m in practice
+    assert kepler_error("yoshida4", 10) < 50.0
+
+
+@pytest.mark.parametrize("integrator, order", [("verlet", 2), ("yoshida4", 4)])
+def test_symplectic_integrators_converge_at_their_order(integrator, order):
+    assert kepler_error(integrator, 10) / kepler_error(integrator, 5) == pytest.approx(2**order, rel=0.25)
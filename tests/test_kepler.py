@@ -0,0 +1,31 @@
+import pytest
+
+from simulation.rocket import Rocket
+from simulation.runner import SimulationRunner
+
+
+def crash_run(integrator: str, analytic: bool) -> SimulationRunner:
+    """A suborbital run from 7000 km that hits the Earth after about 390 s."""
+    runner = SimulationRunner(Rocket(100, 0, 7e6, 1000, 0, 0, integrator=integrator), 10, 100000,
+                              analytic=analytic, compiled=False)
+    runner.run()
+    return runner
+
+
+def test_earth_only_runs_are_analytic_unless_opted_out():
+    def runner(**settings):
+        return SimulationRunner(Rocket(100, 0, 7e6, 7543, 0, 0), 10, 1000, **settings)
+
+    assert runner().analytic
+    assert not runner(analytic=False).analytic
+    assert not runner(include_moon=True).analytic
+
+
+@pytest.mark.parametrize("integrator", ["rk4", "verlet", "yoshida4"])
+def test_analytic_crash_counts_steps_taken(integrator):
+    analytic = crash_run(integrator, analytic=True)
+    numerical = crash_run(integrator, analytic=False)
+    assert analytic.analytic and not numerical.analytic
+    assert analytic.crash_message == numerical.crash_message
+    assert analytic.steps == numerical.steps
+    assert len(analytic.rocket.trajectory) == len(numerical.rocket.trajectory)
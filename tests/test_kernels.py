@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+from benchmarks.suite import scenario_case
+from simulation import kernels
+from simulation.batch import simulate
+
+pytestmark = pytest.mark.skipif(not kernels.JIT_AVAILABLE, reason="Numba is not installed")
+
+
+@pytest.mark.parametrize("scenario", ["leo_circular", "crash"])
+@pytest.mark.parametrize("integrator", ["rk4", "verlet", "yoshida4"])
+def test_compiled_matches_python(scenario, integrator):
+    case = scenario_case(scenario, integrator)
+    compiled = simulate(case, compiled=True)
+    python = simulate(case, compiled=False)
+    assert compiled.compiled and not python.compiled
+
+    assert compiled.steps == python.steps
+    assert compiled.crash_message == python.crash_message
+    np.testing.assert_array_equal(compiled.rocket.trajectory.data, python.rocket.trajectory.data)
+    assert [record.as_dict() for record in compiled.events] == [record.as_dict() for record in python.events]
@@ -0,0 +1,78 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from simulation.nbody import NBodySimulation
+
+SCENARIO = os.path.join(os.path.dirname(__file__), os.pardir, "scenarios", "earth_moon_constellation.json")
+
+
+def constellation(**changes) -> dict:
+    """The bundled Earth and Moon scenario, cut to three days."""
+    with open(SCENARIO) as file:
+        config = json.load(file)
+    return {**config, "duration": 3 * 86400, **changes}
+
+
+def test_bundled_scenario_conserves_energy():
+    simulation = NBodySimulation.from_config(constellation())
+    simulation.run()
+    assert simulation.finished and simulation.crash_message is None
+    assert simulation.energy_error() < 1e-12
+
+
+def test_vehicles_do_not_change_the_bodies():
+    # A vehicle dropped from rest hits the Earth early on, so the stepped set shrinks as well
+    config = constellation()
+    faller = {"name": "Faller", "relative_to": "Earth", "x": 7e6}
+    with_vehicles = NBodySimulation.from_config({**config, "vehicles": config["vehicles"] + [faller]})
+    without = NBodySimulation.from_config({**config, "vehicles": []})
+    with_vehicles.run()
+    without.run()
+
+    assert [name for name, _, _ in with_vehicles.crashes()] == ["Faller"]
+    for key in ("time", "body_x", "body_y", "total_energy"):
+        np.testing.assert_array_equal(with_vehicles.logs()[key], without.logs()[key])
+
+
+BODIES = [{"name": "Earth", "mass": 5.972e24, "radius": 6.371e6}]
+
+
+@pytest.mark.parametrize("config, message", [
+    ([], "A scenario must be a JSON object."),
+    ({"h": 60, "duration": 600, "bodies": BODIES, "steps": 10}, "Unknown scenario parameters: steps."),
+    ({"duration": 600, "bodies": BODIES}, "Scenario is missing 'h'."),
+    ({"h": 60, "duration": 600, "bodies": ["Earth"]}, "Each body entry must be a JSON object."),
+    ({"h": 60, "duration": 600, "bodies": BODIES * 2}, "Body name 'Earth' is used twice."),
+    ({"h": 60, "duration": 600, "bodies": [{"name": "Earth", "mass": 5.972e24}]}, "Body 'Earth' is missing 'radius'."),
+    ({"h": 60, "duration": 600, "bodies": [{"name": "Earth", "mass": 0, "radius": 1}]},
+     "Body 'Earth' must have a positive mass and radius."),
+    ({"h": 60, "duration": 600, "bodies": BODIES, "vehicles": [{"name": "Probe", "mass": 100}]},
+     "Unknown vehicle parameters: mass."),
+    ({"h": 60, "duration": 600, "bodies": BODIES, "vehicles": [{"name": "Probe", "count": 0}]},
+     "Vehicle 'Probe' must have a count of at least 1."),
+    ({"h": 60, "duration": 600, "bodies": BODIES, "vehicles": [{"name": "Probe", "count": 2, "x": 7e6}]},
+     "Vehicle 'Probe' needs relative_to to spread its 2 copies around."),
+    ({"h": 60, "duration": 600, "bodies": BODIES, "vehicles": [{"name": "Probe", "x": 7e6, "circular": True}]},
+     "'Probe' needs relative_to for a circular orbit."),
+    ({"h": 60, "duration": 600, "bodies": BODIES, "vehicles": [{"name": "Probe", "relative_to": "Moon"}]},
+     "Unknown body 'Moon', relative_to must name a body listed earlier."),
+    ({"h": 60, "duration": 600, "bodies": BODIES, "vehicles": [{"name": "Probe", "relative_to": "Earth",
+                                                                 "circular": True}]},
+     "A circular orbit needs a nonzero offset from the body it orbits."),
+    ({"h": 60, "duration": 600, "bodies": BODIES, "vehicles": [{"name": "Probe", "relative_to": "Earth"}]},
+     "Vehicle 'Probe' must not start at the centre of 'Earth'."),
+    ({"h": 60, "duration": 600, "bodies": []}, "A multi-body simulation needs at least one body."),
+    ({"h": 0, "duration": 600, "bodies": BODIES}, "Time step must be positive."),
+    ({"h": 60, "duration": 600, "bodies": BODIES, "integrator": "dopri5"},
+     "Unknown multi-body integrator 'dopri5', expected one of rk4, verlet, yoshida4."),
+    ({"h": 60, "duration": 600, "bodies": BODIES, "log_every": 0}, "Logging interval must be at least one step."),
+    ({"h": 60, "duration": 600, "bodies": BODIES + [{"name": "Moon", "mass": 7.3e22, "radius": 1.7e6, "x": 7e6}]},
+     "Bodies must not overlap at the start of the run."),
+])
+def test_invalid_scenarios_are_rejected(config, message):
+    with pytest.raises(ValueError) as error:
+        NBodySimulation.from_config(config)
+    assert str(error.value) == message
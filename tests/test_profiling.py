@@ -0,0 +1,52 @@
+import threading
+import time
+
+from simulation.profiling import Profiler
+from simulation.rocket import Rocket
+from simulation.runner import SimulationRunner
+
+
+class SlowField:
+    """A stand-in field whose evaluations take a known time."""
+
+    def evaluate(self, *args):
+        time.sleep(0.05)
+        return 0.0, 0.0
+
+    def evaluate_arrays(self, x, *args):
+        time.sleep(0.05)
+        return x, x
+
+
+def test_force_time_of_another_thread_is_not_subtracted():
+    profiler = Profiler()
+    field = SlowField()
+    profiler.attach_field(field)
+
+    start = profiler.start()
+    worker = threading.Thread(target=field.evaluate, args=(0.0, 0.0, 0.0))
+    worker.start()
+    worker.join()
+    time.sleep(0.02)
+    profiler.lap("events", start)
+
+    report = profiler.report()
+    assert report["phases"]["force"]["seconds"] >= 0.05
+    assert report["phases"]["events"]["seconds"] >= 0.06
+    assert report["counters"]["force_evaluations"] == 1
+
+
+def test_profiler_is_swapped_in_between_chunks():
+    runner = SimulationRunner(Rocket(100, 0, 7e6, 7543, 0, 0), 10, 10000, compiled=False)
+    profiler = Profiler()
+    runner.set_profiler(profiler)
+    assert runner.profiler is None and "evaluate" not in vars(runner.field)
+
+    runner.run_chunk(10)
+    assert runner.profiler is profiler and runner.rocket.profiler is profiler
+    assert profiler.counters["steps"] == 10
+
+    runner.set_profiler(None)
+    runner.run_chunk(10)
+    assert runner.profiler is None and "evaluate" not in vars(runner.field)
+    assert profiler.counters["steps"] == 10
@@ -0,0 +1,57 @@
+import numpy as np
+
+from simulation import planet_constants, result_cache
+from simulation.batch import DEFAULT_CASE, get_result
+from simulation.result_cache import ResultCache, cache_key
+
+# A short run that logs an apsis event
+CASE = {**DEFAULT_CASE, "vx": 8000.0, "duration": 4000.0}
+
+
+def test_key_depends_on_every_input(monkeypatch):
+    key = cache_key(CASE)
+    assert cache_key({**CASE, "mass": 100}) == cache_key({**CASE, "mass": 100.0})
+    assert cache_key({**CASE, "vx": 8000.5}) != key
+
+    monkeypatch.setattr(result_cache, "INTEGRATOR_VERSION", result_cache.INTEGRATOR_VERSION + 1)
+    assert cache_key(CASE) != key
+    monkeypatch.undo()
+    assert cache_key(CASE) == key
+
+    monkeypatch.setattr(planet_constants, "EARTH_MASS", planet_constants.EARTH_MASS * 1.001)
+    assert cache_key(CASE) != key
+
+
+def test_key_of_analytic_runs_ignores_the_integrator_settings():
+    analytic = {**CASE, "analytic": True}
+    assert cache_key({**analytic, "integrator": "rk4"}) == cache_key({**analytic, "integrator": "yoshida4"})
+    adaptive = {**analytic, "integrator": "dopri5"}
+    assert cache_key({**adaptive, "rtol": 1e-6}) == cache_key(adaptive)
+    assert cache_key({**analytic, "integrator": "rk4"}) != cache_key({**analytic, "integrator": "dopri5"})
+    # With the Moon the run is integrated, so the settings count again
+    lunar = {**analytic, "moon": True}
+    assert cache_key({**lunar, "integrator": "rk4"}) != cache_key({**lunar, "integrator": "yoshida4"})
+
+
+def test_hits_and_misses():
+    cache = ResultCache()
+    first = get_result(CASE, cache)
+    second = get_result(CASE, cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    np.testing.assert_array_equal(first.data, second.data)
+
+    get_result({**CASE, "h": 5.0}, cache)
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_disk_tier_is_shared(tmp_path):
+    stored = get_result(CASE, ResultCache(directory=str(tmp_path)))
+    # Another process's cache, with nothing in memory
+    cache = ResultCache(directory=str(tmp_path))
+    loaded = cache.get(CASE)
+    assert (cache.hits, cache.misses) == (1, 0)
+    np.testing.assert_array_equal(loaded.data, stored.data)
+    assert loaded.events and [record.as_dict() for record in loaded.events] == [
+        record.as_dict() for record in stored.events
+    ]
+    assert ResultCache(directory=str(tmp_path)).get({**CASE, "duration": 5000.0}) is None
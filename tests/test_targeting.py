@@ -0,0 +1,58 @@
+import math
+
+import numpy as np
+import pytest
+
+from simulation.ensemble import Ensemble
+from simulation.gravity import GravityField
+from simulation.targeting import ApoapsisAltitude, PeriapsisAltitude, TargetingSolver
+
+
+def test_apoapsis_from_gui_defaults_changes_only_the_speed():
+    solver = TargetingSolver([ApoapsisAltitude(20000e3)], 100, 0, 7e6, 10)
+    result = solver.solve(7543, 0)
+    assert result.converged
+    assert result.velocity_y == 0
+    # Vis-viva for a 7000 km periapsis and a 26371 km apoapsis radius
+    mu = solver.field.central_mu
+    apoapsis = 20000e3 + solver.field.bodies[0].radius
+    assert result.velocity_x == pytest.approx(math.sqrt(mu * (2 / 7e6 - 2 / (7e6 + apoapsis))), rel=1e-3)
+
+
+def test_apoapsis_below_the_start_is_rejected():
+    with pytest.raises(ValueError):
+        TargetingSolver([ApoapsisAltitude(100e3)], 100, 0, 7e6, 10)
+
+
+def test_unbound_guess_is_rejected():
+    solver = TargetingSolver([ApoapsisAltitude(20000e3)], 100, 0, 7e6, 10)
+    with pytest.raises(ValueError):
+        solver.solve(12000, 0)
+
+
+def test_apoapsis_is_continuous_across_hitting_the_earth():
+    # Speeds either side of the one whose periapsis grazes the surface
+    field = GravityField.earth_moon(False, False)
+    speeds = np.array([7355.0, 7360.0, 7365.0, 7370.0, 7375.0])
+    ensemble = Ensemble(100, 0, 7e6, speeds, np.zeros_like(speeds))
+    ensemble.propagate(field, 10, 6000)
+    altitudes = ApoapsisAltitude(20000e3, tolerance=100).measure(ensemble, field)
+    assert ensemble.crash_step[0] > 0 and ensemble.crash_step[-1] < 0
+    assert altitudes[0] < 0 < altitudes[-1]
+    assert np.all(np.diff(altitudes) > 0) and np.all(np.diff(altitudes) < 20e3)
+
+
+@pytest.mark.parametrize("target", [ApoapsisAltitude(20000e3), PeriapsisAltitude(100e3, body="Earth")])
+def test_reached_checks_only_new_rows(target):
+    # An apsis falls on a segment boundary for some members, whose neighbours are in the earlier segment
+    field = GravityField.earth_moon(False, False)
+    speeds = np.linspace(6000.0, 9000.0, 31)
+    ensemble = Ensemble(100, 0, 7e6, speeds, np.zeros_like(speeds))
+    reached = np.zeros(speeds.shape[0], dtype=bool)
+    checked = 0
+    for end in range(100, 20001, 100):
+        ensemble.propagate(field, 10, end)
+        reached |= target.reached(ensemble, field, checked)
+        checked = ensemble.time_log.shape[0]
+    np.testing.assert_array_equal(reached, target.reached(ensemble, field))
+    assert reached.any() and not reached.all()
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from simulation.trajectory import TRAJECTORY_DTYPE
+from simulation.trajectory_file import TrajectoryFile, TrajectoryWriter
+
+
+def samples(count: int, start: int = 0) -> np.ndarray:
+    """Distinct values in every column, with the sample index as the time."""
+    data = np.empty(count, dtype=TRAJECTORY_DTYPE)
+    for offset, name in enumerate(TRAJECTORY_DTYPE.names):
+        data[name] = np.arange(start, start + count) + offset / 10
+    return data
+
+
+def test_round_trip_across_chunks(tmp_path):
+    path = str(tmp_path / "run.traj")
+    data = samples(100)
+    # Uneven batches with flushes, so chunks are filled in several partial writes
+    with TrajectoryWriter(path, {"name": "test"}, chunk_size=7) as writer:
+        for start, stop in ((0, 3), (3, 4), (4, 20), (20, 21), (21, 100)):
+            writer.append(data[start:stop])
+            writer.flush()
+
+    trajectory_file = TrajectoryFile(path)
+    assert len(trajectory_file) == 100 and trajectory_file.chunk_size == 7
+    assert trajectory_file.header["name"] == "test"
+    np.testing.assert_array_equal(trajectory_file.slice(), data)
+    # Ranges and strides that start, end and step across chunk boundaries
+    for start, stop, step in ((6, 8, 1), (5, 30, 3), (0, 100, 7), (13, 99, 11), (98, 100, 1), (50, None, 50)):
+        np.testing.assert_array_equal(trajectory_file.slice(start, stop, step), data[start:stop:step])
+        np.testing.assert_array_equal(trajectory_file.column("y", start, stop, step), data["y"][start:stop:step])
+    assert trajectory_file.index_of(13.5) == 14
+    np.testing.assert_array_equal(trajectory_file.window(6, 14), data[6:15])
+    trajectory_file.close()
+
+
+def test_reader_follows_a_file_being_written(tmp_path):
+    path = str(tmp_path / "run.traj")
+    data = samples(30)
+    writer = TrajectoryWriter(path, {}, chunk_size=8)
+    writer.append(data[:5])
+    writer.flush()
+    trajectory_file = TrajectoryFile(path)
+    assert len(trajectory_file) == 5
+
+    writer.append(data[5:19])
+    # Full chunks are written as they fill, the partial one only on flush
+    assert trajectory_file.refresh() == 16
+    writer.close()
+    assert trajectory_file.refresh() == 19
+    np.testing.assert_array_equal(trajectory_file.slice(), data[:19])
+
+    # Reopened for appending, the partial last chunk is completed in place
+    with TrajectoryWriter(path, None, append=True) as writer:
+        writer.append(data[19:])
+    assert trajectory_file.refresh() == 30
+    np.testing.assert_array_equal(trajectory_file.slice(), data)
+
+
+def test_truncate_and_append_again(tmp_path):
+    path = str(tmp_path / "run.traj")
+    with TrajectoryWriter(path, {}, chunk_size=8) as writer:
+        writer.append(samples(30))
+    # Cut within a chunk, then write different samples over the dropped ones and on past them
+    with TrajectoryWriter(path, None, append=True) as writer:
+        writer.truncate(22)
+        writer.append(samples(18, start=1000))
+
+    expected = np.concatenate([samples(22), samples(18, start=1000)])
+    np.testing.assert_array_equal(TrajectoryFile(path).slice(), expected)
+
+
+def test_events_sidecar(tmp_path):
+    path = str(tmp_path / "run.traj")
+    events = [{"name": "Earth periapsis", "time": 1.0}]
+    with TrajectoryWriter(path, {}) as writer:
+        writer.write_events(events)
+    assert TrajectoryFile(path).events() == events
+
+    # A new file at the same path drops the events of the old one
+    TrajectoryWriter(path, {}).close()
+    assert TrajectoryFile(path).events() == []
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "other.traj"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        TrajectoryFile(str(path))